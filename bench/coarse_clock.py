@@ -0,0 +1,26 @@
+"""Measure ``Time.now()`` throughput with a ``CoarseClock`` registered.
+
+"""
+
+from common import bench
+
+from zope.component import globalSiteManager as gsm
+
+from sact.epoch import Time
+from sact.epoch.clock import CoarseClock
+
+
+def main():
+    bench("Time.now() (Clock)", Time.now)
+    for resolution in (0.001, 1):
+        clock = CoarseClock(resolution=resolution)
+        gsm.registerUtility(clock)
+        try:
+            bench("Time.now() (CoarseClock %gs)" % resolution, Time.now)
+            bench("CoarseClock.ts (%gs)" % resolution, lambda: clock.ts)
+        finally:
+            gsm.unregisterUtility(clock)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts.
+
+Importing this module makes the ``sact.epoch`` of the source tree
+importable.
+
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+N = 200000
+
+
+def bench(label, stmt, number=N):
+    """Print the best time per call of ``stmt`` over 3 runs"""
+    per_call = min(timeit.repeat(stmt, number=number, repeat=3)) / number
+    print("%-40s %8.3f us" % (label, per_call * 1e6))
+
+
+def once(label, func):
+    """Print the time of a single call of ``func``, returning its result"""
+    result = []
+    elapsed = timeit.timeit(lambda: result.append(func()), number=1)
+    print("%-40s %8.3f s" % (label, elapsed))
+    return result[0]
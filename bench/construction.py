@@ -0,0 +1,39 @@
+"""Measure the cost of ``Time`` construction and arithmetic paths.
+
+Compares construction with the year range check against the former
+per-instance ``strftime('%Y')`` probe (emulated here).
+
+"""
+
+import datetime
+
+from common import bench
+
+from sact.epoch import Time, UTC
+from sact.epoch.timezone import testTimeZone
+
+
+def main():
+    utc = UTC()
+    t = Time(2010, 1, 1)
+    delta = datetime.timedelta(seconds=1)
+
+    def legacy():
+        dt = datetime.datetime.__new__(Time, 2010, 1, 1, tzinfo=utc)
+        dt.strftime('%Y')
+        return dt
+
+    bench("datetime(...) (baseline)",
+          lambda: datetime.datetime(2010, 1, 1, tzinfo=utc))
+    bench("Time(...) with strftime probe (legacy)", legacy)
+    bench("Time(...)", lambda: Time(2010, 1, 1))
+    bench("Time(..., disable_validity_check=True)",
+          lambda: Time(2010, 1, 1, disable_validity_check=True))
+    bench("Time + timedelta", lambda: t + delta)
+    bench("Time + seconds", lambda: t + 1)
+    bench("Time.astimezone(tz)", lambda: t.astimezone(testTimeZone))
+    bench("Time.utc", lambda: t.utc)
+
+
+if __name__ == "__main__":
+    main()
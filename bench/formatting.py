@@ -0,0 +1,29 @@
+"""Measure ``Time.iso``, ``short`` and ``format()``.
+
+Former behavior, ``isoformat()`` and ``strftime()`` on each access, is
+given for comparison.
+
+"""
+
+from common import bench
+
+from sact.epoch import Time
+
+
+def main():
+    t = Time(2010, 1, 1, 12, 30, 15, 250)
+    whole = t.replace(microsecond=0)
+    bench("isoformat(' ') (legacy)", lambda: t.isoformat(" "))
+    bench("Time.iso", lambda: t.iso)
+    bench("Time.iso, whole second", lambda: whole.iso)
+    bench("strftime(short) (legacy)",
+          lambda: t.strftime('%Y-%m-%d %H:%M:%S'))
+    bench("Time.short", lambda: t.short)
+    bench("strftime('%a %d %b %Y') (legacy)",
+          lambda: t.strftime('%a %d %b %Y %H:%M:%S'))
+    bench("Time.format('%a %d %b %Y')",
+          lambda: t.format('%a %d %b %Y %H:%M:%S'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Measure ``IntervalIndex`` building and overlap queries.
+
+Pairwise comparisons of ``Time`` bounds are given for comparison.
+
+"""
+
+import random
+
+from common import bench, once
+
+from sact.epoch import Time, IntervalIndex
+
+
+INTERVALS = 1000000
+
+
+def main():
+    random.seed(0)
+    start = 1262401445000000
+    starts = [start + random.randint(0, 86400 * 365) * 1000000
+              for _ in range(INTERVALS)]
+    ends = [us + random.randint(60, 7200) * 1000000 for us in starts]
+    index = IntervalIndex.from_us(starts, ends)
+    ## the index is built at the first query
+    once("building, %d intervals" % INTERVALS,
+         lambda: index.at(Time.from_timestamp_us(start)))
+
+    pairs = [(Time.from_timestamp_us(s), Time.from_timestamp_us(e))
+             for s, e in zip(starts[:100000], ends[:100000])]
+    lo = Time.from_timestamp_us(start + 86400 * 180 * 1000000)
+    hi = Time.from_timestamp_us(start + (86400 * 180 + 600) * 1000000)
+    bench("pairwise Time comparisons, 100000 (legacy)",
+          lambda: [p for p in pairs if p[0] < hi and lo < p[1]], number=3)
+    bench("IntervalIndex.overlapping(), 10 minutes",
+          lambda: index.overlapping(lo, hi), number=1000)
+    bench("IntervalIndex.at()", lambda: index.at(lo), number=1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure ``ts2iso()`` and ``iso2ts()``, single and bulk.
+
+Former implementations (``utcfromtimestamp().isoformat()`` and
+``time.strptime()``) are given for comparison.
+
+"""
+
+import calendar
+import datetime
+import time
+
+import numpy as np
+
+from common import bench
+
+from sact.epoch.utils import ts2iso, iso2ts, ts2iso_many, iso2ts_many
+
+
+def legacy_ts2iso(ts):
+    return datetime.datetime.utcfromtimestamp(ts).isoformat(" ")
+
+
+def legacy_iso2ts(iso):
+    return calendar.timegm(time.strptime(iso + " UTC",
+                                         "%Y-%m-%d %H:%M:%S %Z"))
+
+
+def main():
+    ts = 1234567890
+    iso = ts2iso(ts)
+    bench("ts2iso() (legacy)", lambda: legacy_ts2iso(ts))
+    bench("ts2iso()", lambda: ts2iso(ts))
+    bench("ts2iso(float)", lambda: ts2iso(ts + 0.25))
+    bench("iso2ts() (legacy)", lambda: legacy_iso2ts(iso))
+    bench("iso2ts()", lambda: iso2ts(iso))
+    bench("iso2ts(fraction and offset)",
+          lambda: iso2ts("2009-02-14 00:31:30.25+01:00"))
+
+    timestamps = list(range(ts, ts + 10000))
+    isos = ts2iso_many(timestamps)
+    bench("ts2iso_many(), 10000 values",
+          lambda: ts2iso_many(timestamps), number=20)
+    bench("iso2ts_many(), 10000 values",
+          lambda: iso2ts_many(isos), number=20)
+
+    timestamps = np.arange(ts, ts + 1000000)
+    isos = ts2iso_many(timestamps)
+    bench("ts2iso_many(), numpy array of 1000000 values",
+          lambda: ts2iso_many(timestamps), number=5)
+    bench("iso2ts_many(), numpy array of 1000000 values",
+          lambda: iso2ts_many(isos), number=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Measure ``Time.now()`` and ``TzLocal()`` per call cost.
+
+Former behavior, a full zope registry lookup on each call, is emulated
+with ``queryUtility()``.
+
+"""
+
+from common import bench
+
+from zope.component import queryUtility
+
+from sact.epoch import Time, TzLocal, UTC
+from sact.epoch.clock import DefaultClock
+from sact.epoch.interfaces import IClock, ITimeZone
+from sact.epoch.timezone import defaultLocalTimeZone
+
+
+def legacy_now():
+    utility = queryUtility(IClock, default=DefaultClock)
+    dt = super(Time, Time).utcfromtimestamp(utility.ts)
+    return dt.replace(tzinfo=UTC()).replace(tzinfo=UTC())
+
+
+def legacy_tzlocal():
+    return queryUtility(ITimeZone, name='local',
+                        default=defaultLocalTimeZone)
+
+
+def main():
+    bench("Time.now() (legacy)", legacy_now)
+    bench("Time.now()", Time.now)
+    bench("TzLocal() (legacy)", legacy_tzlocal)
+    bench("TzLocal()", TzLocal)
+
+
+if __name__ == "__main__":
+    main()
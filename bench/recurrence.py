@@ -0,0 +1,55 @@
+"""Measure computation of the next occurrences of rules.
+
+``Time.strptime()`` with ``relative`` then ``.local``, and a step by
+step search for rules of weekdays, are given for comparison.
+
+"""
+
+import datetime
+
+from common import bench, once
+
+from sact.epoch import Time, TzLocal
+from sact.epoch.recurrence import next_after, iter_occurrences
+
+
+OCCURRENCES = 100000
+
+
+def legacy_daily(now, tz):
+    t = Time.strptime("02:30", "%H:%M", tz, relative=now.astimezone(tz))
+    if t <= now:
+        t = t + datetime.timedelta(days=1)
+    return t.local
+
+
+def legacy_weekdays(now, tz):
+    t = legacy_daily(now, tz)
+    while t.weekday() > 4:
+        t = legacy_daily(t, tz)
+    return t
+
+
+def main():
+    tz = TzLocal()
+    now = Time(2010, 1, 2, 12)
+    bench("strptime(relative=), daily (legacy)",
+          lambda: legacy_daily(now, tz), number=20000)
+    bench("next_after(), daily",
+          lambda: next_after("30 2 * * *", now, tz), number=20000)
+    bench("strptime(relative=), weekdays (legacy)",
+          lambda: legacy_weekdays(now, tz), number=20000)
+    bench("next_after(), weekdays",
+          lambda: next_after("30 2 * * 1-5", now, tz), number=20000)
+    bench("next_after(), 29th of february",
+          lambda: next_after("0 0 29 2 *", now, tz), number=20000)
+    once("iter_occurrences(), */15, %d" % OCCURRENCES,
+         lambda: sum(1 for _ in zip(range(OCCURRENCES), iter_occurrences(
+             "*/15 * * * *", now, tz, as_us=True))))
+    once("iter_occurrences(), every 15m, %d" % OCCURRENCES,
+         lambda: sum(1 for _ in zip(range(OCCURRENCES), iter_occurrences(
+             "15m", now, tz, as_us=True))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Measure rounding of moments to buckets.
+
+Removing fields with ``Time.__sub__``, as ``round_date()`` used to do, and
+``astimezone()`` then ``replace()`` for local days are given for
+comparison.
+
+"""
+
+import datetime
+import random
+
+from common import bench, once
+
+import numpy as np
+
+from sact.epoch import Time, TimeArray, TzLocal
+from sact.epoch.rounding import floor
+from sact.epoch.utils import us_array
+
+
+VALUES = 1000000
+
+
+def legacy_minute(t):
+    return t - datetime.timedelta(seconds=t.second,
+                                  microseconds=t.microsecond)
+
+
+def legacy_local_day(t, tz):
+    local = t.astimezone(tz)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def main():
+    random.seed(0)
+    start = 1262401445000000
+    us = [start + random.randint(0, 365 * 86400 * 1000000)
+          for i in range(VALUES)]
+    t = Time.from_timestamp_us(us[0])
+    tz = TzLocal()
+    bench("Time - timedelta, a minute (legacy)", lambda: legacy_minute(t))
+    bench("floor(Time, '1m')", lambda: floor(t, "1m"))
+    bench("astimezone().replace(), a day (legacy)",
+          lambda: legacy_local_day(t, tz))
+    bench("floor(Time, '1d', tz=TzLocal())", lambda: floor(t, "1d", tz=tz))
+    values = us_array(us)
+    once("floor(us_array(), '5s'), %d values" % VALUES,
+         lambda: floor(values, "5s"))
+    once("floor(us_array(), '1d', tz=TzLocal())",
+         lambda: floor(values, "1d", tz=tz))
+    ta = TimeArray.from_us(np.array(us), tz=tz)
+    once("floor(TimeArray, '1d')", lambda: floor(ta, "1d"))
+    once("floor(TimeArray, '1mo')", lambda: floor(ta, "1mo"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare the timing wheel ``Scheduler`` to a ``heapq`` of timers.
+
+1M timers spread on one hour are added, 10% of them are cancelled, and
+the clock is then moved second by second up to the last timer.
+
+"""
+
+import heapq
+import random
+
+from common import once
+
+from sact.epoch.clock import ManageableClock
+from sact.epoch.scheduler import Scheduler
+
+
+COUNT = 1000000
+SPAN = 3600
+
+
+class HeapScheduler(object):
+    """Former approach: a heap of (moment, seq, callback), lazy cancel"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.seq = 0
+
+    def call_later(self, delay, callback):
+        self.seq += 1
+        entry = [self.clock.ts + delay, self.seq, callback]
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        entry[2] = None
+
+    def run_pending(self):
+        now = self.clock.ts
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            callback = heapq.heappop(heap)[2]
+            if callback is not None:
+                callback()
+
+
+def run(label, scheduler, clock, cancel, delays):
+    fired = []
+    callback = lambda: fired.append(None)
+
+    timers = once("%s: add %d timers" % (label, COUNT),
+                  lambda: [scheduler.call_later(delay, callback)
+                           for delay in delays])
+    once("%s: cancel %d timers" % (label, COUNT // 10),
+         lambda: [cancel(timer) for timer in timers[::10]])
+
+    def fire():
+        for _ in range(SPAN + 1):
+            clock.wait(1)
+            scheduler.run_pending()
+
+    once("%s: fire all timers" % label, fire)
+    assert len(fired) == COUNT - COUNT // 10
+
+
+def main():
+    random.seed(0)
+    delays = [random.uniform(0, SPAN) for _ in range(COUNT)]
+    for label, factory in (("heapq", HeapScheduler), ("wheel", Scheduler)):
+        clock = ManageableClock()
+        clock.stop()
+        clock.ts = 0
+        scheduler = factory(clock)
+        if label == "heapq":
+            cancel = scheduler.cancel
+        else:
+            cancel = lambda timer: timer.cancel()
+        run(label, scheduler, clock, cancel, delays)
+
+
+if __name__ == "__main__":
+    main()
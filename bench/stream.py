@@ -0,0 +1,59 @@
+"""Measure timestamps extraction from a log file.
+
+Reading lines and calling ``Time.strptime()`` on each is given for
+comparison.
+
+"""
+
+import os
+import tempfile
+
+from common import once
+
+from sact.epoch import Time, UTC
+from sact.epoch.stream import iter_timestamps, iter_chunks
+
+
+LINES = 200000
+
+FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def legacy(path):
+    res = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                t = Time.strptime(line[:26].decode("utf-8"), FORMAT, UTC())
+            except ValueError:
+                continue
+            res.append(t)
+    return res
+
+
+def write_log(path):
+    with open(path, "w") as f:
+        for i in range(LINES):
+            f.write("%s some message number %d\n" % (
+                Time.from_timestamp_us(1262401445000000 + i * 1234567)
+                .format(FORMAT), i))
+            if not i % 10:
+                f.write("  continuation line\n")
+
+
+def main():
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        write_log(path)
+        once("Time.strptime() per line (legacy)", lambda: legacy(path))
+        once("iter_timestamps()",
+             lambda: sum(1 for _ in iter_timestamps(path, FORMAT, UTC())))
+        once("iter_chunks()",
+             lambda: sum(len(v) for _, v in iter_chunks(path, FORMAT, UTC())))
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
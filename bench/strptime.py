@@ -0,0 +1,53 @@
+"""Measure ``strptime()``, ``StrptimeParser`` and ``Time.parse_many()``.
+
+The standard ``time.strptime()``, and ``Time.strptime()`` called on each
+value of a batch, are given for comparison.
+
+"""
+
+import time
+
+from common import bench
+
+from sact.epoch import Time, UTC
+from sact.epoch.strptime import strptime, get_parser
+
+
+VALUE = "2010-01-02 03:04:05"
+
+FORMAT = "%Y-%m-%d %H:%M:%S"
+
+REFERENCE = (2000, 5, 17, 4, 5, 6, -1, -1, -1), 7
+
+## batch with 5% of invalid values
+BATCH = [VALUE if i % 20 else "2010-01-02 03:04:0x" for i in range(10000)]
+
+
+def legacy_batch(values):
+    res = []
+    for value in values:
+        try:
+            res.append(Time.strptime(value, FORMAT, UTC(), relative=True))
+        except ValueError:
+            res.append(None)
+    return res
+
+
+def main():
+    parser = get_parser(FORMAT)
+    bench("time.strptime()", lambda: time.strptime(VALUE, FORMAT))
+    bench("strptime()", lambda: strptime(VALUE, FORMAT, REFERENCE))
+    bench("StrptimeParser.parse()",
+          lambda: parser.parse(VALUE, REFERENCE))
+    bench("Time.strptime() loop, 10000 values",
+          lambda: legacy_batch(BATCH), number=10)
+    bench("Time.parse_many(), 10000 values",
+          lambda: Time.parse_many(BATCH, FORMAT, UTC(), relative=True),
+          number=10)
+    bench("Time.parse_many(as_us), 10000 values",
+          lambda: Time.parse_many(BATCH, FORMAT, UTC(), relative=True,
+                                  as_us=True), number=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Measure ``TimeIndex`` building and lookups.
+
+A linear scan over a list of ``(Time, payload)`` is given for comparison.
+
+"""
+
+import random
+
+from common import bench, once
+
+from sact.epoch import Time, TimeIndex
+
+
+ENTRIES = 1000000
+
+
+def main():
+    random.seed(0)
+    start = 1262401445000000
+    ## mostly ordered events
+    keys = [start + i * 1000000 + random.randint(-5000000, 0)
+            for i in range(ENTRIES)]
+    events = [(Time.from_timestamp_us(us), None) for us in keys]
+    index = once("TimeIndex(), %d entries" % ENTRIES,
+                 lambda: TimeIndex(events))
+    lo = Time.from_timestamp_us(start + ENTRIES // 2 * 1000000)
+    hi = Time.from_timestamp_us(start + (ENTRIES // 2 + 60) * 1000000)
+    bench("list scan for a minute (legacy)",
+          lambda: [e for e in events if lo <= e[0] < hi], number=3)
+    bench("TimeIndex.range() for a minute",
+          lambda: list(index.range(lo, hi)), number=10000)
+    bench("TimeIndex.nearest()", lambda: index.nearest(lo), number=100000)
+    t = Time.from_timestamp_us(keys[-1] + 1)
+    bench("TimeIndex.add() in order", lambda: index.add(t, None),
+          number=100000)
+
+
+if __name__ == "__main__":
+    main()
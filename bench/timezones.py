@@ -0,0 +1,43 @@
+"""Measure memory and comparison cost of shared timezone instances.
+
+Former behavior, where each ``Time`` got its own ``UTC()`` instance, is
+emulated by bypassing ``UTC.__new__``.
+
+"""
+
+import datetime
+import tracemalloc
+
+from common import N, bench
+
+from sact.epoch import Time, UTC
+
+
+def distinct_utc():
+    return datetime.tzinfo.__new__(UTC)
+
+
+def memory(label, tz_factory, count=N):
+    tracemalloc.start()
+    times = [Time(2010, 1, 1, 0, 0, i % 60, i, tz_factory())
+             for i in range(count)]
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-40s %8.1f bytes per Time" % (label, size / float(len(times))))
+
+
+def main():
+    memory("distinct UTC() instances (legacy)", distinct_utc)
+    memory("shared UTC() instance", UTC)
+
+    a, b = Time(2010, 1, 1, tzinfo=distinct_utc()), \
+        Time(2010, 1, 2, tzinfo=distinct_utc())
+    bench("a < b, distinct UTC() (legacy)", lambda: a < b)
+    bench("a - b, distinct UTC() (legacy)", lambda: a - b)
+    a, b = Time(2010, 1, 1), Time(2010, 1, 2)
+    bench("a < b, shared UTC()", lambda: a < b)
+    bench("a - b, shared UTC()", lambda: a - b)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Measure ``TzSystem`` offset queries.
+
+Compares the transition table against the former ``time.mktime()`` /
+``time.localtime()`` implementation (``timezone.is_dst()``). Set ``TZ``
+to choose the timezone, for instance::
+
+    TZ=Europe/Paris python bench/tzsystem.py
+
+"""
+
+import datetime
+
+from common import bench
+
+from sact.epoch import Time
+from sact.epoch.timezone import TzSystem, is_dst
+
+
+class LegacyTzSystem(datetime.tzinfo):
+
+    stdoffset = TzSystem().stdoffset
+    dstoffset = TzSystem().dstoffset
+
+    def utcoffset(self, dt):
+        return self.dstoffset if is_dst(dt) else self.stdoffset
+
+    def dst(self, dt):
+        return (self.dstoffset - self.stdoffset) if is_dst(dt) \
+            else datetime.timedelta(0)
+
+
+def main():
+    t = Time(2010, 7, 1, 12)
+    for label, tz in (("legacy", LegacyTzSystem()), ("table", TzSystem())):
+        local = t.astimezone(tz)
+        other = t + 3600
+        bench("utcoffset() (%s)" % label, local.utcoffset)
+        bench(".astimezone(tz) (%s)" % label, lambda: t.astimezone(tz))
+        bench("local < utc (%s)" % label, lambda: local < other)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure aggregation of events over windows.
+
+Grouping ``Time`` events in a dict by ``round_date()`` is given for
+comparison.
+
+"""
+
+import random
+from collections import defaultdict
+
+from common import once
+
+from sact.epoch import Time, round_date
+from sact.epoch.windows import aggregate, TumblingWindows, \
+    SlidingWindows, SessionWindows
+
+
+EVENTS = 1000000
+
+
+def legacy(events):
+    counts = defaultdict(int)
+    sums = defaultdict(int)
+    for t, value in events:
+        key = round_date(t)
+        counts[key] += 1
+        sums[key] += value
+    return counts, sums
+
+
+def main():
+    random.seed(0)
+    start = 1262401445000000
+    us = [start + i * 100000 + random.randint(-2000000, 0)
+          for i in range(EVENTS)]
+    events = [(Time.from_timestamp_us(x), 1) for x in us]
+    seconds = [(x / 1e6, 1) for x in us]
+    once("round_date() in a dict, 1m (legacy)", lambda: legacy(events))
+    once("aggregate() of Time, tumbling 1m",
+         lambda: sum(1 for _ in aggregate(events, TumblingWindows("1m"),
+                                          event_time=True, lateness=5)))
+    once("aggregate() of timestamps, tumbling 1m",
+         lambda: sum(1 for _ in aggregate(seconds, TumblingWindows("1m"),
+                                          event_time=True, lateness=5)))
+    once("aggregate() of timestamps, sliding 5m/1m",
+         lambda: sum(1 for _ in aggregate(seconds,
+                                          SlidingWindows("5m", "1m"),
+                                          event_time=True, lateness=5)))
+    once("aggregate() of timestamps, sessions",
+         lambda: sum(1 for _ in aggregate(seconds, SessionWindows("1s"),
+                                          event_time=True, lateness=5)))
+
+
+if __name__ == "__main__":
+    main()
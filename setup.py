@@ -32,12 +32,24 @@ setup(
         'zope.component',
         'pytz',
     ],
-    extras_require={'test': [
-        'zope.testing',
-        'zope.testrunner',
-        # -*- Extra requirements: -*-
-        'z3c.testsetup',
-    ],
+    extras_require={
+        'numpy': [
+            'numpy',
+        ],
+        'interchange': [
+            'numpy',
+            'pyarrow',
+            'pandas',
+        ],
+        'test': [
+            'zope.testing',
+            'zope.testrunner',
+            # -*- Extra requirements: -*-
+            'z3c.testsetup',
+            'numpy',
+            'pyarrow',
+            'pandas',
+        ],
     },
     entry_points="""
     # -*- Entry points: -*-
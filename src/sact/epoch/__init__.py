@@ -1,7 +1,16 @@
 # Package placeholder
 
 from .clock import Time, Clock, round_date
-from .utils import dt2ts, ts2iso, iso2ts, tt2ts, dt2ts, tt2ts, ts2tt
-from .timezone import UTC, TzLocal, TzTest, testTimeZone
-from .strptime import strptime
+from .context import use_clock
+from .utils import dt2ts, dt2us, ts2iso, iso2ts, tt2ts, dt2ts, tt2ts, ts2tt
+from .timezone import UTC, TzLocal, TzTest, TzOffset, testTimeZone
+from .strptime import strptime, StrptimeParser
+from .timeindex import TimeIndex
+from .interval import TimeInterval, IntervalIndex
+
+try:
+    from .timearray import TimeArray
+except ImportError:  ## pragma: no cover
+    ## numpy is not available
+    pass
 
@@ -5,6 +5,8 @@
 """
 
 import datetime
+import math
+import threading
 import time
 import warnings
 import dateutil.parser
@@ -13,9 +15,14 @@ from zope.interface import provider, implementer
 from zope.component import queryUtility
 
 from .interfaces import ITime, IClock
-from .timezone import UTC, TzLocal
-from .strptime import strptime
-from .utils import dt2ts
+from .timezone import UTC, TzLocal, TzOffset, TzTest
+from .strptime import strptime, match_formats, get_parser, \
+    DEFAULT_REFERENCE
+from .utils import dt2ts, dt2us, parse_iso, us_array, _EPOCH_ORDINAL, \
+    US_PER_SECOND, _wall_offset_us
+from .utility import CachedUtility
+from .formatter import compile_format
+from .context import _clock_override
 
 
 try:
@@ -54,6 +61,70 @@ DEFAULT_PARSER_FORMATS = [
     ]
 
 
+def strftime_safe_years():
+    """Return the range of years for which ``strftime()`` is known to work
+
+    Python 2 ``strftime()`` fails on years before 1900, Python 3 works
+    on the whole ``datetime`` range:
+
+        >>> from sact.epoch.clock import strftime_safe_years
+        >>> strftime_safe_years() in [(1, 9999), (1900, 9999)]
+        True
+
+    """
+    for year in (datetime.MINYEAR, 1000, 1900):
+        try:
+            datetime.date(year, 1, 1).strftime('%Y')
+        except ValueError:  ## pragma: no cover
+            continue
+        return year, datetime.MAXYEAR
+    return datetime.MAXYEAR + 1, datetime.MAXYEAR  ## pragma: no cover
+
+
+## Time instances with years in this range do not need to check
+## ``strftime()`` support at construction.
+STRFTIME_SAFE_YEARS = strftime_safe_years()
+
+
+NS_PER_SECOND = 1000000000
+
+## Python 3.7 comes with integer nanosecond clocks
+_time_ns = getattr(time, "time_ns", None) or \
+           (lambda: int(time.time() * NS_PER_SECOND))
+_monotonic_ns = getattr(time, "monotonic_ns", None) or \
+                (lambda: int(getattr(time, "monotonic", time.time)()
+                             * NS_PER_SECOND))
+
+
+def _s2ns(ts):
+    if isinstance(ts, float):
+        return int(round(ts * NS_PER_SECOND))
+    return int(ts) * NS_PER_SECOND
+
+
+def _ns2ts(ns):
+    """Timestamp in seconds, kept integer when it is a whole second"""
+    if ns % NS_PER_SECOND:
+        return ns / float(NS_PER_SECOND)
+    return ns // NS_PER_SECOND
+
+
+## Types accepted as a number of seconds in ``Time`` arithmetic
+_SECONDS_TYPES = (int, float)
+
+
+def _wall2us(wall):
+    """Return microseconds of wall fields, as ``StrptimeParser`` gives
+
+    Raises ``ValueError`` on invalid dates.
+
+    """
+    year, month, day, hour, minute, second, fraction = wall
+    days = datetime.date(year, month, day).toordinal() - _EPOCH_ORDINAL
+    return ((days * 86400 + hour * 3600 + minute * 60 + second) *
+            US_PER_SECOND + fraction)
+
+
 def deprecation(message):
     warnings.warn(message, DeprecationWarning, stacklevel=2)
 
@@ -76,6 +147,8 @@ def deprecate(in_favor=None):
 def round_date(date):
     """Round a timedelta to the last minute (remove seconds and microseconds).
 
+    See ``sact.epoch.rounding.floor()`` for other units and for batches.
+
     Setup:
 
          >>> from sact.epoch import round_date, Time
@@ -136,6 +209,10 @@ class Clock(object):
     def ts(self):
         return time.time()
 
+    @property
+    def ts_ns(self):
+        return _time_ns()
+
 
 @implementer(IClock)
 class ManageableClock(Clock):
@@ -249,41 +326,102 @@ class ManageableClock(Clock):
         >>> mc.ts
         3
 
+    Mutations (``start()``, ``stop()``, ``wait()``, setting ``ts``,
+    ``ts_ns`` or ``delta``) are atomic, so a clock can be shared between
+    threads. Note that ``mc.ts += x`` is a read followed by a write, and
+    is not atomic: use ``mc.wait(x)`` instead.
+
+    Internal state is kept in integer nanoseconds, which are also
+    available:
+
+        >>> mc.stop()
+        >>> mc.ts = 1.000000001
+        >>> mc.ts_ns
+        1000000001
+        >>> mc.ts_ns += 999999999
+        >>> mc.ts
+        2
+
+    Stopping a shifted clock freezes it at its own time:
+
+        >>> mc.start()
+        >>> mc.ts = 20
+        >>> mc.stop()
+        >>> 20 <= mc.ts < 21
+        True
+        >>> mc.start()
+        >>> 20 <= mc.ts < 21
+        True
 
     """
 
     def __init__(self):
-        self.delta = 0
-        self._ft = None ## freezed time
+        self.delta_ns = 0
+        self._ft_ns = None ## freezed time
+        ## serializes mutations, reads are lock-free
+        self._lock = threading.Lock()
+
+    def _get_delta(self):
+        return self.delta_ns / float(NS_PER_SECOND)
+
+    def _set_delta(self, value):
+        with self._lock:
+            self.delta_ns = _s2ns(value)
+
+    delta = property(_get_delta, _set_delta)
 
     def start(self):
-        if self.is_running:
-            return
-        ## use _ft to calculate the time delta
-        self.delta = self.ts - self.delta - self._ft
-        self._ft = None
+        with self._lock:
+            if self.is_running:
+                return
+            ## delta first, so that readers never see a running clock
+            ## with the former delta
+            self.delta_ns = self._ft_ns - _time_ns()
+            self._ft_ns = None
 
     def stop(self):
-        ## save real current time
-        self._ft = self.ts - self.delta
+        with self._lock:
+            if not self.is_running:
+                return
+            self._ft_ns = _time_ns() + self.delta_ns
 
     @property
     def is_running(self):
-        return self._ft is None
+        return self._ft_ns is None
+
+    def get_ts_ns(self):
+        ft_ns = self._ft_ns
+        if ft_ns is not None:
+            return ft_ns
+        return _time_ns() + self.delta_ns
+
+    def set_ts_ns(self, value):
+        with self._lock:
+            self._set_ts_ns(int(value))
+
+    def _set_ts_ns(self, value):
+        self.delta_ns = value - _time_ns()
+        # don't forget to update self._ft_ns
+        if self._ft_ns is not None:
+            self._ft_ns = value
+
+    ts_ns = property(get_ts_ns, set_ts_ns)
 
     def get_ts(self):
-        if not self.is_running:
-            return self._ft
-        return time.time() + self.delta
+        ft_ns = self._ft_ns
+        if ft_ns is not None:
+            return _ns2ts(ft_ns)
+        return (_time_ns() + self.delta_ns) / float(NS_PER_SECOND)
 
     def set_ts(self, value):
-        self.delta = value - time.time()
-        # don't forget to update self._ft
-        if self._ft is not None:
-            self._ft = value
+        self.set_ts_ns(_s2ns(value))
 
     ts = property(get_ts, set_ts)
 
+    @property
+    def time(self):
+        return Time.from_timestamp_ns(self.ts_ns)
+
     def wait(self, timedelta=None, **kwargs):
         """Provide a convenient shortcut to alter the current time
 
@@ -298,11 +436,190 @@ class ManageableClock(Clock):
         else:
             secs = int(timedelta)
 
-        self.ts += secs
+        with self._lock:
+            self._set_ts_ns(self.get_ts_ns() + secs * NS_PER_SECOND)
+
+
+@implementer(IClock)
+class MonotonicClock(Clock):
+    """Clock that never goes backward
+
+    The wall clock is read once at creation, and time then advances
+    with the monotonic clock of the system, so adjustments of the
+    system time (by NTP for instance) can't make it regress.
+
+    Usage
+    =====
+
+        >>> from sact.epoch.clock import MonotonicClock
+        >>> c = MonotonicClock()
+        >>> t1 = c.ts_ns
+        >>> t2 = c.ts_ns
+        >>> t1 <= t2
+        True
+        >>> isinstance(c.ts, float)
+        True
+        >>> c.time
+        <Time ...>
+
+    Drift from the wall clock is not corrected unless ``resync`` is
+    given. Every ``resync`` seconds, the clock then compares itself to
+    the wall clock. If it is late, it doesn't jump: it runs faster, by
+    at most ``slew_rate`` (5% by default), until it has caught up. If it
+    is ahead, it keeps its time, as it can't go backward:
+
+        >>> c = MonotonicClock(resync=0)
+        >>> base_ns, mono_ns, _correction_ns = c._anchor
+        >>> c._anchor = base_ns - 3600 * 10 ** 9, mono_ns, 0
+        >>> 3599 < Clock().ts - c.ts < 3601
+        True
+        >>> 3599 < c._anchor[2] / 10 ** 9 < 3601
+        True
+
+        >>> c._anchor = base_ns + 3600 * 10 ** 9, mono_ns, 0
+        >>> c.ts - Clock().ts > 3500
+        True
+        >>> c._anchor[2]
+        0
+
+    So intervals measured with it are at most ``slew_rate`` off.
+
+    """
+
+    def __init__(self, resync=None, slew_rate=0.05):
+        self.resync_ns = None if resync is None else _s2ns(resync)
+        self.slew_rate = slew_rate
+        ## (clock ns, monotonic clock ns, correction ns still to apply),
+        ## the first two being read at the same time
+        self._anchor = (_time_ns(), _monotonic_ns(), 0)
+
+    @property
+    def ts_ns(self):
+        base_ns, mono_ns, correction_ns = self._anchor
+        now_mono_ns = _monotonic_ns()
+        elapsed_ns = now_mono_ns - mono_ns
+        ts_ns = base_ns + elapsed_ns
+        if correction_ns:
+            ts_ns += min(correction_ns, int(elapsed_ns * self.slew_rate))
+        if self.resync_ns is not None and elapsed_ns >= self.resync_ns:
+            ## forward only
+            self._anchor = (ts_ns, now_mono_ns, max(_time_ns() - ts_ns, 0))
+        return ts_ns
+
+    @property
+    def ts(self):
+        return self.ts_ns / float(NS_PER_SECOND)
+
+    @property
+    def time(self):
+        return Time.from_timestamp_ns(self.ts_ns)
+
+
+@implementer(IClock)
+class CoarseClock(Clock):
+    """Clock of limited resolution reusing its last Time object
+
+    Serves time rounded down to ``resolution`` (in seconds). The ``Time``
+    object and timestamp are built once per tick of this resolution, and
+    reused until the underlying clock moves to the next tick. This is
+    meant for code asking for the current time very often, and only
+    needing millisecond or second precision.
+
+    Usage
+    =====
+
+    It can be given the underlying clock, by default it reads the real
+    time:
+
+        >>> from sact.epoch.clock import CoarseClock, ManageableClock
+        >>> mc = ManageableClock()
+        >>> mc.stop()
+        >>> mc.ts = 10.0126
+        >>> c = CoarseClock(resolution=0.01, clock=mc)
+        >>> c.ts
+        10.01
+        >>> c.time
+        <Time 1970-01-01 00:00:10.010000+00:00>
+        >>> c.ts_ns
+        10010000000
+
+    The same ``Time`` instance is served during a tick:
+
+        >>> t = c.time
+        >>> mc.ts = 10.0199
+        >>> c.time is t
+        True
+
+    And a new one as soon as the underlying clock reaches the next tick:
+
+        >>> mc.ts = 10.02
+        >>> c.time
+        <Time 1970-01-01 00:00:10.020000+00:00>
+
+    It is registered as any other clock:
+
+        >>> from zope.component import globalSiteManager as gsm
+        >>> gsm.registerUtility(c)
+        >>> Time.now()
+        <Time 1970-01-01 00:00:10.020000+00:00>
+        >>> gsm.unregisterUtility(c)
+        True
+
+    """
+
+    def __init__(self, resolution=0.001, clock=None):
+        self.resolution = resolution
+        self.clock = clock
+        self._resolution_us = max(int(round(resolution * 1000000)), 1)
+        ## (tick, ts, Time or None)
+        self._state = (None, None, None)
+
+    def _tick(self):
+        ts = time.time() if self.clock is None else self.clock.ts
+        tick = int(math.floor(ts * 1000000)) // self._resolution_us
+        state = self._state
+        if state[0] != tick:
+            us = tick * self._resolution_us
+            state = self._state = (
+                tick,
+                us // 1000000 if self._resolution_us % 1000000 == 0
+                else us / 1000000.0,
+                None)
+        return state
+
+    @property
+    def time(self):
+        tick, ts, t = self._tick()
+        if t is None:
+            t = _EPOCH + datetime.timedelta(
+                microseconds=tick * self._resolution_us)
+            self._state = (tick, ts, t)
+        return t
+
+    @property
+    def ts(self):
+        return self._tick()[1]
+
+    @property
+    def ts_ns(self):
+        return self._tick()[0] * self._resolution_us * 1000
 
 
 DefaultClock = Clock()
 DefaultManageableClock = ManageableClock()
+DefaultMonotonicClock = MonotonicClock()
+DefaultCoarseClock = CoarseClock()
+
+_clock = CachedUtility(IClock, default=DefaultClock)
+
+
+def current_clock():
+    """Return the clock overriden in current context, or the IClock utility"""
+    clock = _clock_override.get()
+    if clock is None:
+        return _clock()
+    return clock
+
 
 @provider(ITime)
 class Time(datetime.datetime):
@@ -423,6 +740,11 @@ class Time(datetime.datetime):
         >>> Time(u'2000-01-01 00:00:00+01:00')
         <Time 2000-01-01 00:00:00+01:00>
 
+    Complete ISO 8601 strings are parsed without any clock access:
+
+        >>> Time('2000-01-01T00:00:00.5Z')
+        <Time 2000-01-01 00:00:00.500000+00:00>
+
     However, if you don't provide the timezone in the string representation
     or in the datetime (which is then called naive-datetimes):
 
@@ -536,6 +858,10 @@ class Time(datetime.datetime):
                 except ValueError:
                     pass
 
+            iso = parse_iso(args[0])
+            if iso is not None:
+                return Time._from_iso(iso, **kwargs)
+
             if "relative" in kwargs:
                 default = kwargs["relative"]
                 del kwargs["relative"]
@@ -556,7 +882,8 @@ class Time(datetime.datetime):
 
         dt = super(Time, cls).__new__(cls, *args, **kwargs)
 
-        if check:
+        if check and not (STRFTIME_SAFE_YEARS[0] <= dt.year
+                          <= STRFTIME_SAFE_YEARS[1]):
             ## Check that the architecture can call localized methods
             try:
                 dt.strftime('%Y')
@@ -569,6 +896,26 @@ class Time(datetime.datetime):
     def __repr__(self):
         return "<Time %s>" % self
 
+    @classmethod
+    def _from_iso(cls, iso, hint_src_tz=None, relative=None):
+        """Return a Time from ``utils.parse_iso()`` output
+
+        Timezone is taken, in this order, from the string, from the
+        ``relative`` Time, or from ``hint_src_tz``, as ``dateutil``
+        would do with its ``default`` argument.
+
+        """
+        offset = iso[7]
+        if offset is not None:
+            tzinfo = TzOffset(offset)
+        elif relative is not None and relative.tzinfo is not None:
+            tzinfo = relative.tzinfo
+        else:
+            tzinfo = hint_src_tz
+        if tzinfo is None:
+            raise ValueError("No timezone hinted, nor found.")
+        return cls(*iso[:7], tzinfo=tzinfo)
+
     @classmethod
     def from_datetime(cls, dt, hint_src_tz=None):
         """Convert a datetime object with timezone to a Time object
@@ -608,6 +955,9 @@ class Time(datetime.datetime):
 
         """
 
+        if type(dt) is cls and dt.tzinfo is not None:
+            ## Time instances are immutable
+            return dt
         tzinfo = dt.tzinfo if dt.tzinfo else hint_src_tz
         if tzinfo is None:
             raise ValueError("No timezone hinted, nor found.")
@@ -624,6 +974,13 @@ class Time(datetime.datetime):
             >>> Time(2010, 1, 1) + datetime.timedelta(days=1)
             <Time 2010-01-02 00:00:00+00:00>
 
+        Add a number of seconds:
+
+            >>> Time(2010, 1, 1) + 30
+            <Time 2010-01-01 00:00:30+00:00>
+            >>> 1.5 + Time(2010, 1, 1)
+            <Time 2010-01-01 00:00:01.500000+00:00>
+
         Add an other Time (send the original exception):
 
             >>> Time(2010, 1, 1) + Time(1970, 1, 1)
@@ -632,11 +989,16 @@ class Time(datetime.datetime):
             TypeError: unsupported operand type(s) for +: 'Time' and 'Time'
 
         """
+        if isinstance(delta, _SECONDS_TYPES):
+            delta = datetime.timedelta(seconds=delta)
         d = super(Time, self).__add__(delta)
-        if isinstance(d, datetime.datetime):
-            return self.from_datetime(d)
+        if isinstance(d, datetime.datetime) and not isinstance(d, Time):
+            ## python < 3.8 returns ``datetime`` instances
+            return self.from_datetime(d)  ## pragma: no cover
         return d
 
+    __radd__ = __add__
+
     def __sub__(self, delta):
         """Override datetime '-' to return a Time object
 
@@ -645,21 +1007,31 @@ class Time(datetime.datetime):
             >>> Time(2010, 1, 1) - datetime.timedelta(days=1)
             <Time 2009-12-31 00:00:00+00:00>
 
+        Sub a number of seconds:
+
+            >>> Time(2010, 1, 1) - 30
+            <Time 2009-12-31 23:59:30+00:00>
+
         Sub an other Time:
 
             >>> Time(2010, 1, 2) - Time(2010, 1, 1)
             datetime.timedelta(1)
 
         """
+        if isinstance(delta, _SECONDS_TYPES):
+            delta = datetime.timedelta(seconds=delta)
         d = super(Time, self).__sub__(delta)
-        if isinstance(d, datetime.datetime):
-            return self.from_datetime(d)
+        if isinstance(d, datetime.datetime) and not isinstance(d, Time):
+            ## python < 3.8 returns ``datetime`` instances
+            return self.from_datetime(d)  ## pragma: no cover
         return d
 
     @staticmethod
     def now():
-        utility = queryUtility(IClock, default=DefaultClock)
-        return utility.time.replace(tzinfo=UTC())
+        t = current_clock().time
+        if isinstance(t.tzinfo, UTC):
+            return t
+        return t.replace(tzinfo=UTC())
 
     ## XXXvlab: to deprecate
     @staticmethod
@@ -675,8 +1047,31 @@ class Time(datetime.datetime):
 
         """
 
-        dt = super(Time, cls).utcfromtimestamp(ts)
-        return dt.replace(tzinfo=UTC())
+        return super(Time, cls).fromtimestamp(ts, UTC())
+
+    @classmethod
+    def from_timestamp_us(cls, us):
+        """Return a UTC Time from an integer number of microseconds
+
+            >>> Time.from_timestamp_us(1002500)
+            <Time 1970-01-01 00:00:01.002500+00:00>
+
+        """
+        return _EPOCH + datetime.timedelta(microseconds=us)
+
+    @classmethod
+    def from_timestamp_ns(cls, ns):
+        """Return a UTC Time from an integer number of nanoseconds
+
+        Nanoseconds are floored to the microsecond:
+
+            >>> Time.from_timestamp_ns(1002500999)
+            <Time 1970-01-01 00:00:01.002500+00:00>
+            >>> Time.from_timestamp_ns(-1)
+            <Time 1969-12-31 23:59:59.999999+00:00>
+
+        """
+        return _EPOCH + datetime.timedelta(microseconds=ns // 1000)
 
     @classmethod
     def fromtimestamp(cls, ts, tz=None):
@@ -709,18 +1104,56 @@ class Time(datetime.datetime):
             ...     relative=t)
             <Time 2000-01-01 15:30:00+00:00>
 
+        All formats are tried at once, the first one of ``formats`` able
+        to parse the string is used:
+
+            >>> Time.from_string('2000-01-01 15:30', hint_src_tz=UTC(),
+            ...     formats=['%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d %H'])
+            <Time 2000-01-01 15:30:00+00:00>
+
+        Formats whose pattern matches but with invalid values are skipped:
+
+            >>> Time.from_string('02-30', hint_src_tz=UTC(),
+            ...     formats=['%m-%d', '%H-%M'])
+            <Time 1970-01-01 02:30:00+00:00>
+
+            >>> Time.from_string('foo', hint_src_tz=UTC())
+            Traceback (most recent call last):
+            ...
+            ValueError: No format seems to know how to parse your string 'foo'
+
         """
-        formats = formats or DEFAULT_PARSER_FORMATS
-        for f in formats:
+        formats = tuple(formats or DEFAULT_PARSER_FORMATS)
+        if relative is True:
+            relative = Time.now()
+        start = 0
+        while start < len(formats):
+            match = match_formats(date_str, formats[start:])
+            if match is None:
+                break
+            idx, parser, groups = match
             try:
-                return cls.strptime(
-                    date_str, f, hint_src_tz=hint_src_tz,
-                    relative=relative)
+                if relative is False:
+                    return cls.strptime(date_str, formats[start + idx],
+                                        hint_src_tz=hint_src_tz)
+                return cls._from_groups(parser, groups, hint_src_tz,
+                                        relative)
             except ValueError:
-                pass
+                start += idx + 1
         raise ValueError("No format seems to know how to parse your string %r"
                          % (date_str, ))
 
+    @classmethod
+    def _from_groups(cls, parser, groups, hint_src_tz, relative):
+        """Return a UTC Time from groups parsed relatively to ``relative``"""
+
+        input_time = relative.timetuple(), relative.microsecond
+        time_struct, microseconds = parser.from_groups(
+            groups, reference=input_time)
+        dt = Time(*time_struct[:6])
+        dt = dt.replace(microsecond=microseconds, tzinfo=hint_src_tz)
+        return dt.utc
+
     @classmethod
     def strptime(cls, value, format, hint_src_tz, relative=False):
         """Parse a string to create a Time object.
@@ -805,6 +1238,74 @@ class Time(datetime.datetime):
         dt = dt.replace(microsecond=microseconds, tzinfo=hint_src_tz)
         return dt.utc
 
+    @classmethod
+    def parse_many(cls, strings, formats, hint_src_tz, relative=False,
+                   as_us=False):
+        """Parse a batch of strings, without raising on invalid ones
+
+        ``formats`` is a format or a sequence of formats, the first one
+        able to parse a string is used. Other arguments are as for
+        ``strptime()``, ``relative`` being resolved once for the whole
+        batch.
+
+        Returns the list of ``Time`` in UTC, with ``None`` in place of
+        strings that could not be parsed:
+
+            >>> from sact.epoch import UTC
+            >>> Time.parse_many(['2000-01-01 10:00', 'foo', '12:30', None,
+            ...                  '2000-02-30 10:00'],
+            ...                 ['%Y-%m-%d %H:%M', '%H:%M'], UTC())
+            [<Time 2000-01-01 10:00:00+00:00>, None, <Time 1900-01-01 12:30:00+00:00>, None, None]
+
+            >>> from sact.epoch.timezone import testTimeZone as ttz
+            >>> Time.parse_many(['15:08'], '%H:%M', ttz,
+            ...                 relative=Time(1990, 5, 5))
+            [<Time 1990-05-05 15:03:00+00:00>]
+
+        With ``as_us``, returns a ``utils.us_array()`` of UTC epoch
+        microseconds and a ``bytearray`` mask of errors, values of errors
+        being 0:
+
+            >>> values, errors = Time.parse_many(
+            ...     ['1970-01-01 00:00:01.5', '?'], '%Y-%m-%d %H:%M:%S.%f',
+            ...     UTC(), as_us=True)
+            >>> list(values), list(errors)
+            ([1500000, 0], [0, 1])
+
+        """
+        if isinstance(formats, basestring):
+            formats = (formats, )
+        parsers = [get_parser(format) for format in formats]
+        if relative is True:
+            relative = Time.now()
+        reference = DEFAULT_REFERENCE if relative is False else \
+            (relative.timetuple(), relative.microsecond)
+        wall_offset = _wall_offset_us(hint_src_tz)
+        values = us_array() if as_us else []
+        errors = bytearray()
+        for string in strings:
+            us = None
+            for parser in parsers:
+                try:
+                    found = parser.regex.match(string)
+                    if found is None or found.end() != len(string):
+                        continue
+                    wall_us = _wall2us(parser.wall_from_groups(
+                        found.groups(), reference))
+                except (TypeError, ValueError):
+                    continue
+                us = wall_us - wall_offset(wall_us)
+                break
+            errors.append(us is None)
+            if as_us:
+                values.append(0 if us is None else us)
+            else:
+                values.append(None if us is None else
+                              cls.from_timestamp_us(us))
+        if as_us:
+            return values, errors
+        return values
+
     def astimezone(self, tz):
         """Convert Time object to another timezone and return a Time object
 
@@ -817,8 +1318,13 @@ class Time(datetime.datetime):
 
         """
 
+        if self.tzinfo is tz:
+            return self
         dt = super(Time, self).astimezone(tz)
-        return self.from_datetime(dt)
+        if not isinstance(dt, Time):
+            ## python < 3.8 returns ``datetime`` instances
+            return self.from_datetime(dt)  ## pragma: no cover
+        return dt
 
     @property
     def timestamp(self):
@@ -832,8 +1338,50 @@ class Time(datetime.datetime):
         """
         return dt2ts(self)
 
+    @property
+    def timestamp_ms(self):
+        """Integer number of milliseconds since EPOCH
+
+            >>> Time(1970, 1, 1, 0, 0, 1, 2500).timestamp_ms
+            1002
+
+        """
+        return dt2us(self) // 1000
+
+    @property
+    def timestamp_us(self):
+        """Integer number of microseconds since EPOCH
+
+            >>> Time(1970, 1, 1, 0, 0, 1, 2500).timestamp_us
+            1002500
+
+        """
+        return dt2us(self)
+
+    @property
+    def timestamp_ns(self):
+        """Integer number of nanoseconds since EPOCH
+
+            >>> Time(1970, 1, 1, 0, 0, 1, 2500).timestamp_ns
+            1002500000
+
+        """
+        return dt2us(self) * 1000
+
+    @property
+    def ts_exact(self):
+        """Timestamp as a float, keeping microseconds
+
+            >>> Time(1970, 1, 1, 0, 0, 1, 2500).ts_exact
+            1.0025
+
+        """
+        return dt2us(self) / 1000000.0
+
     @property
     def utc(self):
+        if isinstance(self.tzinfo, UTC):
+            return self
         return self.astimezone(UTC())
 
     @property
@@ -848,7 +1396,9 @@ class Time(datetime.datetime):
             '1970-01-01 01:01:00+00:00'
 
         """
-        return self.isoformat(" ")
+        if self.microsecond:
+            return _ISO_US_FORMAT(self)
+        return _ISO_FORMAT(self)
 
     @property
     def short(self):
@@ -862,7 +1412,7 @@ class Time(datetime.datetime):
             '1970-01-01 01:01:00'
 
         """
-        return self.strftime('%Y-%m-%d %H:%M:%S')
+        return _SHORT_FORMAT(self)
 
     @property
     def short_short(self):
@@ -876,7 +1426,19 @@ class Time(datetime.datetime):
             '1970-01-01 01:01'
 
         """
-        return self.strftime('%Y-%m-%d %H:%M')
+        return _SHORT_SHORT_FORMAT(self)
+
+    def format(self, fmt):
+        """Return the ``strftime()`` representation in format ``fmt``
+
+        Formats are compiled once (see ``sact.epoch.formatter``), and
+        accept ``%:z`` for an offset as in ``isoformat()``:
+
+            >>> Time(1970, 1, 1, 1, 1, 0, 5).format('%d/%m/%Y %H:%M:%S.%f%:z')
+            '01/01/1970 01:01:00.000005+00:00'
+
+        """
+        return compile_format(fmt)(self)
 
     @property
     def tt(self):
@@ -919,6 +1481,14 @@ class Time(datetime.datetime):
         return self.local.strftime('%Y-%m-%d %H:%M')
 
 
+_EPOCH = Time(1970, 1, 1)
+
+_ISO_FORMAT = compile_format("%Y-%m-%d %H:%M:%S%:z")
+_ISO_US_FORMAT = compile_format("%Y-%m-%d %H:%M:%S.%f%:z")
+_SHORT_FORMAT = compile_format("%Y-%m-%d %H:%M:%S")
+_SHORT_SHORT_FORMAT = compile_format("%Y-%m-%d %H:%M")
+
+
 """
 Let's unregister the test Timezone and test Clock:
 
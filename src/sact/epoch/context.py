@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Context local clock overrides.
+
+The clock is usually a global zope utility. ``use_clock()`` overrides it
+for the current thread or asyncio task only, which allows to run time
+controlled code concurrently:
+
+    >>> from sact.epoch import Time, use_clock
+    >>> from sact.epoch.clock import ManageableClock, current_clock
+
+    >>> mc = ManageableClock()
+    >>> mc.stop()
+    >>> mc.ts = 0
+    >>> with use_clock(mc):
+    ...     Time.now()
+    <Time 1970-01-01 00:00:00+00:00>
+
+    >>> current_clock() is mc
+    False
+
+Overrides can be nested, and are not seen by other threads:
+
+    >>> import threading
+    >>> other = ManageableClock()
+    >>> other.stop()
+    >>> other.ts = 3600
+    >>> seen = []
+    >>> with use_clock(mc):
+    ...     with use_clock(other):
+    ...         t = threading.Thread(
+    ...             target=lambda: seen.append(current_clock()))
+    ...         t.start()
+    ...         t.join()
+    ...         Time.now()
+    ...     Time.now()
+    <Time 1970-01-01 01:00:00+00:00>
+    <Time 1970-01-01 00:00:00+00:00>
+    >>> seen[0] is mc or seen[0] is other
+    False
+
+Without context manager, ``set_clock()`` and ``reset_clock()`` do the
+same, for instance for the whole life of an asyncio task:
+
+    >>> from sact.epoch.context import set_clock, reset_clock
+    >>> token = set_clock(mc)
+    >>> Time.now()
+    <Time 1970-01-01 00:00:00+00:00>
+    >>> reset_clock(token)
+    >>> current_clock() is mc
+    False
+
+"""
+
+import contextlib
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:  ## pragma: no cover
+    ## Python < 3.7: fall back on thread local storage
+
+    class ContextVar(object):
+
+        def __init__(self, name, default=None):
+            self.name = name
+            self.default = default
+            self._local = threading.local()
+
+        def get(self):
+            return getattr(self._local, "value", self.default)
+
+        def set(self, value):
+            token = self.get()
+            self._local.value = value
+            return token
+
+        def reset(self, token):
+            self._local.value = token
+
+
+_clock_override = ContextVar("sact.epoch.clock", default=None)
+
+
+def set_clock(clock):
+    """Use ``clock`` in the current context, returns a token for ``reset_clock()``"""
+    return _clock_override.set(clock)
+
+
+def reset_clock(token):
+    """Restore the clock used before the matching ``set_clock()``"""
+    _clock_override.reset(token)
+
+
+@contextlib.contextmanager
+def use_clock(clock):
+    """Use ``clock`` in the current context for the duration of the block"""
+    token = _clock_override.set(clock)
+    try:
+        yield clock
+    finally:
+        _clock_override.reset(token)
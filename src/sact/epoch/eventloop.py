@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Asyncio event loop running on virtual time.
+
+``VirtualTimeEventLoop`` takes its time from a ``ManageableClock``.
+Whenever it would have to wait for its next timer, it moves the clock
+forward to it instead, so that hours of scheduled work run in no time:
+
+    >>> import asyncio
+    >>> from sact.epoch.eventloop import VirtualTimeEventLoop
+
+    >>> loop = VirtualTimeEventLoop()
+    >>> start = loop.time()
+    >>> loop.run_until_complete(asyncio.sleep(3600, result='done'))
+    'done'
+    >>> round(loop.time() - start, 3)
+    3600.0
+    >>> loop.close()
+
+This holds for any starting time, sub-second parts included:
+
+    >>> from sact.epoch.clock import ManageableClock
+
+    >>> clock = ManageableClock()
+    >>> clock.stop()
+    >>> clock.ts = 1792147637.099943
+    >>> loop = VirtualTimeEventLoop(clock)
+    >>> for delay in (0.5, 1e-7, 86400.3):
+    ...     loop.run_until_complete(asyncio.sleep(delay))
+    >>> round(clock.ts - 1792147637.099943, 3)
+    86400.8
+    >>> loop.close()
+
+Code run by the loop sees the same time through ``Time.now()``:
+
+    >>> from sact.epoch import Time
+
+    >>> clock = ManageableClock()
+    >>> clock.stop()
+    >>> clock.ts = 0
+    >>> loop = VirtualTimeEventLoop(clock)
+    >>> seen = []
+    >>> handle = loop.call_later(90, lambda: seen.append(Time.now()))
+    >>> loop.run_until_complete(asyncio.sleep(300))
+    >>> seen
+    [<Time 1970-01-01 00:01:30+00:00>]
+    >>> clock.ts
+    300
+
+Timers are run in order, and the clock can still be moved by hand, for
+instance from a callback:
+
+    >>> seen = []
+    >>> for delay in (20, 10, 30):
+    ...     handle = loop.call_later(
+    ...         delay, lambda: seen.append(Time.now().timestamp))
+    >>> handle = loop.call_later(15, clock.wait, 100)
+    >>> loop.run_until_complete(asyncio.sleep(200))
+    >>> seen
+    [310, 415, 415]
+    >>> clock.ts
+    500
+
+    >>> loop.close()
+
+Waiting for I/O is not emulated: file descriptors ready at once are
+served, but the loop does not wait for others when it has timers to
+fast-forward to.
+
+"""
+
+import math
+
+try:
+    import asyncio
+except ImportError:  ## pragma: no cover
+    ## Python 2: there is no loop to run on virtual time, nor examples
+    asyncio = None
+    __doc__ = __doc__.split(">>>", 1)[0]
+
+try:
+    import contextvars
+except ImportError:  ## pragma: no cover
+    ## Python < 3.7: callbacks have no context, they get the clock set by
+    ## ``use_clock()`` around runs of the loop
+    contextvars = None
+
+from .clock import ManageableClock, NS_PER_SECOND
+from .context import use_clock, set_clock
+
+
+## Resolution of the loop time, in seconds
+CLOCK_RESOLUTION = 1e-6
+
+
+class _VirtualTimeSelector(object):
+    """Selector fast-forwarding the loop clock instead of blocking"""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            ## nothing scheduled, only other threads can wake us up
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if events or timeout <= 0:
+            return events
+        target = self._clock.ts + timeout
+        ts_ns = int(math.ceil(target * NS_PER_SECOND))
+        ## float rounding must not leave us before the timer
+        while ts_ns / float(NS_PER_SECOND) < target:
+            ts_ns += 1
+        if ts_ns > self._clock.ts_ns:
+            self._clock.ts_ns = ts_ns
+        return []
+
+    def __getattr__(self, label):
+        return getattr(self._selector, label)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop if asyncio is not None
+                           else object):
+    """Event loop whose time is given by a ``ManageableClock``
+
+    By default, a new stopped ``ManageableClock`` set at current time is
+    used. Callbacks scheduled on the loop, and code run through
+    ``run_until_complete()`` or ``run_forever()``, get this clock as
+    their context clock (see ``sact.epoch.use_clock()``).
+
+    """
+
+    def __init__(self, clock=None, selector=None):
+        if asyncio is None:  ## pragma: no cover
+            raise RuntimeError("VirtualTimeEventLoop requires asyncio.")
+        super(VirtualTimeEventLoop, self).__init__(selector)
+        if clock is None:
+            clock = ManageableClock()
+            clock.stop()
+        self.clock = clock
+        self._selector = _VirtualTimeSelector(self._selector, clock)
+        ## timers due within this delay are run. At current timestamps,
+        ## floats are precise to ~0.2us only, so the default of 1ns
+        ## would never see them due.
+        self._clock_resolution = CLOCK_RESOLUTION
+
+    def time(self):
+        return self.clock.ts
+
+    if contextvars is not None:
+
+        def _clock_context(self, context):
+            if context is None:
+                context = contextvars.copy_context()
+                context.run(set_clock, self.clock)
+            return context
+
+        def call_soon(self, callback, *args, **kwargs):
+            kwargs["context"] = self._clock_context(kwargs.get("context"))
+            return super(VirtualTimeEventLoop, self).call_soon(
+                callback, *args, **kwargs)
+
+        def call_at(self, when, callback, *args, **kwargs):
+            kwargs["context"] = self._clock_context(kwargs.get("context"))
+            return super(VirtualTimeEventLoop, self).call_at(
+                when, callback, *args, **kwargs)
+
+    def run_forever(self):
+        with use_clock(self.clock):
+            return super(VirtualTimeEventLoop, self).run_forever()
+
+    def run_until_complete(self, future):
+        with use_clock(self.clock):
+            return super(VirtualTimeEventLoop, self).run_until_complete(
+                future)
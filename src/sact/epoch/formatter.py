@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Compiled ``strftime()`` formats.
+
+``compile_format()`` turns a format in a callable formatting datetime
+objects. Numeric fields are rendered by a single ``%`` string operation,
+other directives by ``strftime()``:
+
+    >>> import datetime
+    >>> from sact.epoch.formatter import compile_format
+    >>> from sact.epoch import TzOffset
+
+    >>> fmt = compile_format('%Y-%m-%d %H:%M:%S.%f %z')
+    >>> fmt(datetime.datetime(2010, 1, 2, 3, 4, 5, 60, TzOffset(3600)))
+    '2010-01-02 03:04:05.000060 +0100'
+
+Formatters are compiled once per format:
+
+    >>> compile_format('%Y-%m-%d %H:%M:%S.%f %z') is fmt
+    True
+
+``%:z`` gives the offset as in ``isoformat()``:
+
+    >>> compile_format('%H:%M%:z')(
+    ...     datetime.datetime(2010, 1, 2, 3, 4, tzinfo=TzOffset(-5400)))
+    '03:04-01:30'
+
+Fields that depend only on the wall second (all but ``%f``, ``%z``,
+``%:z`` and ``%Z``) are kept for the last second formatted, so that
+formatting successive moments of the same second only renders the
+remaining fields:
+
+    >>> fmt = compile_format('%a %d %b %Y %H:%M:%S.%f')
+    >>> fmt(datetime.datetime(2010, 1, 2, 3, 4, 5, 1))
+    'Sat 02 Jan 2010 03:04:05.000001'
+    >>> fmt(datetime.datetime(2010, 1, 2, 3, 4, 5, 2))
+    'Sat 02 Jan 2010 03:04:05.000002'
+
+"""
+
+import operator
+import re
+
+from .utils import offset2iso, _FIXED_TZ
+
+
+## Directives rendered from a datetime attribute with a ``%`` format
+_NUMERIC = {
+    "Y": ("year", "%04d"),
+    "m": ("month", "%02d"),
+    "d": ("day", "%02d"),
+    "H": ("hour", "%02d"),
+    "M": ("minute", "%02d"),
+    "S": ("second", "%02d"),
+}
+
+_DIRECTIVE = re.compile(r"%(:z|.)", re.DOTALL)
+
+## Key of the wall second of a datetime
+_second_key = operator.attrgetter("second", "minute", "hour",
+                                  "day", "month", "year")
+
+_formatters = {}
+
+_MAX_CACHED_FORMATS = 100
+
+
+def _offset(dt, sep):
+    offset = dt.utcoffset()
+    if offset is None:
+        return ""
+    return offset2iso(offset, sep)
+
+
+## Offsets representations of fixed offset timezones, by (tzinfo, sep)
+_fixed_offsets = {}
+
+
+def _offset_renderer(sep):
+
+    def render(dt):
+        tz = dt.tzinfo
+        if isinstance(tz, _FIXED_TZ):
+            res = _fixed_offsets.get((tz, sep))
+            if res is None:
+                res = _fixed_offsets[(tz, sep)] = _offset(dt, sep)
+            return res
+        return _offset(dt, sep)
+    return render
+
+
+## Directives that can't be kept from one second to the other
+_DYNAMIC = {
+    "f": lambda dt: "%06d" % dt.microsecond,
+    "z": _offset_renderer(""),
+    ":z": _offset_renderer(":"),
+    "Z": lambda dt: dt.tzname() or "",
+}
+
+
+def _static_renderer(parts):
+    """Return a callable rendering a sequence of static directives
+
+    ``parts`` is a list of literal strings and 1-tuples of directives.
+
+    """
+    if all(not isinstance(part, tuple) or part[0] in _NUMERIC
+           for part in parts):
+        template = "".join(
+            part.replace("%", "%%") if not isinstance(part, tuple)
+            else _NUMERIC[part[0]][1] for part in parts)
+        attrs = [_NUMERIC[part[0]][0] for part in parts
+                 if isinstance(part, tuple)]
+        if not attrs:
+            return lambda dt: template.replace("%%", "%")
+        getter = operator.attrgetter(*attrs)
+        if len(attrs) == 1:
+            return lambda dt: template % (getter(dt), )
+        return lambda dt: template % getter(dt)
+    fmt = "".join(part.replace("%", "%%") if not isinstance(part, tuple)
+                  else "%" + part[0] for part in parts)
+    return lambda dt: dt.strftime(fmt)
+
+
+class Formatter(object):
+    """Callable formatting a datetime as ``strftime(format)``"""
+
+    def __init__(self, format):
+        self.format = format
+        ## list of static renderers and dynamic renderers, alternating
+        ## and starting with a static one
+        statics, dynamics = [], []
+        parts = []
+        pos = 0
+        for match in _DIRECTIVE.finditer(format):
+            if match.start() > pos:
+                parts.append(format[pos:match.start()])
+            pos = match.end()
+            directive = match.group(1)
+            if directive == "%":
+                parts.append("%")
+            elif directive in _DYNAMIC:
+                statics.append(_static_renderer(parts))
+                dynamics.append(_DYNAMIC[directive])
+                parts = []
+            else:
+                parts.append((directive, ))
+        if pos < len(format):
+            parts.append(format[pos:])
+        statics.append(_static_renderer(parts))
+        self._statics = statics
+        self._dynamics = dynamics
+        ## (wall second key, rendered static parts)
+        self._last = (None, None)
+
+    def __call__(self, dt):
+        key = _second_key(dt)
+        last_key, rendered = self._last
+        if key != last_key:
+            rendered = [render(dt) for render in self._statics]
+            self._last = key, rendered
+        dynamics = self._dynamics
+        if not dynamics:
+            return rendered[0]
+        if len(dynamics) == 1:
+            return rendered[0] + dynamics[0](dt) + rendered[1]
+        res = [rendered[0]]
+        for idx, render in enumerate(dynamics):
+            res.append(render(dt))
+            res.append(rendered[idx + 1])
+        return "".join(res)
+
+    def __repr__(self):
+        return "<Formatter %r>" % (self.format, )
+
+
+def compile_format(format):
+    """Return the ``Formatter`` of ``format``, compiled once"""
+
+    formatter = _formatters.get(format)
+    if formatter is None:
+        if len(_formatters) > _MAX_CACHED_FORMATS:
+            _formatters.clear()
+        formatter = _formatters[format] = Formatter(format)
+    return formatter
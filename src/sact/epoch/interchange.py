@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Conversions between Arrow or pandas timestamp columns and ``TimeArray``.
+
+Columns are read as UTC epoch microseconds, which is what a ``TimeArray``
+stores: a microsecond column is used without copy, and ``Time`` objects
+are only created when values are accessed. The timezone of the column
+becomes the timezone of the ``TimeArray``, mapped to ``sact.epoch``
+timezones when there is one.
+
+This module requires ``numpy``, and ``pyarrow`` or ``pandas`` for the
+matching functions.
+
+    >>> import numpy as np
+    >>> import pyarrow as pa
+    >>> from sact.epoch.interchange import from_arrow, to_arrow
+
+    >>> col = pa.array([0, 1500000], type=pa.timestamp('us', tz='+01:00'))
+    >>> ta = from_arrow(col)
+    >>> ta
+    <TimeArray ['1970-01-01 01:00:00+01:00' '1970-01-01 01:00:01.500000+01:00']>
+    >>> ta.tz
+    <TimeZone: +01:00>
+    >>> ta[1]
+    <Time 1970-01-01 01:00:01.500000+01:00>
+
+The buffer of the column is shared:
+
+    >>> np.shares_memory(ta.us, np.frombuffer(col.buffers()[1], np.int64))
+    True
+
+Other units are converted to microseconds, rounding down:
+
+    >>> from_arrow(pa.array([-1, 1999], type=pa.timestamp('ns', tz='UTC')))
+    <TimeArray ['1969-12-31 23:59:59.999999+00:00' '1970-01-01 00:00:00.000001+00:00']>
+
+Timestamps without timezone are considered UTC, as ``datetime64``, unless
+a source timezone is hinted:
+
+    >>> from sact.epoch import testTimeZone
+    >>> naive = pa.array([0], type=pa.timestamp('s'))
+    >>> from_arrow(naive)
+    <TimeArray ['1970-01-01 00:00:00+00:00']>
+    >>> from_arrow(naive, hint_src_tz=testTimeZone).utc
+    <TimeArray ['1969-12-31 23:55:00+00:00']>
+
+Null values have no ``Time`` counterpart:
+
+    >>> from_arrow(pa.array([0, None], type=pa.timestamp('us')))
+    Traceback (most recent call last):
+    ...
+    ValueError: Null timestamps can't be stored in a TimeArray.
+
+Back to Arrow, the buffer of the ``TimeArray`` is shared too:
+
+    >>> out = to_arrow(ta)
+    >>> out.type
+    TimestampType(timestamp[us, tz=+01:00])
+    >>> np.shares_memory(np.frombuffer(out.buffers()[1], np.int64), ta.us)
+    True
+
+pandas
+------
+
+    >>> import pandas as pd
+    >>> from sact.epoch.interchange import from_pandas, to_pandas
+
+    >>> idx = pd.DatetimeIndex(['2000-01-01 12:00'], tz='Europe/Paris')
+    >>> ta = from_pandas(idx)
+    >>> ta.utc
+    <TimeArray ['2000-01-01 11:00:00+00:00']>
+    >>> ta[0].utc
+    <Time 2000-01-01 11:00:00+00:00>
+
+    >>> to_pandas(ta)
+    DatetimeIndex(['2000-01-01 12:00:00+01:00'], dtype='datetime64[us, Europe/Paris]', freq=None)
+
+Series are accepted as well:
+
+    >>> from_pandas(pd.Series(pd.to_datetime(['1970-01-01 00:00:01'])))
+    <TimeArray ['1970-01-01 00:00:01+00:00']>
+
+Timezones
+---------
+
+Fixed offsets become ``UTC`` or ``TzOffset`` instances, and the name of
+the system timezone becomes ``TzSystem``. Other named timezones are
+given by ``pytz``:
+
+    >>> import datetime
+    >>> from sact.epoch.interchange import sact_tz, tz_name
+    >>> sact_tz('UTC'), sact_tz('-05:30')
+    (<TimeZone: UTC>, <TimeZone: -05:30>)
+    >>> sact_tz(datetime.timezone(datetime.timedelta(hours=2)))
+    <TimeZone: +02:00>
+    >>> sact_tz('America/New_York')
+    <DstTzInfo 'America/New_York' LMT-1 day, 19:04:00 STD>
+
+Wall times are read in such timezones with their offset at the time,
+not with the first offset the timezone ever had:
+
+    >>> from sact.epoch.rounding import floor
+    >>> floor(from_pandas(pd.DatetimeIndex(['2020-06-15 13:45'],
+    ...                                    tz='Europe/Paris')), '1d')[0]
+    <Time 2020-06-15 00:00:00+02:00>
+
+    >>> from sact.epoch import TzOffset, UTC
+    >>> tz_name(UTC()), tz_name(TzOffset(-3600)), tz_name(testTimeZone)
+    ('UTC', '-01:00', '+00:05')
+
+"""
+
+import datetime
+import os
+import re
+
+import numpy as np
+
+from .timearray import TimeArray, _wall_offsets
+from .timezone import UTC, TzOffset, TzSystem
+from .utils import offset2iso, US_PER_SECOND, _FIXED_TZ
+
+## (divisor, multiplier) turning values of a unit into microseconds
+_UNIT_FACTORS = {
+    "s": (1, US_PER_SECOND),
+    "ms": (1, 1000),
+    "us": (1, 1),
+    "ns": (1000, 1),
+}
+
+_UTC_NAMES = ("UTC", "Z", "Etc/UTC", "GMT", "Etc/GMT", "utc")
+
+_OFFSET = re.compile(r"^([+-])(\d{2}):?(\d{2})$")
+
+
+def _system_zone_name():
+    """Return the IANA name of the system timezone, or None"""
+
+    name = os.environ.get("TZ")
+    if name:
+        return name.lstrip(":")
+    try:
+        path = os.path.realpath("/etc/localtime")
+    except OSError:  ## pragma: no cover
+        return None
+    if "zoneinfo/" in path:
+        return path.split("zoneinfo/", 1)[1]
+    return None
+
+
+def sact_tz(tz):
+    """Return the ``sact.epoch`` timezone matching a name or a tzinfo
+
+    ``None`` is UTC. Named timezones without ``sact.epoch`` counterpart
+    are returned as ``pytz`` timezones, other tzinfo as is.
+
+    """
+    if tz is None:
+        return UTC()
+    if isinstance(tz, datetime.tzinfo):
+        if isinstance(tz, (TzSystem, ) + _FIXED_TZ):
+            return tz
+        offset = tz.utcoffset(None)
+        if offset is not None:
+            return TzOffset(offset)
+        name = getattr(tz, "key", None) or getattr(tz, "zone", None)
+        if name is None:
+            return tz
+        tz = name
+    tz = str(tz)
+    if tz in _UTC_NAMES:
+        return UTC()
+    match = _OFFSET.match(tz)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = int(hours) * 3600 + int(minutes) * 60
+        return TzOffset(-offset if sign == "-" else offset)
+    if tz == _system_zone_name():
+        return TzSystem()
+    import pytz
+    return pytz.timezone(tz)
+
+
+def tz_name(tz):
+    """Return the name of a timezone, as used by Arrow and pandas
+
+    Raises ``ValueError`` on timezones that have no such name.
+
+    """
+    if isinstance(tz, UTC):
+        return "UTC"
+    if isinstance(tz, _FIXED_TZ):
+        return offset2iso(tz.utcoffset(None))
+    if isinstance(tz, TzSystem):
+        name = _system_zone_name()
+    else:
+        name = getattr(tz, "key", None) or getattr(tz, "zone", None)
+    if name is None:
+        raise ValueError("No name found for timezone %r." % (tz, ))
+    return name
+
+
+def _us(values, unit):
+    """Return int64 values of ``unit`` as microseconds"""
+
+    div, mul = _UNIT_FACTORS[unit]
+    if div != 1:
+        return values // div
+    if mul != 1:
+        return values * mul
+    return values
+
+
+def _from_values(values, unit, tz, hint_src_tz):
+    us = _us(values, unit)
+    if tz is None and hint_src_tz is not None:
+        return TimeArray.from_us(us - _wall_offsets(hint_src_tz, us),
+                                 tz=hint_src_tz)
+    return TimeArray.from_us(us, tz=sact_tz(tz))
+
+
+def _as_time_array(values):
+    return values if isinstance(values, TimeArray) else TimeArray(values)
+
+
+##
+## Arrow
+##
+
+def from_arrow(array, hint_src_tz=None):
+    """Return a ``TimeArray`` of an Arrow timestamp array
+
+    Chunked arrays are accepted, at the cost of a copy when they have more
+    than one chunk.
+
+    """
+    import pyarrow as pa
+
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if not pa.types.is_timestamp(array.type):
+        raise TypeError("Expected an Arrow timestamp array, got %s."
+                        % array.type)
+    if array.null_count:
+        raise ValueError("Null timestamps can't be stored in a TimeArray.")
+    values = array.to_numpy(zero_copy_only=True).view(np.int64)
+    return _from_values(values, array.type.unit, array.type.tz, hint_src_tz)
+
+
+def to_arrow(values):
+    """Return an Arrow ``timestamp[us]`` array of a ``TimeArray``
+
+    Other iterables of ``Time`` are converted to ``TimeArray`` first.
+
+    """
+    import pyarrow as pa
+
+    ta = _as_time_array(values)
+    us = np.ascontiguousarray(ta.us)
+    return pa.Array.from_buffers(pa.timestamp("us", tz=tz_name(ta.tz)),
+                                 len(us), [None, pa.py_buffer(us)])
+
+
+##
+## pandas
+##
+
+def from_pandas(values, hint_src_tz=None):
+    """Return a ``TimeArray`` of a pandas ``DatetimeIndex`` or ``Series``"""
+
+    import pandas as pd
+
+    array = values.array if isinstance(values, (pd.Index, pd.Series)) \
+        else values
+    if not isinstance(array, pd.arrays.DatetimeArray):
+        raise TypeError("Expected pandas datetime values, got %s."
+                        % getattr(values, "dtype", type(values)))
+    if array.isna().any():
+        raise ValueError("Null timestamps can't be stored in a TimeArray.")
+    return _from_values(array.asi8, array.unit, array.tz, hint_src_tz)
+
+
+def to_pandas(values):
+    """Return a pandas ``DatetimeIndex`` of a ``TimeArray``
+
+    pandas copies the values when setting the timezone of the index.
+
+    """
+    import pandas as pd
+
+    ta = _as_time_array(values)
+    index = pd.DatetimeIndex(ta.to_datetime64(), copy=False) \
+        .tz_localize("UTC")
+    return index if isinstance(ta.tz, UTC) else index.tz_convert(
+        tz_name(ta.tz))
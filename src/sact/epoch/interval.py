@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Intervals of time, and index of intervals.
+
+``TimeInterval`` is the half-open interval between two moments, stored as
+UTC epoch microseconds so that comparisons never go through timezones:
+
+    >>> from sact.epoch import Time, TimeInterval
+    >>> morning = TimeInterval(Time(2000, 1, 1, 8), Time(2000, 1, 1, 12))
+    >>> morning
+    <TimeInterval [2000-01-01 08:00:00+00:00, 2000-01-01 12:00:00+00:00)>
+    >>> morning.duration
+    datetime.timedelta(seconds=14400)
+    >>> Time(2000, 1, 1, 8) in morning, Time(2000, 1, 1, 12) in morning
+    (True, False)
+
+Set operations:
+
+    >>> day = TimeInterval(Time(2000, 1, 1, 9), Time(2000, 1, 1, 17))
+    >>> morning & day
+    <TimeInterval [2000-01-01 09:00:00+00:00, 2000-01-01 12:00:00+00:00)>
+    >>> morning | day
+    [<TimeInterval [2000-01-01 08:00:00+00:00, 2000-01-01 17:00:00+00:00)>]
+    >>> day - morning
+    [<TimeInterval [2000-01-01 12:00:00+00:00, 2000-01-01 17:00:00+00:00)>]
+
+Contiguous intervals don't overlap, but their union is a single one:
+
+    >>> evening = TimeInterval(Time(2000, 1, 1, 17), Time(2000, 1, 1, 23))
+    >>> day.overlaps(evening), day & evening
+    (False, None)
+    >>> len(day | evening)
+    1
+
+``IntervalIndex`` finds intervals containing a moment, or overlapping
+another interval:
+
+    >>> from sact.epoch import IntervalIndex
+    >>> index = IntervalIndex([(morning, 'morning'), (day, 'day'),
+    ...                        (evening, 'evening')])
+    >>> [payload for interval, payload in index.at(Time(2000, 1, 1, 10))]
+    ['morning', 'day']
+    >>> [payload for interval, payload in index.overlapping(
+    ...     Time(2000, 1, 1, 16), Time(2000, 1, 1, 18))]
+    ['day', 'evening']
+    >>> index.overlapping(TimeInterval(Time(2000, 1, 2), Time(2000, 1, 3)))
+    []
+
+"""
+
+import datetime
+import sys
+
+from .clock import Time
+from .utils import us_array, _to_us
+
+
+class TimeInterval(object):
+    """Half-open interval from ``start`` included to ``end`` excluded
+
+    Bounds are ``Time``, ``datetime`` or timestamps in seconds, normalized
+    as for ``Time.timestamp``.
+
+        >>> TimeInterval(10, 0)
+        Traceback (most recent call last):
+        ...
+        ValueError: Interval ends before it starts.
+
+    Empty intervals are false, and overlap nothing:
+
+        >>> empty = TimeInterval(0, 0)
+        >>> bool(empty), empty.overlaps(TimeInterval(-1, 1))
+        (False, False)
+
+    """
+
+    __slots__ = ("start_us", "end_us")
+
+    def __init__(self, start, end):
+        self._set(_to_us(start), _to_us(end))
+
+    def _set(self, start_us, end_us):
+        if end_us < start_us:
+            raise ValueError("Interval ends before it starts.")
+        self.start_us = start_us
+        self.end_us = end_us
+
+    @classmethod
+    def from_us(cls, start_us, end_us):
+        """Build an interval from UTC epoch microseconds
+
+            >>> TimeInterval.from_us(0, 1500000).end
+            <Time 1970-01-01 00:00:01.500000+00:00>
+
+        """
+        interval = cls.__new__(cls)
+        interval._set(int(start_us), int(end_us))
+        return interval
+
+    @property
+    def start(self):
+        return Time.from_timestamp_us(self.start_us)
+
+    @property
+    def end(self):
+        return Time.from_timestamp_us(self.end_us)
+
+    @property
+    def duration(self):
+        return datetime.timedelta(microseconds=self.end_us - self.start_us)
+
+    def __bool__(self):
+        return self.end_us > self.start_us
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, moment):
+        return self.start_us <= _to_us(moment) < self.end_us
+
+    def overlaps(self, other):
+        """Return whether both intervals share a moment"""
+
+        return max(self.start_us, other.start_us) < \
+            min(self.end_us, other.end_us)
+
+    def _new(self, start_us, end_us):
+        interval = TimeInterval.__new__(TimeInterval)
+        interval.start_us = start_us
+        interval.end_us = end_us
+        return interval
+
+    def intersection(self, other):
+        """Return the common part of both intervals, or None"""
+
+        start_us = max(self.start_us, other.start_us)
+        end_us = min(self.end_us, other.end_us)
+        if start_us >= end_us:
+            return None
+        return self._new(start_us, end_us)
+
+    __and__ = intersection
+
+    def union(self, other):
+        """Return the sorted list of intervals covering both intervals"""
+
+        intervals = sorted((interval for interval in (self, other)
+                            if interval),
+                           key=lambda i: (i.start_us, i.end_us))
+        if len(intervals) == 2 and \
+                intervals[1].start_us <= intervals[0].end_us:
+            return [self._new(intervals[0].start_us,
+                              max(self.end_us, other.end_us))]
+        return intervals
+
+    __or__ = union
+
+    def difference(self, other):
+        """Return the list of parts of this interval not in ``other``"""
+
+        if not self.overlaps(other):
+            return [self] if self else []
+        parts = []
+        if self.start_us < other.start_us:
+            parts.append(self._new(self.start_us, other.start_us))
+        if other.end_us < self.end_us:
+            parts.append(self._new(other.end_us, self.end_us))
+        return parts
+
+    __sub__ = difference
+
+    def __eq__(self, other):
+        if not isinstance(other, TimeInterval):
+            return NotImplemented
+        return self.start_us == other.start_us and \
+            self.end_us == other.end_us
+
+    def __ne__(self, other):
+        if not isinstance(other, TimeInterval):
+            return NotImplemented
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.start_us, self.end_us))
+
+    def __repr__(self):
+        return "<TimeInterval [%s, %s)>" % (self.start.iso, self.end.iso)
+
+
+def _bounds_us(start, end):
+    if isinstance(start, TimeInterval):
+        return start.start_us, start.end_us
+    return _to_us(start), _to_us(end)
+
+
+class IntervalIndex(object):
+    """Payloads of intervals, with overlap queries in O(log n + k)
+
+    Intervals are sorted by start, and seen as an implicit balanced
+    binary tree over this order, each node keeping the greatest end of
+    its subtree. Building is a sort and linear passes, and is done again
+    at the next query after intervals are added.
+
+    ``items`` are ``(interval, payload)`` pairs, intervals being
+    ``TimeInterval`` or ``(start, end)``. Results are sorted by start.
+
+        >>> index = IntervalIndex.from_us([0, 5, 2], [10, 6, 3])
+        >>> [(i.start_us, i.end_us) for i, payload in index.at(
+        ...     Time.from_timestamp_us(5))]
+        [(0, 10), (5, 6)]
+        >>> len(index)
+        3
+
+    """
+
+    def __init__(self, items=()):
+        self._starts = us_array()
+        self._ends = us_array()
+        self._payloads = []
+        self._dirty = False
+        self.update(items)
+
+    @classmethod
+    def from_us(cls, starts, ends, payloads=None):
+        """Build an index from sequences of UTC epoch microseconds
+
+        ``payloads`` defaults to None for each interval.
+
+        """
+        index = cls()
+        index._starts.extend(starts)
+        index._ends.extend(ends)
+        index._payloads = list(payloads) if payloads is not None \
+            else [None] * len(index._starts)
+        index._dirty = True
+        return index
+
+    def add(self, interval, payload=None):
+        """Add ``payload`` on ``interval``"""
+
+        if not isinstance(interval, TimeInterval):
+            interval = TimeInterval(*interval)
+        self._starts.append(interval.start_us)
+        self._ends.append(interval.end_us)
+        self._payloads.append(payload)
+        self._dirty = True
+
+    def update(self, items):
+        """Add ``(interval, payload)`` pairs"""
+
+        for interval, payload in items:
+            self.add(interval, payload)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _build(self):
+        """Sort intervals by start, and compute greatest ends of subtrees"""
+
+        starts, ends, payloads = self._starts, self._ends, self._payloads
+        n = len(starts)
+        np = sys.modules.get("numpy")
+        if np is not None and n:
+            ## sorting is much faster with numpy, when it is already used
+            np_starts = np.asarray(starts, dtype=np.int64)
+            order = np.argsort(np_starts, kind="stable")
+            starts = self._starts = us_array(np_starts[order])
+            ends = self._ends = us_array(
+                np.asarray(ends, dtype=np.int64)[order])
+            order = order.tolist()
+        else:
+            order = sorted(range(n), key=starts.__getitem__)
+            starts = self._starts = us_array(map(starts.__getitem__, order))
+            ends = self._ends = us_array(map(ends.__getitem__, order))
+        self._payloads = list(map(payloads.__getitem__, order))
+        ## nodes of level k are at indexes whose k lowest bits are 1
+        max_ends = self._max_ends = us_array(ends)
+        self._root_level = -1
+        self._dirty = False
+        if not n:
+            return
+        last_i = (n - 1) & ~1
+        last = ends[last_i]
+        level = 1
+        while 1 << level <= n:
+            half = 1 << (level - 1)
+            for i in range((half << 1) - 1, n, half << 2):
+                right = max_ends[i + half] if i + half < n else last
+                max_ends[i] = max(ends[i], max_ends[i - half], right)
+            ## greatest end of the rightmost subtree of this level
+            last_i = last_i - half if last_i >> level & 1 else last_i + half
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            level += 1
+        self._root_level = level - 1
+
+    def _overlapping_idx(self, start_us, end_us):
+        """Return indexes of intervals overlapping ``[start_us, end_us)``"""
+
+        if self._dirty:
+            self._build()
+        starts, ends, max_ends = self._starts, self._ends, self._max_ends
+        n = len(starts)
+        res = []
+        if self._root_level < 0 or start_us >= end_us:
+            return res
+        level = self._root_level
+        ## (level, node, left subtree done)
+        stack = [(level, (1 << level) - 1, False)]
+        while stack:
+            level, node, left_done = stack.pop()
+            if level <= 3:
+                ## small subtree: scan it
+                first = node >> level << level
+                last = min(first + (1 << (level + 1)) - 1, n)
+                i = first
+                while i < last and starts[i] < end_us:
+                    if start_us < ends[i] and starts[i] < ends[i]:
+                        res.append(i)
+                    i += 1
+            elif not left_done:
+                stack.append((level, node, True))
+                left = node - (1 << (level - 1))
+                if left >= n or max_ends[left] > start_us:
+                    stack.append((level - 1, left, False))
+            elif node < n and starts[node] < end_us:
+                if start_us < ends[node] and starts[node] < ends[node]:
+                    res.append(node)
+                stack.append((level - 1, node + (1 << (level - 1)), False))
+        return res
+
+    def _entries(self, idxs):
+        starts, ends, payloads = self._starts, self._ends, self._payloads
+        new = TimeInterval.__new__
+        res = []
+        for i in idxs:
+            interval = new(TimeInterval)
+            interval.start_us = starts[i]
+            interval.end_us = ends[i]
+            res.append((interval, payloads[i]))
+        return res
+
+    def overlapping(self, start, end=None):
+        """Return ``(interval, payload)`` overlapping ``[start, end)``
+
+        ``start`` can also be a ``TimeInterval``.
+
+        """
+        return self._entries(self._overlapping_idx(*_bounds_us(start, end)))
+
+    def at(self, moment):
+        """Return ``(interval, payload)`` containing ``moment``"""
+
+        us = _to_us(moment)
+        return self._entries(self._overlapping_idx(us, us + 1))
+
+    def __iter__(self):
+        if self._dirty:
+            self._build()
+        return iter(self._entries(range(len(self._starts))))
+
+    def __repr__(self):
+        return "<IntervalIndex of %d intervals>" % len(self)
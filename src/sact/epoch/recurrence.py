@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Recurring moments, from cron expressions or intervals.
+
+``next_after()`` gives the first occurrence of a rule after a moment, by
+jumping from field to field of the wall time instead of trying moments
+one by one, and ``iter_occurrences()`` lazily gives occurrences from a
+start, included:
+
+    >>> from itertools import islice
+    >>> from sact.epoch import Time, TzOffset
+    >>> from sact.epoch.recurrence import next_after, iter_occurrences
+
+    >>> next_after("30 2 * * 1-5", Time(2010, 1, 1, 12))
+    <Time 2010-01-04 02:30:00+00:00>
+    >>> list(islice(iter_occurrences("*/15 * * * *", Time(2010, 1, 1, 0, 20),
+    ...                              TzOffset(3600)), 3))
+    [<Time 2010-01-01 01:30:00+01:00>, <Time 2010-01-01 01:45:00+01:00>, <Time 2010-01-01 02:00:00+01:00>]
+
+Occurrences are given in ``tz``, by default the timezone of the start,
+which is also the timezone of the wall times of cron expressions.
+
+Rules
+-----
+
+Cron expressions have the 5 usual fields (minute, hour, day of month,
+month, day of week), with lists, ranges, steps and english names. As in
+cron, when both days of month and days of week are restricted, a day
+matching either is used:
+
+    >>> next_after("0 12 13 * fri", Time(2010, 1, 1))
+    <Time 2010-01-01 12:00:00+00:00>
+    >>> next_after("@monthly", Time(2010, 1, 1))
+    <Time 2010-02-01 00:00:00+00:00>
+
+Intervals are units of ``sact.epoch.rounding``, optionally prefixed with
+``every``. Occurrences are the boundaries of their buckets, or are
+counted from ``start`` with ``IntervalRule(every, anchor=start)``:
+
+    >>> next_after("every 15m", Time(2010, 1, 1, 0, 20))
+    <Time 2010-01-01 00:30:00+00:00>
+    >>> from sact.epoch.recurrence import IntervalRule
+    >>> next_after(IntervalRule("90s", anchor=Time(2010, 1, 1, 0, 0, 10)),
+    ...            Time(2010, 1, 1, 0, 5))
+    <Time 2010-01-01 00:06:10+00:00>
+
+Changes of offset
+-----------------
+
+Cron wall times skipped by a change of offset fire once, at the moment
+the same wall time would have with the offset before the change. Wall
+times repeated by a change of offset fire once, at their first
+occurrence:
+
+    >>> import os
+    >>> from sact.epoch.timezone import TzSystem, tzset
+    >>> tz = os.environ.get("TZ")
+    >>> os.environ["TZ"] = "Europe/Paris"
+    >>> tzset()
+
+    >>> for t in iter_occurrences("30 2 * * *", Time(2010, 3, 27),
+    ...                           TzSystem(), stop=Time(2010, 3, 30)):
+    ...     print(t.iso)
+    2010-03-27 02:30:00+01:00
+    2010-03-28 03:30:00+02:00
+    2010-03-29 02:30:00+02:00
+    >>> for t in iter_occurrences("30 * * * *", Time(2010, 10, 30, 23),
+    ...                           TzSystem(), stop=Time(2010, 10, 31, 3)):
+    ...     print(t.iso)
+    2010-10-31 01:30:00+02:00
+    2010-10-31 02:30:00+02:00
+    2010-10-31 03:30:00+01:00
+
+Intervals of fixed units go on through changes of offset:
+
+    >>> for t in iter_occurrences("1h", Time(2010, 10, 31), TzSystem(),
+    ...                           stop=Time(2010, 10, 31, 3)):
+    ...     print(t.iso)
+    2010-10-31 02:00:00+02:00
+    2010-10-31 02:00:00+01:00
+    2010-10-31 03:00:00+01:00
+
+Wall times follow changes of ``TZ`` once ``tzset()`` is called:
+
+    >>> os.environ["TZ"] = "America/New_York"
+    >>> tzset()
+    >>> next_after("30 2 * * *", Time(2010, 3, 27, tzinfo=TzSystem()))
+    <Time 2010-03-27 02:30:00-04:00>
+
+    >>> if tz is None:
+    ...     del os.environ["TZ"]
+    ... else:
+    ...     os.environ["TZ"] = tz
+    >>> tzset()
+
+"""
+
+import calendar
+import datetime
+from bisect import bisect_left
+
+from .clock import Time, basestring
+from .rounding import _parse_unit, _rounder
+from .timezone import UTC
+from .utils import _to_us, _EPOCH_ORDINAL, US_PER_DAY, _utc_offset_us, \
+    _wall_offset_us
+
+
+US_PER_MINUTE = 60 * 1000000
+
+US_PER_HOUR = 60 * US_PER_MINUTE
+
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun",
+                "jul", "aug", "sep", "oct", "nov", "dec"]
+
+_DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+## (name, first, last, names of values from first) of cron fields
+_FIELDS = [
+    ("minute", 0, 59, None),
+    ("hour", 0, 23, None),
+    ("day of month", 1, 31, None),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("day of week", 0, 7, _DAY_NAMES),
+]
+
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+## Years searched for an occurrence before giving up, a whole cycle of
+## the gregorian calendar
+_MAX_YEARS = 400
+
+
+def _field_value(text, first, names):
+    text = text.lower()
+    if names is not None and text in names:
+        return first + names.index(text)
+    return int(text)
+
+
+def _parse_field(text, name, first, last, names):
+    """Return the sorted list of values of a cron field"""
+
+    values = set()
+    for item in text.split(","):
+        step = 1
+        if "/" in item:
+            item, step = item.split("/", 1)
+            step = int(step)
+        if item == "*":
+            lo, hi = first, last
+        elif "-" in item:
+            lo, hi = item.split("-", 1)
+            lo, hi = _field_value(lo, first, names), \
+                _field_value(hi, first, names)
+        else:
+            lo = _field_value(item, first, names)
+            hi = last if step != 1 else lo
+        if not first <= lo <= hi <= last or step < 1:
+            raise ValueError("Invalid %s %r." % (name, text))
+        values.update(range(lo, hi + 1, step))
+    return sorted(values)
+
+
+_tz_offsets = {}
+
+
+def _offsets(tz):
+    """Return cached offset functions of ``tz`` at UTC and wall times"""
+
+    ## as rounders, offsets of ``TzSystem`` are left aside once it is
+    ## refreshed
+    key = tz, getattr(tz, "generation", None)
+    try:
+        res = _tz_offsets.get(key)
+    except TypeError:
+        ## unhashable timezones, as the ones of dateutil, are not cached
+        return _utc_offset_us(tz), _wall_offset_us(tz)
+    if res is None:
+        if len(_tz_offsets) > 1024:
+            _tz_offsets.clear()
+        res = _tz_offsets[key] = _utc_offset_us(tz), _wall_offset_us(tz)
+    return res
+
+
+class CronRule(object):
+    """Wall times matching a cron expression
+
+        >>> CronRule("*/20 8-18/2 * jan-mar,dec mon,sun")
+        <CronRule '*/20 8-18/2 * jan-mar,dec mon,sun'>
+        >>> CronRule("0 24 * * *")
+        Traceback (most recent call last):
+        ...
+        ValueError: Invalid hour '24'.
+        >>> CronRule("0 0 * *")
+        Traceback (most recent call last):
+        ...
+        ValueError: Expected 5 fields in cron expression '0 0 * *'.
+
+    """
+
+    def __init__(self, expr):
+        self.expr = expr
+        fields = _ALIASES.get(expr.strip().lower(), expr).split()
+        if len(fields) != 5:
+            raise ValueError("Expected 5 fields in cron expression %r."
+                             % (expr, ))
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            _parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)]
+        ## 7 is sunday too
+        weekdays = self.weekdays = set(day % 7 for day in weekdays)
+        ## as in cron, days match either field only when neither starts
+        ## with a star
+        self.either_day = not fields[2].startswith("*") and \
+            not fields[4].startswith("*")
+        ## number of days from each weekday to the next matching one
+        self._to_weekday = [min((day - weekday) % 7 for day in weekdays)
+                            for weekday in range(7)]
+
+    def _next_day(self, year, month, day):
+        """Return the first matching day from ``day`` in month, or None"""
+
+        last = calendar.monthrange(year, month)[1]
+        if day > last:
+            return None
+        ## cron weekdays start on sunday
+        weekday = (datetime.date(year, month, day).weekday() + 1) % 7
+        idx = bisect_left(self.days, day)
+        if self.either_day:
+            res = min(self.days[idx] if idx < len(self.days) else last + 1,
+                      day + self._to_weekday[weekday])
+            return res if res <= last else None
+        for found in self.days[idx:]:
+            if found > last:
+                break
+            if (weekday + found - day) % 7 in self.weekdays:
+                return found
+        return None
+
+    def _next_wall(self, wall_us):
+        """Return the first matching wall time from ``wall_us``, or None"""
+
+        date = datetime.date.fromordinal(wall_us // US_PER_DAY +
+                                         _EPOCH_ORDINAL)
+        year, month, day = date.year, date.month, date.day
+        hour = wall_us % US_PER_DAY // US_PER_HOUR
+        minute = wall_us % US_PER_HOUR // US_PER_MINUTE
+        months, hours, minutes = self.months, self.hours, self.minutes
+        last_year = year + _MAX_YEARS
+        while year <= last_year:
+            idx = bisect_left(months, month)
+            if idx == len(months):
+                year, month, day, hour, minute = year + 1, months[0], 1, 0, 0
+                continue
+            if months[idx] != month:
+                month, day, hour, minute = months[idx], 1, 0, 0
+            found = self._next_day(year, month, day)
+            if found is None:
+                year, month = (year + 1, 1) if month == 12 \
+                    else (year, month + 1)
+                day, hour, minute = 1, 0, 0
+                continue
+            if found != day:
+                day, hour, minute = found, 0, 0
+            idx = bisect_left(hours, hour)
+            if idx == len(hours):
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if hours[idx] != hour:
+                hour, minute = hours[idx], 0
+            idx = bisect_left(minutes, minute)
+            if idx == len(minutes):
+                hour, minute = hour + 1, 0
+                continue
+            if year > datetime.MAXYEAR:
+                return None
+            return ((datetime.date(year, month, day).toordinal() -
+                     _EPOCH_ORDINAL) * US_PER_DAY + hour * US_PER_HOUR +
+                    minutes[idx] * US_PER_MINUTE)
+        return None
+
+    def next_after_us(self, us, tz):
+        """Return UTC microseconds of the first occurrence after ``us``"""
+
+        utc_offset, wall_offset = _offsets(tz)
+        wall_us = us + utc_offset(us)
+        wall_us = wall_us - wall_us % US_PER_MINUTE + US_PER_MINUTE
+        while True:
+            try:
+                wall_us = self._next_wall(wall_us)
+            except ValueError:
+                ## out of datetime years
+                return None
+            if wall_us is None:
+                return None
+            res = wall_us - wall_offset(wall_us)
+            ## repeated wall times were already there before ``us``
+            if res > us:
+                return res
+            wall_us += US_PER_MINUTE
+
+    def __repr__(self):
+        return "<CronRule %r>" % (self.expr, )
+
+
+class IntervalRule(object):
+    """Moments separated by ``every``, a unit of ``sact.epoch.rounding``
+
+    Without ``anchor``, occurrences are the boundaries of buckets of
+    ``every``, following the calendar of the timezone for calendar units.
+    With ``anchor``, they are the moments ``anchor + k * every``, for
+    fixed units only.
+
+    """
+
+    def __init__(self, every, anchor=None):
+        self.every = every
+        kind, self.every_us = _parse_unit(every)
+        self.anchor_us = None if anchor is None else _to_us(anchor)
+        if anchor is not None and kind != "fixed":
+            raise ValueError("Anchored intervals need fixed units of time.")
+
+    def next_after_us(self, us, tz):
+        """Return UTC microseconds of the first occurrence after ``us``"""
+
+        if self.anchor_us is None:
+            return _rounder(self.every, tz).bounds(us)[1]
+        return us + self.every_us - (us - self.anchor_us) % self.every_us
+
+    def __repr__(self):
+        return "<IntervalRule every %r>" % (self.every, )
+
+
+_rules = {}
+
+
+def parse_rule(rule):
+    """Return the rule object of a cron expression or an interval
+
+    Rule objects are returned as they are.
+
+        >>> from sact.epoch.recurrence import parse_rule
+        >>> parse_rule("0 0 * * *"), parse_rule("every 1d")
+        (<CronRule '0 0 * * *'>, <IntervalRule every '1d'>)
+
+    """
+    if not isinstance(rule, basestring):
+        return rule
+    res = _rules.get(rule)
+    if res is None:
+        text = rule.strip()
+        if text.startswith("@") or len(text.split()) == 5:
+            res = CronRule(text)
+        else:
+            if text.lower().startswith("every "):
+                text = text[6:].strip()
+            res = IntervalRule(text)
+        if len(_rules) > 10000:
+            _rules.clear()
+        _rules[rule] = res
+    return res
+
+
+def next_after(rule, t, tz=None):
+    """Return the first occurrence of ``rule`` strictly after ``t``
+
+    ``t`` is a ``Time``, a ``datetime`` or a timestamp, and ``tz``
+    defaults to its timezone, or UTC. Returns None when there is none.
+
+    """
+    if tz is None:
+        tz = getattr(t, "tzinfo", None) or UTC()
+    us = parse_rule(rule).next_after_us(_to_us(t), tz)
+    return None if us is None else Time.from_timestamp_us(us).astimezone(tz)
+
+
+def iter_occurrences(rule, start, tz=None, stop=None, as_us=False):
+    """Yield occurrences of ``rule`` from ``start`` included
+
+    Occurrences are yielded lazily, and until ``stop`` excluded when
+    given. ``tz`` is as for ``next_after()``. With ``as_us``, UTC epoch
+    microseconds are yielded instead of ``Time``.
+
+    """
+    if tz is None:
+        tz = getattr(start, "tzinfo", None) or UTC()
+    rule = parse_rule(rule)
+    us = _to_us(start) - 1
+    stop_us = None if stop is None else _to_us(stop)
+    while True:
+        us = rule.next_after_us(us, tz)
+        if us is None or stop_us is not None and us >= stop_us:
+            return
+        yield us if as_us else Time.from_timestamp_us(us).astimezone(tz)
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Rounding of moments down or up to a unit of time.
+
+Units are given as ``"<n><unit>"`` strings, ``n`` defaulting to 1, or as
+``timedelta``:
+
+    >>> from sact.epoch import Time, TzOffset
+    >>> from sact.epoch.rounding import floor, ceil, bucket
+
+    >>> t = Time(2010, 1, 1, 12, 34, 56, 789)
+    >>> floor(t, "15m"), ceil(t, "5s")
+    (<Time 2010-01-01 12:30:00+00:00>, <Time 2010-01-01 12:35:00+00:00>)
+    >>> import datetime
+    >>> floor(t, datetime.timedelta(milliseconds=250))
+    <Time 2010-01-01 12:34:56+00:00>
+
+Moments already on a boundary are left as they are:
+
+    >>> ceil(Time(2010, 1, 1), "1h")
+    <Time 2010-01-01 00:00:00+00:00>
+
+``bucket()`` gives the whole ``TimeInterval`` containing the moment:
+
+    >>> bucket(t, "1h")
+    <TimeInterval [2010-01-01 12:00:00+00:00, 2010-01-01 13:00:00+00:00)>
+
+Units of ``us``, ``ms``, ``s``, ``m`` (or ``min``) and ``h`` are fixed
+durations. They are counted on the wall clock of the timezone, by default
+the one of the value, using the offset of the moment itself: buckets are
+always of the given duration, and the result stays in the timezone:
+
+    >>> floor(Time(2010, 1, 1, 12, 34, tzinfo=TzOffset(-1800)), "1h")
+    <Time 2010-01-01 12:00:00-00:30>
+
+Calendar units
+--------------
+
+Units of ``d``, ``w`` (weeks starting on monday), ``mo`` and ``y`` follow
+the calendar of the timezone, and the UTC moments of their boundaries are
+kept in tables for each timezone. Days are not always 24 hours long:
+
+    >>> from sact.epoch.timezone import TzSystem, tzset
+    >>> import os
+    >>> tz = os.environ.get("TZ")
+    >>> os.environ["TZ"] = "Europe/Paris"
+    >>> tzset()
+
+    >>> dst = bucket(Time(2010, 3, 28, 12), "1d", tz=TzSystem())
+    >>> dst.duration
+    datetime.timedelta(seconds=82800)
+    >>> floor(Time(2010, 3, 28, 12), "1d", tz=TzSystem())
+    <Time 2010-03-28 00:00:00+01:00>
+    >>> ceil(Time(2010, 3, 28, 12), "1mo", tz=TzSystem())
+    <Time 2010-04-01 00:00:00+02:00>
+
+Boundaries follow changes of ``TZ`` once ``tzset()`` is called:
+
+    >>> os.environ["TZ"] = "America/New_York"
+    >>> tzset()
+    >>> floor(Time(2010, 3, 28, 12), "1d", tz=TzSystem())
+    <Time 2010-03-28 00:00:00-04:00>
+
+    >>> if tz is None:
+    ...     del os.environ["TZ"]
+    ... else:
+    ...     os.environ["TZ"] = tz
+    >>> tzset()
+
+Multiples of days count from 1970-01-01, of weeks from monday
+1969-12-29, and of months from january 1970:
+
+    >>> floor(Time(2010, 5, 17, 12), "3mo"), floor(Time(2010, 5, 17), "2w")
+    (<Time 2010-04-01 00:00:00+00:00>, <Time 2010-05-10 00:00:00+00:00>)
+
+Batches
+-------
+
+Sequences give lists. Arrays of ``utils.us_array()`` and ``numpy``
+integer arrays are UTC epoch microseconds, and give arrays of the same
+type, which are computed without any ``Time`` object:
+
+    >>> from sact.epoch.utils import us_array
+    >>> list(floor(us_array([1500000, -1]), "1s"))
+    [1000000, -1000000]
+    >>> floor([Time(2010, 1, 1, 0, 30), Time(2010, 1, 1, 1, 30)], "1h")
+    [<Time 2010-01-01 00:00:00+00:00>, <Time 2010-01-01 01:00:00+00:00>]
+
+``bucket()`` of arrays gives the arrays of starts and of ends of buckets,
+ready for ``IntervalIndex.from_us()``:
+
+    >>> [list(values) for values in bucket(us_array([1500000]), "1s")]
+    [[1000000], [2000000]]
+
+``TimeArray`` values keep their timezone:
+
+    >>> from sact.epoch import TimeArray
+    >>> floor(TimeArray([t], tz=TzOffset(3600)), "1d")
+    <TimeArray ['2010-01-01 00:00:00+01:00']>
+
+"""
+
+import datetime
+import re
+import sys
+from array import array
+
+from .clock import Time
+from .interval import TimeInterval
+from .timezone import UTC
+from .utils import dt2us, us_array, _to_us, _EPOCH_ORDINAL, US_PER_SECOND, \
+    US_PER_DAY, _FIXED_TZ, _ONE_US, _utc_offset_us, _wall_offset_us
+
+try:
+    from .timearray import TimeArray, _utcoffsets
+except ImportError:  ## pragma: no cover
+    ## numpy is not available
+    TimeArray = None
+
+
+## Microseconds of fixed units
+_FIXED_UNITS = {
+    "us": 1,
+    "ms": 1000,
+    "s": US_PER_SECOND,
+    "m": 60 * US_PER_SECOND,
+    "min": 60 * US_PER_SECOND,
+    "h": 3600 * US_PER_SECOND,
+}
+
+## Calendar units, as (kind, multiplier)
+_CALENDAR_UNITS = {
+    "d": ("day", 1),
+    "w": ("day", 7),
+    "mo": ("month", 1),
+    "y": ("month", 12),
+}
+
+_UNIT_RE = re.compile(r"^\s*(\d*)\s*([a-z]+)\s*$")
+
+## 1970-01-01 is a thursday, weeks start 3 days before
+_WEEK_SHIFT = 3
+
+## Maximum number of boundaries and of rounders kept in caches
+_MAX_CACHED_BOUNDARIES = 100000
+_MAX_CACHED_ROUNDERS = 1024
+
+
+class _Rounder(object):
+    """Bounds of buckets of a unit in a timezone, in UTC epoch microseconds
+
+    Calendar buckets are numbered, and the UTC moments of their starts
+    are cached. As offsets are less than a day, the bucket holding a UTC
+    moment is next to the one of this moment read as wall time.
+
+    """
+
+    def __init__(self, unit, tz):
+        self.tz = tz
+        self.kind, self.size = _parse_unit(unit)
+        self.shift = _WEEK_SHIFT if self.kind == "day" and \
+            not self.size % 7 else 0
+        self._utc_offset = _utc_offset_us(tz)
+        self._wall_offset = _wall_offset_us(tz)
+        ## UTC microseconds of the start of calendar buckets, by index
+        self._starts = {}
+
+    def index(self, wall_us):
+        """Return the index of the calendar bucket of ``wall_us``"""
+
+        days = wall_us // US_PER_DAY
+        if self.kind == "day":
+            return (days + self.shift) // self.size
+        date = datetime.date.fromordinal(days + _EPOCH_ORDINAL)
+        return ((date.year - 1970) * 12 + date.month - 1) // self.size
+
+    def np_index(self, wall_us):
+        """Return ``index()`` of a numpy array of wall microseconds"""
+
+        if self.kind == "day":
+            return (wall_us // US_PER_DAY + self.shift) // self.size
+        months = wall_us.view("datetime64[us]").astype("datetime64[M]")
+        return months.view(wall_us.dtype) // self.size
+
+    def start(self, index):
+        """Return the UTC microseconds of the calendar bucket ``index``"""
+
+        res = self._starts.get(index)
+        if res is not None:
+            return res
+        if self.kind == "day":
+            days = index * self.size - self.shift
+        else:
+            months = index * self.size
+            days = datetime.date(1970 + months // 12, months % 12 + 1,
+                                 1).toordinal() - _EPOCH_ORDINAL
+        wall_us = days * US_PER_DAY
+        if len(self._starts) > _MAX_CACHED_BOUNDARIES:
+            self._starts.clear()
+        res = self._starts[index] = wall_us - self._wall_offset(wall_us)
+        return res
+
+    def bounds(self, us):
+        """Return the UTC microseconds of the bucket holding ``us``"""
+
+        if self.kind == "fixed":
+            start = us - (us + self._utc_offset(us)) % self.size
+            return start, start + self.size
+        index = self.index(us)
+        start = self.start(index)
+        while start > us:
+            index -= 1
+            start = self.start(index)
+        end = self.start(index + 1)
+        ## wall times repeated after the start of the next bucket belong
+        ## to this one
+        while end <= us:
+            index += 1
+            start, end = end, self.start(index + 1)
+        return start, end
+
+    def np_bounds(self, us):
+        """Return ``bounds()`` of a numpy array of UTC microseconds"""
+
+        np = sys.modules["numpy"]
+        if self.kind == "fixed":
+            start = us - (us + _utcoffsets(self.tz, us)) % self.size
+            return start, start + self.size
+        indexes = np.unique(self.np_index(us))
+        ## buckets around the ones of values read as wall times
+        indexes = np.unique(np.concatenate(
+            [indexes - 1, indexes, indexes + 1, indexes + 2]))
+        starts = np.array([self.start(int(i)) for i in indexes],
+                          dtype=np.int64)
+        pos = np.searchsorted(starts, us, side="right") - 1
+        return starts[pos], starts[pos + 1]
+
+
+_units = {}
+
+
+def _parse_unit(unit):
+    """Return ``(kind, size)`` of a unit
+
+    ``kind`` is ``"fixed"`` with ``size`` in microseconds, or ``"day"`` or
+    ``"month"`` with ``size`` a number of days or months.
+
+        >>> from sact.epoch.rounding import _parse_unit
+        >>> _parse_unit("15m"), _parse_unit("w"), _parse_unit("2y")
+        (('fixed', 900000000), ('day', 7), ('month', 24))
+        >>> _parse_unit("1 fortnight")
+        Traceback (most recent call last):
+        ...
+        ValueError: Unknown unit of time '1 fortnight'.
+        >>> _parse_unit("0s")
+        Traceback (most recent call last):
+        ...
+        ValueError: Unit of time '0s' is not positive.
+
+    """
+    res = _units.get(unit)
+    if res is not None:
+        return res
+    if isinstance(unit, datetime.timedelta):
+        res = "fixed", unit // _ONE_US
+    else:
+        match = _UNIT_RE.match(unit)
+        if match is None or (match.group(2) not in _FIXED_UNITS and
+                             match.group(2) not in _CALENDAR_UNITS):
+            raise ValueError("Unknown unit of time %r." % (unit, ))
+        count, name = match.groups()
+        count = int(count) if count else 1
+        if name in _FIXED_UNITS:
+            res = "fixed", count * _FIXED_UNITS[name]
+        else:
+            kind, size = _CALENDAR_UNITS[name]
+            res = kind, count * size
+    if res[1] <= 0:
+        raise ValueError("Unit of time %r is not positive." % (unit, ))
+    if len(_units) > _MAX_CACHED_ROUNDERS:
+        _units.clear()
+    _units[unit] = res
+    return res
+
+
+_rounders = {}
+
+
+def _rounder(unit, tz):
+    """Return the cached ``_Rounder`` of ``unit`` in ``tz``"""
+
+    ## rounders of ``TzSystem`` are left aside once it is refreshed
+    key = unit, tz, getattr(tz, "generation", None)
+    try:
+        res = _rounders.get(key)
+    except TypeError:
+        ## unhashable timezones, as the ones of dateutil, are not cached
+        return _Rounder(unit, tz)
+    if res is None:
+        if len(_rounders) > _MAX_CACHED_ROUNDERS:
+            _rounders.clear()
+        res = _rounders[key] = _Rounder(unit, tz)
+    return res
+
+
+def _ceil(rounder, us):
+    start, end = rounder.bounds(us)
+    return us if start == us else end
+
+
+def _time(value, value_us, us, tz):
+    """Return ``us`` as a ``Time`` in ``tz``, ``value`` being ``value_us``"""
+
+    if isinstance(value, Time) and value.tzinfo is tz:
+        res = value - datetime.timedelta(microseconds=value_us - us)
+        ## wall time arithmetic is wrong across changes of offset
+        if isinstance(tz, _FIXED_TZ) or dt2us(res) == us:
+            return res
+    return Time.from_timestamp_us(us).astimezone(tz)
+
+
+def _apply(values, unit, tz, scalar, batch, np_batch):
+    """Dispatch ``values`` on functions of rounders and microseconds
+
+    ``scalar`` turns the rounder, value, microseconds and timezone of a
+    single value into the result. ``batch`` gives the result of a
+    ``us_array()``, and ``np_batch`` of a numpy array.
+
+    """
+    if isinstance(values, (datetime.datetime, int, float)):
+        if tz is None:
+            tz = getattr(values, "tzinfo", None) or UTC()
+        return scalar(_rounder(unit, tz), values, _to_us(values), tz)
+    if isinstance(values, array):
+        return batch(_rounder(unit, tz or UTC()), values)
+    if TimeArray is not None:
+        if isinstance(values, TimeArray):
+            tz = values.tz if tz is None else tz
+            res = np_batch(_rounder(unit, tz), values.us)
+            if isinstance(res, tuple):
+                return tuple(TimeArray.from_us(us, tz=tz) for us in res)
+            return TimeArray.from_us(res, tz=tz)
+        np = sys.modules["numpy"]
+        if isinstance(values, np.ndarray):
+            return np_batch(_rounder(unit, tz or UTC()),
+                            values.astype(np.int64, copy=False))
+    return [_apply(value, unit, tz, scalar, batch, np_batch)
+            for value in values]
+
+
+def floor(values, unit, tz=None):
+    """Return the start of the bucket of ``unit`` holding values
+
+    ``values`` are ``Time``, ``datetime`` (naive ones being UTC), or
+    timestamps in seconds, or sequences or arrays of them as described in
+    the module. ``tz`` defaults to the timezone of values, or UTC.
+
+    """
+    return _apply(
+        values, unit, tz,
+        lambda rounder, value, us, tz: _time(
+            value, us, rounder.bounds(us)[0], tz),
+        lambda rounder, us: us_array([rounder.bounds(x)[0] for x in us]),
+        lambda rounder, us: rounder.np_bounds(us)[0])
+
+
+def ceil(values, unit, tz=None):
+    """Return values rounded up to the end of their bucket of ``unit``
+
+    Values on the start of a bucket are kept. Arguments are as for
+    ``floor()``.
+
+    """
+    def np_batch(rounder, us):
+        np = sys.modules["numpy"]
+        starts, ends = rounder.np_bounds(us)
+        return np.where(starts == us, us, ends)
+    return _apply(
+        values, unit, tz,
+        lambda rounder, value, us, tz: _time(
+            value, us, _ceil(rounder, us), tz),
+        lambda rounder, us: us_array([_ceil(rounder, x) for x in us]),
+        np_batch)
+
+
+def bounds_us(us, unit, tz=None):
+    """Return UTC epoch microseconds of the bucket of ``unit`` holding ``us``
+
+    This is the integer core of ``bucket()``, ``tz`` defaulting to UTC.
+
+        >>> from sact.epoch.rounding import bounds_us
+        >>> bounds_us(1500000, "1s")
+        (1000000, 2000000)
+
+    """
+    return _rounder(unit, tz or UTC()).bounds(us)
+
+
+def bucket(values, unit, tz=None):
+    """Return the ``TimeInterval`` of ``unit`` holding values
+
+    Arrays give a pair of arrays of starts and ends. Arguments are as for
+    ``floor()``.
+
+    """
+    def batch(rounder, us):
+        starts, ends = us_array(), us_array()
+        for x in us:
+            start, end = rounder.bounds(x)
+            starts.append(start)
+            ends.append(end)
+        return starts, ends
+    return _apply(
+        values, unit, tz,
+        lambda rounder, value, us, tz: TimeInterval.from_us(
+            *rounder.bounds(us)),
+        batch,
+        lambda rounder, us: rounder.np_bounds(us))
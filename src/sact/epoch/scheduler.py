@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Timers scheduled on a clock.
+
+``Scheduler`` keeps timers in a hierarchical timing wheel: adding and
+cancelling a timer is O(1) whatever the number of timers, and only
+slots holding timers are visited when time goes on.
+
+It reads time from a given ``IClock``, which is also the clock of
+callbacks, or the current one (see ``sact.epoch.use_clock()``):
+
+    >>> from sact.epoch import Time
+    >>> from sact.epoch.clock import ManageableClock
+    >>> from sact.epoch.scheduler import Scheduler
+
+    >>> clock = ManageableClock()
+    >>> clock.stop()
+    >>> clock.ts = 0
+    >>> scheduler = Scheduler(clock)
+
+Timers are given a moment (``Time`` or timestamp) or a delay (seconds or
+``timedelta``):
+
+    >>> fired = []
+    >>> def report(label):
+    ...     fired.append((label, Time.now().timestamp))
+
+    >>> import datetime
+    >>> t1 = scheduler.call_later(30, report, 'b')
+    >>> t2 = scheduler.call_at(Time(1970, 1, 1, 0, 0, 10), report, 'a')
+    >>> t3 = scheduler.call_later(datetime.timedelta(hours=2), report, 'c')
+    >>> t4 = scheduler.call_later(60, report, 'cancelled')
+    >>> t4.cancel()
+    >>> len(scheduler)
+    3
+
+With a ``ManageableClock``, ``advance()`` moves the clock and fires due
+timers in order, the clock being set at each timer's moment:
+
+    >>> scheduler.advance(3600)
+    >>> fired
+    [('a', 10), ('b', 30)]
+    >>> clock.ts
+    3600
+
+    >>> scheduler.advance(datetime.timedelta(days=1))
+    >>> fired[-1]
+    ('c', 7200)
+    >>> len(scheduler)
+    0
+
+With any clock, ``run_pending()`` fires timers due at current time of
+the clock:
+
+    >>> t = scheduler.call_later(5, report, 'd')
+    >>> clock.wait(4)
+    >>> scheduler.run_pending()
+    0
+    >>> clock.wait(1)
+    >>> scheduler.run_pending()
+    1
+    >>> fired[-1]
+    ('d', 90005)
+
+Callbacks can schedule new timers, due ones are fired in the same run:
+
+    >>> def chain(n):
+    ...     fired.append(('chain', n))
+    ...     if n:
+    ...         scheduler.call_later(0, chain, n - 1)
+    >>> t = scheduler.call_later(1, chain, 2)
+    >>> scheduler.advance(1)
+    >>> fired[-3:]
+    [('chain', 2), ('chain', 1), ('chain', 0)]
+
+"""
+
+from .clock import Time, current_clock
+from .context import use_clock
+from .utils import _to_us, _delay_us
+
+
+class Timer(object):
+    """Handle on a scheduled callback"""
+
+    __slots__ = ("when_us", "tick", "seq", "callback", "args",
+                 "cancelled", "_scheduler", "_slot", "_level")
+
+    def __init__(self, scheduler, when_us, tick, seq, callback, args):
+        self.when_us = when_us
+        self.tick = tick
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+        self._slot = None
+        self._level = None
+
+    @property
+    def when(self):
+        """Moment of the timer, as a ``Time``"""
+
+        return Time.from_timestamp_us(self.when_us)
+
+    def cancel(self):
+        """Unschedule the timer, if not already fired"""
+
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self._slot is not None:
+            self._scheduler._remove(self)
+
+    def __repr__(self):
+        return "<Timer %s %r>" % (self.when.iso, self.callback)
+
+
+class Scheduler(object):
+    """Hierarchical timing wheel of timers
+
+    Time is cut in ticks of ``resolution`` seconds. Each of the
+    ``levels`` wheels has ``slots`` slots (a power of 2), a slot of a
+    wheel spanning a whole turn of the wheel below. Timers further than
+    the last wheel are kept aside until it is their turn.
+
+    """
+
+    def __init__(self, clock=None, resolution=1, slots=256, levels=4):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError("slots must be a power of 2, got %r." % slots)
+        self.clock = clock
+        self.resolution_us = max(_delay_us(resolution), 1)
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._levels = levels
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        ## number of timers per level, the last one being for timers
+        ## beyond the wheels
+        self._counts = [0] * (levels + 1)
+        self._overflow = {}
+        ## timers of past ticks, fired as soon as they are due
+        self._pending = {}
+        self._seq = 0
+        self._current = self._now_us() // self.resolution_us
+
+    def _clock(self):
+        return current_clock() if self.clock is None else self.clock
+
+    def _now_us(self):
+        return self._clock().ts_ns // 1000
+
+    def __len__(self):
+        return sum(self._counts) + len(self._pending)
+
+    ##
+    ## Adding and removing timers
+    ##
+
+    def call_at(self, when, callback, *args):
+        """Call ``callback(*args)`` at ``when`` (datetime or timestamp)"""
+
+        return self._add(_to_us(when), callback, args)
+
+    def call_later(self, delay, callback, *args):
+        """Call ``callback(*args)`` after ``delay`` (seconds or timedelta)"""
+
+        return self._add(self._now_us() + _delay_us(delay), callback, args)
+
+    def _add(self, when_us, callback, args):
+        self._seq += 1
+        timer = Timer(self, when_us, when_us // self.resolution_us,
+                      self._seq, callback, args)
+        self._place(timer)
+        return timer
+
+    def _place(self, timer):
+        tick = timer.tick
+        current = self._current
+        if tick <= current:
+            slot, level = self._pending, None
+        else:
+            ## highest group of bits where the tick differs from current
+            level = ((tick ^ current).bit_length() - 1) // self._bits
+            if level >= self._levels:
+                slot, level = self._overflow, self._levels
+            else:
+                slot = self._wheels[level][
+                    (tick >> (self._bits * level)) & self._mask]
+            self._counts[level] += 1
+        slot[timer] = None
+        timer._slot = slot
+        timer._level = level
+
+    def _remove(self, timer):
+        del timer._slot[timer]
+        if timer._level is not None:
+            self._counts[timer._level] -= 1
+        timer._slot = None
+
+    ##
+    ## Going forward
+    ##
+
+    def _next_tick(self):
+        """Return the next tick where timers are to be moved, or None"""
+
+        current = self._current
+        for level in range(self._levels):
+            if not self._counts[level]:
+                continue
+            shift = self._bits * level
+            wheel = self._wheels[level]
+            for idx in range((current >> shift & self._mask) + 1,
+                             self._mask + 1):
+                if wheel[idx]:
+                    ## timers of lower levels are always sooner
+                    return (current >> (shift + self._bits)
+                            << (shift + self._bits)) | (idx << shift)
+        if self._counts[self._levels]:
+            shift = self._bits * self._levels
+            return min(timer.tick for timer in self._overflow) \
+                >> shift << shift
+        return None
+
+    def _move_to(self, tick):
+        """Set current tick, and cascade timers down the wheels"""
+
+        self._current = tick
+        shift = self._bits * self._levels
+        if not tick & ((1 << shift) - 1) and self._overflow:
+            self._cascade(self._overflow)
+        for level in range(self._levels - 1, -1, -1):
+            shift = self._bits * level
+            if not tick & ((1 << shift) - 1):
+                slot = self._wheels[level][tick >> shift & self._mask]
+                if slot:
+                    self._cascade(slot)
+
+    def _cascade(self, slot):
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            self._counts[timer._level] -= 1
+            self._place(timer)
+
+    def _fire_pending(self, now_us, before_fire=None):
+        fired = 0
+        pending = self._pending
+        while pending:
+            due = sorted((timer for timer in pending
+                          if timer.when_us <= now_us),
+                         key=lambda timer: (timer.when_us, timer.seq))
+            if not due:
+                break
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                self._remove(timer)
+                if before_fire is not None:
+                    before_fire(timer)
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+    def _run(self, now_us, before_fire=None):
+        if self.clock is None:
+            return self._run_timers(now_us, before_fire)
+        with use_clock(self.clock):
+            return self._run_timers(now_us, before_fire)
+
+    def _run_timers(self, now_us, before_fire=None):
+        target = now_us // self.resolution_us
+        fired = self._fire_pending(now_us, before_fire)
+        while True:
+            tick = self._next_tick()
+            if tick is None or tick > target:
+                break
+            self._move_to(tick)
+            fired += self._fire_pending(now_us, before_fire)
+        if target > self._current:
+            self._current = target
+        return fired
+
+    def run_pending(self):
+        """Fire timers due at current time of the clock, in order
+
+        Returns the number of timers fired.
+
+        """
+        return self._run(self._now_us())
+
+    def advance(self, delay):
+        """Move the clock forward of ``delay`` while firing due timers
+
+        The clock must be a ``ManageableClock``, it is set at the moment
+        of each timer before calling it.
+
+        """
+        clock = self._clock()
+        target_ns = clock.ts_ns + _delay_us(delay) * 1000
+
+        def before_fire(timer):
+            if timer.when_us * 1000 > clock.ts_ns:
+                clock.ts_ns = timer.when_us * 1000
+
+        self._run(target_ns // 1000, before_fire)
+        if target_ns > clock.ts_ns:
+            clock.ts_ns = target_ns
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Extraction of timestamps from large files.
+
+``iter_timestamps()`` memory-maps a file and looks for a ``strptime()``
+format at the start of each line. Lines are never decoded: the regex of
+the ``StrptimeParser`` of the format runs on the raw bytes, and only
+matched timestamps are converted:
+
+    >>> import io
+    >>> from sact.epoch import UTC, TzOffset
+    >>> from sact.epoch.stream import iter_timestamps, iter_chunks
+
+    >>> log = (b'2010-01-02 03:04:05.5 first\\n'
+    ...        b'  continued line\\n'
+    ...        b'2010-01-02 03:04:06.25 second\\n')
+    >>> list(iter_timestamps(log, '%Y-%m-%d %H:%M:%S.%f', UTC()))
+    [(0, 1262401445500000), (45, 1262401446250000)]
+
+Values are UTC epoch microseconds, paired with the offset of the match in
+the file. The wall time of the file is interpreted in ``hint_src_tz``,
+as for ``Time.strptime()``. ``Time`` objects can be asked for instead:
+
+    >>> list(iter_timestamps(io.BytesIO(log), '%Y-%m-%d %H:%M:%S',
+    ...                      TzOffset(3600), as_time=True))
+    [(0, <Time 2010-01-02 02:04:05+00:00>), (45, <Time 2010-01-02 02:04:06+00:00>)]
+
+Fields missing from the format are taken from ``relative``, as for
+``Time.strptime()``:
+
+    >>> from sact.epoch import Time
+    >>> syslog = b'Jan  2 03:04:05 host: message\\n'
+    >>> list(iter_timestamps(syslog, '%b %d %H:%M:%S', UTC(),
+    ...                      relative=Time(2010, 6, 1), as_time=True))
+    [(0, <Time 2010-01-02 03:04:05+00:00>)]
+
+With ``search``, timestamps are looked for anywhere in lines:
+
+    >>> line = b'[host] at 03:04:05, then 03:04:07\\n'
+    >>> [ts % 86400000000 // 1000000 for offset, ts in iter_timestamps(
+    ...     line, '%H:%M:%S', UTC(), search=True)]
+    [11045, 11047]
+
+``iter_chunks()`` groups offsets and values in arrays of
+``utils.us_array()``, to be handed over to ``numpy`` or
+``TimeArray.from_us()`` without copy:
+
+    >>> for offsets, values in iter_chunks(log, '%Y-%m-%d %H:%M:%S.%f',
+    ...                                    UTC(), size=1):
+    ...     print(list(offsets), list(values))
+    [0] [1262401445500000]
+    [45] [1262401446250000]
+
+"""
+
+import mmap
+import re
+
+from .clock import Time, basestring, _wall2us
+from .strptime import DEFAULT_REFERENCE, get_parser
+from .utils import us_array, _wall_offset_us
+
+
+## Default number of values of chunks of ``iter_chunks()``
+CHUNK_SIZE = 65536
+
+
+class _mapped(object):
+    """Context manager giving a buffer of the content of ``source``
+
+    ``source`` is a path, a binary file or a bytes-like object. Files are
+    memory-mapped when they can be. As ``str`` is ``bytes`` on Python 2,
+    paths are ``unicode`` there.
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        source = self.source
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            return source
+        if isinstance(source, basestring):
+            source = self._file = open(source, "rb")
+        try:
+            fileno = source.fileno()
+        except (AttributeError, IOError, OSError, ValueError):
+            return source.read()
+        try:
+            self._map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            ## empty files can't be mapped
+            return b""
+        return self._map
+
+    def __exit__(self, *exc_info):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def iter_timestamps(source, format, hint_src_tz, relative=False,
+                    search=False, as_time=False):
+    """Yield ``(offset, epoch_us)`` of timestamps of ``format`` in ``source``
+
+    ``source`` is a path, a binary file or bytes. By default, only
+    timestamps starting a line are found, and ``offset`` is the offset of
+    the line. With ``search``, all non overlapping matches are found.
+
+    ``relative`` gives the missing fields as for ``Time.strptime()``, it
+    is resolved once. With ``as_time``, ``Time`` instances in UTC are
+    yielded instead of microseconds.
+
+    Matches of the format holding invalid dates are skipped.
+
+    """
+    parser = get_parser(format)
+    pattern = parser.pattern.encode("utf-8")
+    regex = re.compile(pattern if search else b"^(?:" + pattern + b")",
+                       re.IGNORECASE | re.MULTILINE)
+    if relative is True:
+        relative = Time.now()
+    reference = DEFAULT_REFERENCE
+    if relative is not False:
+        reference = relative.timetuple(), relative.microsecond
+    wall_offset = _wall_offset_us(hint_src_tz)
+    with _mapped(source) as data:
+        for match in regex.finditer(data):
+            groups = [group if group is None else group.decode("utf-8")
+                      for group in match.groups()]
+            try:
+                wall_us = _wall2us(parser.wall_from_groups(groups,
+                                                           reference))
+            except ValueError:
+                continue
+            us = wall_us - wall_offset(wall_us)
+            yield match.start(), Time.from_timestamp_us(us) if as_time \
+                else us
+
+
+def iter_chunks(source, format, hint_src_tz, size=CHUNK_SIZE, **kwargs):
+    """Yield ``(offsets, epoch_us)`` arrays of at most ``size`` values
+
+    Other arguments are as for ``iter_timestamps()``, but ``as_time``.
+    Arrays are ``utils.us_array()``.
+
+    """
+    offsets, values = us_array(), us_array()
+    for offset, us in iter_timestamps(source, format, hint_src_tz,
+                                      **kwargs):
+        offsets.append(offset)
+        values.append(us)
+        if len(values) >= size:
+            yield offsets, values
+            offsets, values = us_array(), us_array()
+    if values:
+        yield offsets, values
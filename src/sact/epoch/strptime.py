@@ -4,25 +4,346 @@
 
 """
 
+import re
 import time
 import _strptime
 from datetime import date as datetime_date
 
 
-def first(l, predicate):
-    for e in l:
-        if predicate(e):
-            return e
-    raise ValueError("No element in list matches given predicate.")
+## Slots of parsed values
+YEAR, MONTH, DAY, HOUR, MINUTE, SECOND, FRACTION, WEEKDAY, JULIAN, WEEK, \
+    TZ = range(11)
 
+DEFAULT_REFERENCE = (1900, 1, 1, 0, 0, 0, -1, -1, -1), 0
+
+## Values of the first slots (up to ``FRACTION``) given by zero completion
+_ZEROES = (1900, 1, 1, 0, 0, 0, 0)
+
+## Rank of directives for zero completion: values of slots less
+## significant than the rightmost given directive are zeroed.
+_RANKS = {
+    "j": 0, "Y": 1, "y": 1, "m": 2, "B": 2, "b": 2, "U": 3, "W": 3,
+    "d": 4, "A": 4, "a": 4, "w": 4, "H": 5, "I": 5, "M": 6, "S": 7, "f": 8,
+}
+
+## Rank of each of the first slots (up to ``FRACTION``)
+_SLOT_RANKS = (1, 2, 4, 5, 6, 7, 8)
+
+## Directives whose pattern depends on the locale
+_LOCALE_DIRECTIVES = frozenset("aAbBpcxXZ")
+
+_DIRECTIVE = re.compile(r"%(.)", re.DOTALL)
+
+
+def _short_year(value):
+    # Open Group specification for strptime() states that a %y
+    # value in the range of [00, 68] is in the century 2000, while
+    # [69,99] is in the century 1900
+    year = int(value)
+    return year + 2000 if year <= 68 else year + 1900
+
+
+def _fraction(value):
+    # Pad to always return microseconds.
+    return int(value + "0" * (6 - len(value)))
+
+
+def _weekday(value):
+    # %w starts week on Sunday
+    return (int(value) - 1) % 7
+
+
+def _index_in(names):
+    return lambda value: names.index(value.lower())
+
+
+def _zone_index(locale_time):
+
+    def convert(value):
+        found_zone = value.lower()
+        for tz, tz_values in enumerate(locale_time.timezone):
+            if found_zone in tz_values:
+                # Deal with bad locale setup where timezone names are the
+                # same and yet time.daylight is true; too ambiguous to
+                # be able to tell what timezone has daylight savings
+                if (time.tzname[0] == time.tzname[1] and
+                        time.daylight and found_zone not in ("utc", "gmt")):
+                    return None
+                return tz
+        return None
+    return convert
+
+
+def _converters(locale_time):
+    """Return ``(slot, convert)`` of handled directives
+
+    Directives not handled here are:
+
+    - c, x, X: handled by making out of other directives
+    - p: used along with I
+    - others are ignored, as ``strptime()`` of python 2.7
+
+    ``convert`` returns None when the slot is to be left untouched.
+
+    """
+    return {
+        "y": (YEAR, _short_year),
+        "Y": (YEAR, int),
+        "m": (MONTH, int),
+        "B": (MONTH, _index_in(locale_time.f_month)),
+        "b": (MONTH, _index_in(locale_time.a_month)),
+        "d": (DAY, int),
+        "H": (HOUR, int),
+        "I": (HOUR, int),
+        "M": (MINUTE, int),
+        "S": (SECOND, int),
+        "f": (FRACTION, _fraction),
+        "A": (WEEKDAY, _index_in(locale_time.f_weekday)),
+        "a": (WEEKDAY, _index_in(locale_time.a_weekday)),
+        "w": (WEEKDAY, _weekday),
+        "j": (JULIAN, int),
+        "U": (WEEK, int),
+        "W": (WEEK, int),
+        "Z": (TZ, _zone_index(locale_time)),
+    }
+
+
+class _Plan(object):
+    """Conversion of fields of a given set of directives to a time struct
+
+    ``directives`` is the sequence of directives of the fields that will
+    be given to ``struct()``, in this order.
+
+    """
+
+    def __init__(self, directives, locale_time):
+        converters = _converters(locale_time)
+        directives = list(directives)
+        self.fields = [(idx, ) + converters[directive]
+                       for idx, directive in enumerate(directives)
+                       if directive in converters]
+        ranks = [_RANKS[directive] for directive in directives
+                 if directive in _RANKS]
+        rightmost = max(ranks) if ranks else 0
+        ## number of first slots kept from reference on zero completion
+        self.kept = len([rank for rank in _SLOT_RANKS if rank <= rightmost])
+        ## U starts week on Sunday, W on Monday
+        self.week_starts_Mon = "W" in directives
+        ## index of hour and AM/PM fields, for %I
+        self.ampm = None
+        if "I" in directives:
+            self.ampm = directives.index("I"), \
+                directives.index("p") if "p" in directives else None
+        self.am_pm = locale_time.am_pm
+        ## whether the date may come from the julian day
+        self.julian = "j" in directives or "U" in directives or \
+            "W" in directives
+
+    def _slots(self, values, reference, complete_with_zeroes):
+        reference, fraction = reference
+        slots = list(reference[:6])
+        slots.append(fraction)
+        if complete_with_zeroes:
+            kept = self.kept
+            slots[kept:] = _ZEROES[kept:]
+        # Force calculation for julian and weekday, week is -1 when
+        # unknown
+        slots += [-1, -1, -1, reference[8]]
+        for idx, slot, convert in self.fields:
+            value = convert(values[idx])
+            if value is not None:
+                slots[slot] = value
+        if self.ampm is not None:
+            self._am_pm_hour(slots, values)
+        return slots
+
+    def struct(self, values, reference, complete_with_zeroes=True):
+        """Return time struct and microseconds of field strings ``values``"""
+
+        year, month, day, hour, minute, second, fraction, weekday, julian, \
+            week_of_year, tz = self._slots(values, reference,
+                                           complete_with_zeroes)
+        # If we know the week of the year and what day of that week, we can
+        # figure out the Julian day of the year.
+        if julian == -1 and week_of_year != -1 and weekday != -1:
+            julian = _strptime._calc_julian_from_U_or_W(
+                year, week_of_year, weekday, self.week_starts_Mon)
+        # Cannot pre-calculate datetime_date() since can change in Julian
+        # calculation and thus could have different value for the day of
+        # the week calculation.
+        if julian == -1:
+            date = datetime_date(year, month, day)
+            # Need to add 1 to result since first day of the year is 1,
+            # not 0.
+            julian = date.toordinal() - \
+                datetime_date(year, 1, 1).toordinal() + 1
+        else:  # Assume that if they bothered to include Julian day it will
+               # be accurate.
+            date = datetime_date.fromordinal(
+                (julian - 1) + datetime_date(year, 1, 1).toordinal())
+            year = date.year
+            month = date.month
+            day = date.day
+        if weekday == -1:
+            weekday = date.weekday()
+        return (time.struct_time((year, month, day,
+                                  hour, minute, second,
+                                  weekday, julian, tz)), fraction)
+
+    def wall(self, values, reference, complete_with_zeroes=True):
+        """Return year, month, day, hour, minute, second and microseconds
+
+        Neither the weekday nor the julian day are computed, and the date
+        is not checked, unless the date is to be found from them.
+
+        """
+        if self.julian:
+            time_struct, fraction = self.struct(values, reference,
+                                                complete_with_zeroes)
+            return tuple(time_struct[:6]) + (fraction, )
+        return self._slots(values, reference, complete_with_zeroes)[:7]
+
+    def _am_pm_hour(self, slots, values):
+        hour_idx, ampm_idx = self.ampm
+        hour = slots[HOUR]
+        ampm = values[ampm_idx].lower() if ampm_idx is not None else ""
+        # If there was no AM/PM indicator, we'll treat this like AM
+        if ampm in ("", self.am_pm[0]):
+            # We're in AM so the hour is correct unless we're
+            # looking at 12 midnight.
+            # 12 midnight == 12 AM == hour 0
+            if hour == 12:
+                slots[HOUR] = 0
+        elif ampm == self.am_pm[1]:
+            # We're in PM so we need to add 12 to the hour unless
+            # we're looking at 12 noon.
+            # 12 noon == 12 PM == hour 12
+            if hour != 12:
+                slots[HOUR] = hour + 12
+
+
+## ``TimeRE`` instances by locale language
+_time_res = {}
+
+
+def _time_re(locale_time=None):
+    """Return the ``TimeRE`` of ``locale_time``, or of current locale"""
+
+    if locale_time is not None:
+        return _strptime.TimeRE(locale_time)
+    lang = _strptime._getlang()
+    time_re = _time_res.get(lang)
+    if time_re is None:
+        time_re = _time_res[lang] = _strptime.TimeRE()
+    return time_re
+
+
+class StrptimeParser(object):
+    """Parser of strings of a ``strptime()`` format
+
+    The format is compiled once, with the names of ``locale``, a
+    ``_strptime.LocaleTime`` instance defaulting to the one of the current
+    locale. Parsing then doesn't take any lock:
+
+        >>> from sact.epoch.strptime import StrptimeParser
+        >>> parser = StrptimeParser('%Y-%m-%d %H:%M')
+        >>> parser.parse('2000-01-02 13:05')
+        (time.struct_time(tm_year=2000, tm_mon=1, tm_mday=2, tm_hour=13, tm_min=5, tm_sec=0, tm_wday=6, tm_yday=2, tm_isdst=-1), 0)
+
+    ``reference`` and ``complete_with_zeroes`` are as for ``strptime()``:
+
+        >>> parser = StrptimeParser('%d %H:%M')
+        >>> parser.parse('13 08:30',
+        ...              reference=((2000, 5, 1, 4, 5, 6, -1, -1, -1), 7))
+        (time.struct_time(tm_year=2000, tm_mon=5, tm_mday=13, tm_hour=8, tm_min=30, tm_sec=0, tm_wday=5, tm_yday=134, tm_isdst=-1), 0)
+
+    Strings of other formats are refused:
+
+        >>> parser.parse('13 08h30')
+        Traceback (most recent call last):
+        ...
+        ValueError: time data '13 08h30' does not match format '%d %H:%M'
+
+    ``regex`` is available to look for the format, groups of its matches
+    are converted with ``from_groups()``:
+
+        >>> match = parser.regex.search('On 14 18:00, stop.')
+        >>> parser.from_groups(match.groups())[0][2:5]
+        (14, 18, 0)
+
+    """
+
+    def __init__(self, format, locale=None):
+        self.format = format
+        time_re = _time_re(locale)
+        self.locale_time = time_re.locale_time
+        self.lang = self.locale_time.lang
+        self.pattern = _format_pattern(time_re, format)
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+        self.locale_dependent = any(
+            directive in _LOCALE_DIRECTIVES
+            for directive in _DIRECTIVE.findall(format))
+        directives = [None] * self.regex.groups
+        for name, number in self.regex.groupindex.items():
+            directives[number - 1] = name
+        self._plan = _Plan(directives, self.locale_time)
+
+    def parse(self, data_string, reference=DEFAULT_REFERENCE,
+              complete_with_zeroes=True):
+        """Return time struct and microseconds of ``data_string``"""
+
+        found = self.regex.match(data_string)
+        if not found:
+            raise ValueError("time data %r does not match format %r" %
+                             (data_string, self.format))
+        if len(data_string) != found.end():
+            raise ValueError("unconverted data remains: %s" %
+                             data_string[found.end():])
+        return self._plan.struct(found.groups(), reference,
+                                 complete_with_zeroes)
+
+    def from_groups(self, groups, reference=DEFAULT_REFERENCE,
+                    complete_with_zeroes=True):
+        """Return time struct and microseconds of groups of a match"""
+
+        return self._plan.struct(groups, reference, complete_with_zeroes)
+
+    def wall_from_groups(self, groups, reference=DEFAULT_REFERENCE,
+                         complete_with_zeroes=True):
+        """Return wall fields of groups of a match, see ``_Plan.wall()``"""
+
+        return self._plan.wall(groups, reference, complete_with_zeroes)
+
+    def __repr__(self):
+        return "<StrptimeParser %r>" % (self.format, )
+
+
+## Parsers of ``strptime()``, by format
+_parsers = {}
+
+
+def get_parser(format):
+    """Return a ``StrptimeParser`` of ``format`` for the current locale
+
+    Parsers are compiled once per format, and compiled again if the
+    locale changes for formats depending on it.
+
+        >>> from sact.epoch.strptime import get_parser
+        >>> get_parser('%H:%M') is get_parser('%H:%M')
+        True
+
+    """
+    parser = _parsers.get(format)
+    if parser is None or parser.locale_dependent and \
+            parser.lang != _strptime._getlang():
+        if len(_parsers) > _strptime._CACHE_MAX_SIZE:
+            _parsers.clear()
+        parser = _parsers[format] = StrptimeParser(format)
+    return parser
 
-## Copy of ``_strptime()`` from python 2.7.3 (default, Apr 20 2012, 22:39:59)
-## except for optional argument ``reference`` so as to add the option of a
-## default ground time.
 
 def strptime(data_string, format="%a %b %d %H:%M:%S %Y",
-             reference=(1900, 1, 1, 0, 0, 0, -1, -1, -1),
-             complete_with_zeroes=True):
+             reference=DEFAULT_REFERENCE, complete_with_zeroes=True):
     """Return time struct and microseconds based on an input and format string
 
     An optional ``reference`` is set by default to 1900-01-01 00:00:00.
@@ -50,169 +371,123 @@ def strptime(data_string, format="%a %b %d %H:%M:%S %Y",
         ...          complete_with_zeroes=False)
         (time.struct_time(tm_year=2000, tm_mon=1, tm_mday=1, tm_hour=13, tm_min=5, tm_sec=0, tm_wday=5, tm_yday=1, tm_isdst=-1), 5)
 
+    Directives without weight, such as ``%p``, don't take part in zeroing:
+
+        >>> strptime('01 PM', '%I %p',
+        ...          reference=((2000, 1, 1, 0, 0, 30, -1, -1, -1), 5))[0][3:6]
+        (13, 0, 0)
+
+    The format is compiled once in a ``StrptimeParser``, see
+    ``get_parser()``.
+
+    """
+    return get_parser(format).parse(data_string, reference,
+                                    complete_with_zeroes)
+
+
+def _format_pattern(time_re, format):
+    """Return the regex pattern string of ``format``"""
+
+    try:
+        return time_re.pattern(format)
+    # KeyError raised when a bad format is found; can be specified as
+    # \\, in which case it was a stray % but with a space after it
+    except KeyError as err:
+        bad_directive = err.args[0]
+        if bad_directive == "\\":
+            bad_directive = "%"
+        del err
+        raise ValueError("'%s' is a bad directive in format '%s'" %
+                            (bad_directive, format))
+    # IndexError only occurs when the format string is "%"
+    except IndexError:
+        raise ValueError("stray %% in format '%s'" % format)
+
+
+## Matchers of sequences of formats, by formats tuple
+_matchers = {}
+
+_GROUP_NAME = re.compile(r"\(\?P<(\w+)>")
+
+
+class _FormatsMatcher(object):
+    """Single regex made of the ``StrptimeParser`` of several formats
+
+    The regex has one named branch per format, inner groups being renamed
+    so as to be unique. As with successive ``strptime()`` calls, invalid
+    formats are skipped, unless there are only invalid formats.
 
     """
-    with _strptime._cache_lock:
-        if _strptime._getlang() != _strptime._TimeRE_cache.locale_time.lang:
-            _strptime._TimeRE_cache = TimeRE()
-            _strptime._regex_cache.clear()
-        if len(_strptime._regex_cache) > _strptime._CACHE_MAX_SIZE:
-            _strptime._regex_cache.clear()
-        locale_time = _strptime._TimeRE_cache.locale_time
-        format_regex = _strptime._regex_cache.get(format)
-        if not format_regex:
+
+    def __init__(self, formats):
+        self.lang = _strptime._getlang()
+        self.locale_dependent = False
+        parsers = {}
+        branches = []
+        error = None
+        for idx, format in enumerate(formats):
             try:
-                format_regex = _strptime._TimeRE_cache.compile(format)
-            # KeyError raised when a bad format is found; can be specified as
-            # \\, in which case it was a stray % but with a space after it
-            except KeyError as err:
-                bad_directive = err.args[0]
-                if bad_directive == "\\":
-                    bad_directive = "%"
-                del err
-                raise ValueError("'%s' is a bad directive in format '%s'" %
-                                    (bad_directive, format))
-            # IndexError only occurs when the format string is "%"
-            except IndexError:
-                raise ValueError("stray %% in format '%s'" % format)
-            _strptime._regex_cache[format] = format_regex
-    found = format_regex.match(data_string)
-    if not found:
-        raise ValueError("time data %r does not match format %r" %
-                         (data_string, format))
-    if len(data_string) != found.end():
-        raise ValueError("unconverted data remains: %s" %
-                          data_string[found.end():])
-    (year, month, day, hour, minute, second, weekday, julian, tz), \
-           fraction = reference
-    # Force calculation for julian and weekday
-    julian = -1
-    weekday = -1
-    # Default to -1 to signify that values not known; not critical to have,
-    # though
-    week_of_year = -1
-    week_of_year_start = -1
-    found_dict = found.groupdict()
-    for group_key in found_dict.keys():
-        # Directives not explicitly handled below:
-        #   c, x, X
-        #      handled by making out of other directives
-        #   U, W
-        #      worthless without day of the week
-        if group_key == 'y':
-            year = int(found_dict['y'])
-            # Open Group specification for strptime() states that a %y
-            #value in the range of [00, 68] is in the century 2000, while
-            #[69,99] is in the century 1900
-            if year <= 68:
-                year += 2000
-            else:
-                year += 1900
-        elif group_key == 'Y':
-            year = int(found_dict['Y'])
-        elif group_key == 'm':
-            month = int(found_dict['m'])
-        elif group_key == 'B':
-            month = locale_time.f_month.index(found_dict['B'].lower())
-        elif group_key == 'b':
-            month = locale_time.a_month.index(found_dict['b'].lower())
-        elif group_key == 'd':
-            day = int(found_dict['d'])
-        elif group_key == 'H':
-            hour = int(found_dict['H'])
-        elif group_key == 'I':
-            hour = int(found_dict['I'])
-            ampm = found_dict.get('p', '').lower()
-            # If there was no AM/PM indicator, we'll treat this like AM
-            if ampm in ('', locale_time.am_pm[0]):
-                # We're in AM so the hour is correct unless we're
-                # looking at 12 midnight.
-                # 12 midnight == 12 AM == hour 0
-                if hour == 12:
-                    hour = 0
-            elif ampm == locale_time.am_pm[1]:
-                # We're in PM so we need to add 12 to the hour unless
-                # we're looking at 12 noon.
-                # 12 noon == 12 PM == hour 12
-                if hour != 12:
-                    hour += 12
-        elif group_key == 'M':
-            minute = int(found_dict['M'])
-        elif group_key == 'S':
-            second = int(found_dict['S'])
-        elif group_key == 'f':
-            s = found_dict['f']
-            # Pad to always return microseconds.
-            s += "0" * (6 - len(s))
-            fraction = int(s)
-        elif group_key == 'A':
-            weekday = locale_time.f_weekday.index(found_dict['A'].lower())
-        elif group_key == 'a':
-            weekday = locale_time.a_weekday.index(found_dict['a'].lower())
-        elif group_key == 'w':
-            weekday = int(found_dict['w'])
-            if weekday == 0:
-                weekday = 6
-            else:
-                weekday -= 1
-        elif group_key == 'j':
-            julian = int(found_dict['j'])
-        elif group_key in ('U', 'W'):
-            week_of_year = int(found_dict[group_key])
-            if group_key == 'U':
-                # U starts week on Sunday.
-                week_of_year_start = 6
-            else:
-                # W starts week on Monday.
-                week_of_year_start = 0
-        elif group_key == 'Z':
-            # Since -1 is default value only need to worry about setting tz if
-            # it can be something other than -1.
-            found_zone = found_dict['Z'].lower()
-            for value, tz_values in enumerate(locale_time.timezone):
-                if found_zone in tz_values:
-                    # Deal with bad locale setup where timezone names are the
-                    # same and yet time.daylight is true; too ambiguous to
-                    # be able to tell what timezone has daylight savings
-                    if (time.tzname[0] == time.tzname[1] and
-                       time.daylight and found_zone not in ("utc", "gmt")):
-                        break
-                    else:
-                        tz = value
-                        break
-    # If we know the week of the year and what day of that week, we can figure
-    # out the Julian day of the year.
-    if julian == -1 and week_of_year != -1 and weekday != -1:
-        week_starts_Mon = True if week_of_year_start == 0 else False
-        julian = _strptime._calc_julian_from_U_or_W(year, week_of_year, weekday,
-                                            week_starts_Mon)
-    if complete_with_zeroes:
-        idxs = ("j", "Y", "mBb", "UW", "dAaw", "HI", "M", "S", "f")
-        specified = [idxs.index(gk)
-                     for gk in [first(idxs, lambda key_group: k in key_group)
-                                for k in found_dict.keys()]]
-        rightmost_specified = max(specified) if len(specified) else 0
-        base = (1900, 1, 1, 1, 0, 0, 0, 0)
-        values = year, month, week_of_year, day, hour, minute, second, fraction
-        year, month, week_of_year, day, hour, minute, second, fraction = \
-               values[:rightmost_specified] + base[rightmost_specified:]
-
-    # Cannot pre-calculate datetime_date() since can change in Julian
-    # calculation and thus could have different value for the day of the week
-    # calculation.
-    if julian == -1:
-        # Need to add 1 to result since first day of the year is 1, not 0.
-        julian = datetime_date(year, month, day).toordinal() - \
-                  datetime_date(year, 1, 1).toordinal() + 1
-    else:  # Assume that if they bothered to include Julian day it will
-           # be accurate.
-        datetime_result = datetime_date.fromordinal(
-            (julian - 1) + datetime_date(year, 1, 1).toordinal())
-        year = datetime_result.year
-        month = datetime_result.month
-        day = datetime_result.day
-    if weekday == -1:
-        weekday = datetime_date(year, month, day).weekday()
-    return (time.struct_time((year, month, day,
-                              hour, minute, second,
-                              weekday, julian, tz)), fraction)
+                parser = get_parser(format)
+            except (ValueError, re.error) as err:
+                error = error or err
+                continue
+            parsers[idx] = parser
+            self.locale_dependent = self.locale_dependent or \
+                parser.locale_dependent
+            branches.append("(?P<_%d>%s)" % (
+                idx, _GROUP_NAME.sub(r"(?P<\1_%d>" % idx, parser.pattern)))
+        if not branches and error is not None:
+            raise error
+        self.regex = re.compile("(?:%s)\\Z" % "|".join(branches),
+                                re.IGNORECASE)
+        ## format index, parser and slice of its groups in groups of the
+        ## regex, by index of branch group
+        self._branches = {}
+        for idx, parser in parsers.items():
+            branch = self.regex.groupindex["_%d" % idx]
+            self._branches[branch] = idx, parser, \
+                slice(branch, branch + parser.regex.groups)
+
+    def match(self, data_string):
+        found = self.regex.match(data_string)
+        if not found:
+            return None
+        idx, parser, groups = self._branches[found.lastindex]
+        return idx, parser, found.groups()[groups]
+
+
+def match_formats(data_string, formats):
+    """Return the index of the first format matching, its parser and groups
+
+    ``formats`` is a tuple of strptime formats, the patterns of their
+    ``StrptimeParser`` are compiled once in a single regex. Returns a
+    tuple of the index of the first format of ``formats`` matching the
+    whole ``data_string``, the parser of this format and the groups of
+    its match, to be given to ``from_groups()``. Returns ``None`` if no
+    format matches. No lock is taken.
+
+        >>> from sact.epoch.strptime import match_formats
+        >>> formats = ('%Y-%m-%d', '%H:%M', '%Hh%M')
+        >>> match_formats('13h05', formats)
+        (2, <StrptimeParser '%Hh%M'>, ('13', '05'))
+
+        >>> match_formats('13h05', formats[:2]) is None
+        True
+
+    Invalid formats are ignored, unless there are only invalid formats:
+
+        >>> match_formats('13h05', ('%', '%Q', '%Hh%M'))[0]
+        2
+        >>> match_formats('13h05', ('%', ))
+        Traceback (most recent call last):
+        ...
+        ValueError: stray % in format '%'
+
+    """
+    matcher = _matchers.get(formats)
+    if matcher is None or matcher.locale_dependent and \
+            matcher.lang != _strptime._getlang():
+        if len(_matchers) > _strptime._CACHE_MAX_SIZE:
+            _matchers.clear()
+        matcher = _matchers[formats] = _FormatsMatcher(formats)
+    return matcher.match(data_string)
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Columnar storage of ``Time`` values.
+
+A ``TimeArray`` stores moments as a contiguous ``numpy.int64`` buffer of
+UTC epoch microseconds, and a single timezone through which these
+moments are looked at. This is meant for large batches of ``Time``
+where allocating a full ``datetime`` object per value is too costly.
+
+This module requires ``numpy``.
+
+"""
+
+import datetime
+import operator
+
+import numpy as np
+
+from .clock import Time
+from .timezone import UTC, TzLocal
+from .utils import offset2iso, US_PER_SECOND, US_PER_DAY, \
+    OFFSET_GRANULARITY, _ONE_US, _fixed_offset_us, _utc_offset_us, \
+    _wall_offset_us
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC())
+_EPOCH_TIME = Time(1970, 1, 1)
+
+
+def _td2us(delta):
+    return delta // _ONE_US
+
+
+def _offset_repr(offset):
+    """Return the isoformat suffix of a given utcoffset"""
+
+    return offset2iso(offset)
+
+
+def _probed_offsets(offsets, us):
+    """Return offsets in microseconds of each value of ``us``
+
+    ``offsets`` are the ``_Offsets`` of a timezone. They are looked at
+    once per distinct day, and once per distinct ``OFFSET_GRANULARITY``
+    bucket only on days where the offset changes.
+
+    """
+    days, inverse = np.unique(us // US_PER_DAY, return_inverse=True)
+    inverse = inverse.reshape(us.shape)
+    day_offsets = [offsets.day(int(day)) for day in days]
+    res = np.array([0 if offset is None else offset
+                    for offset in day_offsets], dtype=np.int64)[inverse]
+    for i, offset in enumerate(day_offsets):
+        if offset is not None:
+            continue
+        mask = inverse == i
+        buckets, b_inverse = np.unique(us[mask] // OFFSET_GRANULARITY,
+                                       return_inverse=True)
+        b_offsets = np.array([offsets(int(b) * OFFSET_GRANULARITY)
+                              for b in buckets], dtype=np.int64)
+        res[mask] = b_offsets[b_inverse]
+    return res
+
+
+def _utcoffsets(tz, us):
+    """Return the utcoffsets in microseconds of ``tz`` at given UTC moments"""
+
+    offset = _fixed_offset_us(tz)
+    if offset is not None:
+        return np.int64(offset)
+    return _probed_offsets(_utc_offset_us(tz), us)
+
+
+def _wall_offsets(tz, wall_us):
+    """Return the utcoffsets in microseconds of ``tz`` at given wall times"""
+
+    offset = _fixed_offset_us(tz)
+    if offset is not None:
+        return np.int64(offset)
+    return _probed_offsets(_wall_offset_us(tz), wall_us)
+
+
+class TimeArray(object):
+    """Sequence of moments stored as UTC epoch microseconds
+
+    Usage
+    =====
+
+        >>> from sact.epoch import Time, TimeArray, UTC
+        >>> ta = TimeArray([Time(1970, 1, 1), Time(2000, 1, 1, 12, 30)])
+        >>> ta
+        <TimeArray ['1970-01-01 00:00:00+00:00' '2000-01-01 12:30:00+00:00']>
+        >>> len(ta)
+        2
+
+    The underlying buffer is available as ``us``:
+
+        >>> ta.us
+        array([              0, 946729800000000])
+
+    Indexing gives back ``Time`` objects, slicing gives ``TimeArray``:
+
+        >>> ta[1]
+        <Time 2000-01-01 12:30:00+00:00>
+        >>> ta[1:]
+        <TimeArray ['2000-01-01 12:30:00+00:00']>
+
+    Usual ``Time`` representations are available as arrays of strings:
+
+        >>> ta.timestamp
+        array([        0, 946729800])
+        >>> ta.short
+        array(['1970-01-01 00:00:00', '2000-01-01 12:30:00'], dtype='<U19')
+        >>> ta.short_short
+        array(['1970-01-01 00:00', '2000-01-01 12:30'], dtype='<U16')
+
+    Moving to another timezone doesn't touch the stored values:
+
+        >>> from zope.component import globalSiteManager as gsm
+        >>> from sact.epoch import testTimeZone
+        >>> from sact.epoch.interfaces import ITimeZone
+        >>> gsm.registerUtility(testTimeZone, ITimeZone, name='local')
+
+        >>> ta.local
+        <TimeArray ['1970-01-01 00:05:00+00:05' '2000-01-01 12:35:00+00:05']>
+        >>> ta.local.us is ta.us
+        True
+        >>> ta.local[0]
+        <Time 1970-01-01 00:05:00+00:05>
+        >>> ta.local.utc
+        <TimeArray ['1970-01-01 00:00:00+00:00' '2000-01-01 12:30:00+00:00']>
+
+        >>> gsm.unregisterUtility(testTimeZone, ITimeZone, 'local')
+        True
+
+    Arithmetic
+    ----------
+
+    ``timedelta`` can be added or subtracted:
+
+        >>> ta + datetime.timedelta(seconds=1.5)
+        <TimeArray ['1970-01-01 00:00:01.500000+00:00' '2000-01-01 12:30:01.500000+00:00']>
+        >>> ta - datetime.timedelta(days=1)
+        <TimeArray ['1969-12-31 00:00:00+00:00' '1999-12-31 12:30:00+00:00']>
+
+    Subtracting moments gives ``numpy.timedelta64`` values:
+
+        >>> (ta - Time(1970, 1, 1)).astype('timedelta64[s]')
+        array([        0, 946729800], dtype='timedelta64[s]')
+
+    Comparisons
+    -----------
+
+    Comparisons are element-wise and accept ``Time``, ``datetime`` or
+    other ``TimeArray``:
+
+        >>> ta > Time(1980, 1, 1)
+        array([False,  True])
+        >>> ta == TimeArray([Time(1970, 1, 1), Time(1980, 1, 1)])
+        array([ True, False])
+        >>> ta[ta > Time(1980, 1, 1)]
+        <TimeArray ['2000-01-01 12:30:00+00:00']>
+
+    Conversions
+    -----------
+
+    ``numpy.datetime64`` are considered UTC:
+
+        >>> TimeArray(np.array(['2000-01-01T10:00'], dtype='datetime64[m]'))
+        <TimeArray ['2000-01-01 10:00:00+00:00']>
+        >>> ta.to_datetime64()
+        array(['1970-01-01T00:00:00.000000', '2000-01-01T12:30:00.000000'],
+              dtype='datetime64[us]')
+
+    While naive ``datetime`` need a hint, as for ``Time``:
+
+        >>> TimeArray([datetime.datetime(2000, 1, 1)])
+        Traceback (most recent call last):
+        ...
+        ValueError: No timezone hinted, nor found.
+        >>> TimeArray([datetime.datetime(2000, 1, 1)], hint_src_tz=testTimeZone)
+        <TimeArray ['1999-12-31 23:55:00+00:00']>
+
+    Plain numbers are ambiguous and refused:
+
+        >>> TimeArray([1, 2])
+        Traceback (most recent call last):
+        ...
+        TypeError: Ambiguous integer values, use TimeArray.from_us() or TimeArray.from_timestamps().
+
+    And are not comparable with moments:
+
+        >>> ta == None
+        False
+        >>> ta < 3
+        Traceback (most recent call last):
+        ...
+        TypeError: ...
+
+    Empty arrays are supported:
+
+        >>> empty = TimeArray([])
+        >>> empty
+        <TimeArray []>
+        >>> len(empty.iso), len(empty.short), len(empty.short_short)
+        (0, 0, 0)
+
+    Getting back ``Time`` objects:
+
+        >>> ta.to_list()
+        [<Time 1970-01-01 00:00:00+00:00>, <Time 2000-01-01 12:30:00+00:00>]
+
+    """
+
+    __hash__ = None
+
+    def __init__(self, values=(), tz=None, hint_src_tz=None):
+        self.tz = UTC() if tz is None else tz
+        if isinstance(values, TimeArray):
+            self.us = values.us.copy()
+            return
+        if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+            self.us = values.astype("datetime64[us]").view(np.int64)
+            return
+        values = values if isinstance(values, (list, tuple, np.ndarray)) \
+                 else list(values)
+        if len(values) == 0:
+            self.us = np.empty(0, dtype=np.int64)
+            return
+        if not isinstance(values[0], datetime.datetime):
+            values = np.asarray(values)
+            if values.dtype.kind in "iu":
+                raise TypeError(
+                    "Ambiguous integer values, use TimeArray.from_us() or "
+                    "TimeArray.from_timestamps().")
+            self.us = values.astype("datetime64[us]").view(np.int64)
+            return
+        if values[0].tzinfo is None:
+            if hint_src_tz is None:
+                raise ValueError("No timezone hinted, nor found.")
+            wall = np.asarray(values, dtype="datetime64[us]").view(np.int64)
+            self.us = wall - _wall_offsets(hint_src_tz, wall)
+            return
+        try:
+            deltas = np.asarray(values, dtype=object) - _EPOCH
+        except TypeError:
+            raise ValueError("No timezone hinted, nor found.")
+        self.us = deltas.astype("timedelta64[us]").view(np.int64)
+
+    @classmethod
+    def from_us(cls, us, tz=None):
+        """Build a TimeArray from UTC epoch microseconds
+
+        The given buffer is used as is when it is already an int64 array:
+
+            >>> us = np.array([0, 1], dtype=np.int64)
+            >>> TimeArray.from_us(us).us is us
+            True
+
+        """
+        ta = cls.__new__(cls)
+        ta.tz = UTC() if tz is None else tz
+        ta.us = np.asarray(us, dtype=np.int64)
+        return ta
+
+    @classmethod
+    def from_timestamps(cls, ts, tz=None):
+        """Build a TimeArray from UTC epoch seconds
+
+            >>> TimeArray.from_timestamps([0, 1.5])
+            <TimeArray ['1970-01-01 00:00:00+00:00' '1970-01-01 00:00:01.500000+00:00']>
+
+        """
+        ts = np.asarray(ts)
+        if ts.dtype.kind in "iu":
+            return cls.from_us(ts.astype(np.int64) * US_PER_SECOND, tz=tz)
+        return cls.from_us(np.round(ts * US_PER_SECOND), tz=tz)
+
+    def _with_us(self, us):
+        return self.from_us(us, tz=self.tz)
+
+    def _other_us(self, other):
+        if isinstance(other, TimeArray):
+            return other.us
+        if isinstance(other, datetime.datetime):
+            if other.tzinfo is None:
+                raise ValueError("No timezone hinted, nor found.")
+            return _td2us(other - _EPOCH)
+        if isinstance(other, np.datetime64) or \
+               isinstance(other, np.ndarray) and other.dtype.kind == "M":
+            return other.astype("datetime64[us]").view(np.int64)
+        return NotImplemented
+
+    def _delta_us(self, delta):
+        if isinstance(delta, datetime.timedelta):
+            return _td2us(delta)
+        delta = np.asarray(delta)
+        if delta.dtype.kind == "m":
+            return delta.astype("timedelta64[us]").view(np.int64)
+        return NotImplemented
+
+    ##
+    ## Sequence protocol
+    ##
+
+    def __len__(self):
+        return len(self.us)
+
+    def __getitem__(self, idx):
+        us = self.us[idx]
+        if isinstance(us, np.ndarray):
+            return self._with_us(us)
+        t = _EPOCH_TIME + datetime.timedelta(microseconds=int(us))
+        return t if isinstance(self.tz, UTC) else t.astimezone(self.tz)
+
+    def __iter__(self):
+        for idx in range(len(self.us)):
+            yield self[idx]
+
+    def __repr__(self):
+        return "<TimeArray %s>" % (np.array2string(self.iso, max_line_width=10 ** 6,
+                                                  separator=' '), )
+
+    ##
+    ## Arithmetic and comparisons
+    ##
+
+    def __add__(self, delta):
+        delta = self._delta_us(delta)
+        if delta is NotImplemented:
+            return NotImplemented
+        return self._with_us(self.us + delta)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, (TimeArray, datetime.datetime, np.datetime64)):
+            return (self.us - self._other_us(other)).view("timedelta64[us]")
+        delta = self._delta_us(other)
+        if delta is NotImplemented:
+            return NotImplemented
+        return self._with_us(self.us - delta)
+
+    def _compare(self, other, op):
+        other_us = self._other_us(other)
+        if other_us is NotImplemented:
+            return NotImplemented
+        return op(self.us, other_us)
+
+    def __eq__(self, other):
+        return self._compare(other, operator.eq)
+
+    def __ne__(self, other):
+        return self._compare(other, operator.ne)
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge)
+
+    ##
+    ## Time-like properties
+    ##
+
+    def astimezone(self, tz):
+        """Return the same moments seen through timezone ``tz``"""
+
+        return self.from_us(self.us, tz=tz)
+
+    @property
+    def utc(self):
+        return self.astimezone(UTC())
+
+    @property
+    def local(self):
+        return self.astimezone(TzLocal())
+
+    @property
+    def timestamp(self):
+        """UTC unix timestamps in seconds, as ``Time.timestamp``"""
+
+        return self.us // US_PER_SECOND
+
+    ts = timestamp
+
+    @property
+    def utcoffsets(self):
+        """Offsets in microseconds of each value in its timezone"""
+
+        return np.broadcast_to(_utcoffsets(self.tz, self.us), self.us.shape)
+
+    def _wall(self, unit):
+        if len(self.us) == 0:
+            return np.empty(self.us.shape, dtype=str)
+        wall = (self.us + _utcoffsets(self.tz, self.us))\
+               .view("datetime64[us]")
+        return np.char.replace(np.datetime_as_string(wall, unit=unit),
+                               "T", " ")
+
+    @property
+    def iso(self):
+        """Return the iso format of each value, as ``Time.iso``"""
+
+        whole = self.us % US_PER_SECOND == 0
+        if whole.all():
+            wall = self._wall("s")
+        else:
+            wall = np.where(whole, self._wall("s"), self._wall("us"))
+        offsets, inverse = np.unique(self.utcoffsets, return_inverse=True)
+        suffixes = np.array(
+            [_offset_repr(datetime.timedelta(microseconds=int(o)))
+             for o in offsets])
+        return np.char.add(wall, suffixes[inverse.reshape(wall.shape)]) \
+            if len(wall) else wall
+
+    @property
+    def short(self):
+        """Return as iso without time zone, as ``Time.short``"""
+
+        return self._wall("s")
+
+    @property
+    def short_short(self):
+        """Idem without seconds, as ``Time.short_short``"""
+
+        return self._wall("m")
+
+    ##
+    ## Conversions
+    ##
+
+    def to_datetime64(self):
+        """Return a ``datetime64[us]`` UTC view of the values"""
+
+        return self.us.view("datetime64[us]")
+
+    def to_list(self):
+        """Return a list of ``Time`` instances"""
+
+        return list(self)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Sorted index of values by moment.
+
+``TimeIndex`` keeps UTC epoch microseconds sorted in an array of 64 bits
+integers (see ``utils.us_array()``), next to the list of their payloads.
+Lookups are binary searches, and ``Time`` objects are only created for
+returned entries:
+
+    >>> from sact.epoch import Time, TimeIndex
+    >>> from sact.epoch.timezone import TzOffset
+
+    >>> index = TimeIndex([(Time(2000, 1, 1, 12), 'noon'),
+    ...                    (Time(2000, 1, 1, 8), 'morning'),
+    ...                    (Time(2000, 1, 1, 20), 'evening')])
+    >>> list(index)
+    [(<Time 2000-01-01 08:00:00+00:00>, 'morning'), (<Time 2000-01-01 12:00:00+00:00>, 'noon'), (<Time 2000-01-01 20:00:00+00:00>, 'evening')]
+
+Keys are ``Time``, ``datetime`` (naive ones being UTC, as for
+``Time.timestamp``) or timestamps in seconds:
+
+    >>> import datetime
+    >>> index.add(datetime.datetime(2000, 1, 1, 16, tzinfo=TzOffset(3600)),
+    ...           'afternoon')
+    >>> index.add(946702800, 'night')
+    >>> len(index)
+    5
+
+Entries of a range of moments, start included and stop excluded, are
+given as another ``TimeIndex``:
+
+    >>> [payload for t, payload in index.range(Time(2000, 1, 1, 8),
+    ...                                       Time(2000, 1, 1, 16))]
+    ['morning', 'noon', 'afternoon']
+    >>> len(index.range(stop=Time(2000, 1, 1)))
+    0
+
+Closest entries:
+
+    >>> index.nearest(Time(2000, 1, 1, 10, 30))
+    (<Time 2000-01-01 12:00:00+00:00>, 'noon')
+    >>> index.before(Time(2000, 1, 1, 12))
+    (<Time 2000-01-01 08:00:00+00:00>, 'morning')
+    >>> index.before(Time(2000, 1, 1, 12), inclusive=True)
+    (<Time 2000-01-01 12:00:00+00:00>, 'noon')
+    >>> index.after(Time(2000, 1, 1, 20)) is None
+    True
+
+Entries of equal keys keep their order of insertion. Adding entries in
+order is O(1), others are kept aside and merged at the next lookup, as
+are entries given in bulk to ``merge()``:
+
+    >>> index.merge([(Time(2000, 1, 1, 12), 'lunch'),
+    ...              (Time(1999, 12, 31), 'eve')])
+    >>> [payload for t, payload in index]
+    ['eve', 'night', 'morning', 'noon', 'lunch', 'afternoon', 'evening']
+
+Keys are available as this array, which ``numpy.frombuffer()`` can use
+without copy:
+
+    >>> list(index[:2].keys_us)
+    [946598400000000, 946702800000000]
+
+"""
+
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+from .clock import Time
+from .utils import us_array, _to_us
+
+
+_first = itemgetter(0)
+
+
+class TimeIndex(object):
+    """Payloads sorted by moment, ``items`` being ``(key, payload)``"""
+
+    def __init__(self, items=()):
+        self._keys = us_array()
+        self._payloads = []
+        ## (us, payload) added out of order, not merged yet
+        self._pending = []
+        self.merge(items)
+
+    @classmethod
+    def _from_sorted(cls, keys, payloads):
+        index = cls.__new__(cls)
+        index._keys = keys
+        index._payloads = payloads
+        index._pending = []
+        return index
+
+    ##
+    ## Adding entries
+    ##
+
+    def add(self, key, payload=None):
+        """Add ``payload`` at moment ``key``"""
+
+        us = _to_us(key)
+        keys = self._keys
+        if not self._pending and (not keys or us >= keys[-1]):
+            keys.append(us)
+            self._payloads.append(payload)
+        else:
+            self._pending.append((us, payload))
+
+    def merge(self, items):
+        """Add ``(key, payload)`` pairs"""
+
+        self._pending.extend((_to_us(key), payload) for key, payload in items)
+
+    def _flush(self):
+        """Merge pending entries in sorted storage"""
+
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        ## sorts are stable: equal keys keep their order
+        pending.sort(key=_first)
+        keys, payloads = self._keys, self._payloads
+        start = bisect_right(keys, pending[0][0])
+        if start < len(keys):
+            ## both runs are sorted, which the sort merges in linear time
+            pending = sorted(list(zip(keys[start:], payloads[start:])) +
+                             pending, key=_first)
+            del keys[start:]
+            del payloads[start:]
+        keys.extend(us for us, payload in pending)
+        payloads.extend(payload for us, payload in pending)
+
+    ##
+    ## Lookups
+    ##
+
+    def _entry(self, idx):
+        return Time.from_timestamp_us(self._keys[idx]), self._payloads[idx]
+
+    def __len__(self):
+        return len(self._keys) + len(self._pending)
+
+    def __iter__(self):
+        self._flush()
+        for idx in range(len(self._keys)):
+            yield self._entry(idx)
+
+    def __getitem__(self, idx):
+        self._flush()
+        if isinstance(idx, slice):
+            return self._from_sorted(self._keys[idx], self._payloads[idx])
+        return self._entry(idx)
+
+    @property
+    def keys_us(self):
+        """Sorted keys, as UTC epoch microseconds"""
+
+        self._flush()
+        return self._keys
+
+    def range(self, start=None, stop=None):
+        """Return entries from ``start`` included to ``stop`` excluded"""
+
+        self._flush()
+        keys = self._keys
+        lo = 0 if start is None else bisect_left(keys, _to_us(start))
+        hi = len(keys) if stop is None else bisect_left(keys, _to_us(stop))
+        return self._from_sorted(keys[lo:hi], self._payloads[lo:hi])
+
+    def before(self, key, inclusive=False):
+        """Return the last entry before ``key``, or None"""
+
+        self._flush()
+        us = _to_us(key)
+        idx = (bisect_right if inclusive else bisect_left)(self._keys, us)
+        return self._entry(idx - 1) if idx else None
+
+    def after(self, key, inclusive=False):
+        """Return the first entry after ``key``, or None"""
+
+        self._flush()
+        us = _to_us(key)
+        idx = (bisect_left if inclusive else bisect_right)(self._keys, us)
+        return self._entry(idx) if idx < len(self._keys) else None
+
+    def nearest(self, key):
+        """Return the entry closest to ``key``, the earliest on ties
+
+        Returns None when the index is empty.
+
+        """
+        self._flush()
+        keys = self._keys
+        if not keys:
+            return None
+        us = _to_us(key)
+        idx = bisect_left(keys, us)
+        if idx == len(keys) or idx and us - keys[idx - 1] <= keys[idx] - us:
+            idx -= 1
+        return self._entry(idx)
+
+    def __repr__(self):
+        return "<TimeIndex of %d entries>" % len(self)
@@ -1,10 +1,12 @@
+import bisect
+import calendar
 import datetime
 import time
 
 from .interfaces import ITimeZone
+from .utility import CachedUtility
 
 from zope.interface import implementer
-from zope.component import queryUtility
 
 
 ZERO = datetime.timedelta(seconds=0)
@@ -27,14 +29,45 @@ def is_dst(dt):
     return tt.tm_isdst > 0
 
 
+class SingletonTz(datetime.tzinfo):
+    """Base of timezones having only one instance
+
+    Sharing the same instance allows ``datetime`` comparisons and
+    subtractions to skip ``utcoffset()`` calls altogether, and avoids
+    allocating one tzinfo per ``Time``. Identity is kept through
+    pickling.
+
+    """
+
+    def __new__(cls):
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super(SingletonTz, cls).__new__(cls)
+            cls._instance = instance
+        return instance
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+
 @implementer(ITimeZone)
-class UTC(datetime.tzinfo):
+class UTC(SingletonTz):
     """Represent the UTC timezone.
 
     From http://docs.python.org/library/datetime.html#tzinfo-objects examples
 
     XXXvlab: pytz.utc isn't better ?
 
+    There is only one instance of this timezone:
+
+        >>> from sact.epoch.timezone import UTC
+        >>> UTC() is UTC()
+        True
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(UTC())) is UTC()
+        True
+
     """
 
     def utcoffset(self, dt):
@@ -46,12 +79,38 @@ class UTC(datetime.tzinfo):
     def dst(self, dt):
         return ZERO
 
+    def fromutc(self, dt):
+        return dt
+
     def __repr__(self):
         return "<TimeZone: UTC>"
 
 
+def _wall_seconds(dt):
+    """Return wall time of ``dt`` as seconds since EPOCH, ignoring tzinfo"""
+
+    return ((dt.toordinal() - _EPOCH_ORDINAL) * 86400 +
+            dt.hour * 3600 + dt.minute * 60 + dt.second)
+
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+## Years tables also cover this many seconds around the year, so that
+## wall times of the year are covered whatever their offset.
+_YEAR_MARGIN = 2 * 86400
+
+## Maximum number of years tables kept in ``TzSystem``.
+_MAX_CACHED_YEARS = 200
+
+## PEP 495 ``fold`` attribute is only available since Python 3.6
+_HAS_FOLD = hasattr(datetime.datetime.min, "fold")
+
+## Maximum number of days kept in ``TzSystem`` caches.
+_MAX_CACHED_DAYS = 100000
+
+
 @implementer(ITimeZone)
-class TzSystem(datetime.tzinfo):
+class TzSystem(SingletonTz):
     """Get the timezone locale of the system. It is used for datetime object.
 
     This object get the local DST and utcoffset.
@@ -67,42 +126,330 @@ class TzSystem(datetime.tzinfo):
     stdoffset = -3600
     dstoffset = -7200
 
-    In `utcoffset` method, we check for the daylight saving or not and adjust
-    offset in consequence.
+    Offsets are not computed with ``time.mktime()`` and ``time.localtime()``
+    on each call: a sorted table of the UTC instants where the offset
+    changes, along with offsets, DST flags and names, is built with
+    ``time.localtime()`` for each year in use, when it is first queried.
+    Queries are then a bisection in this table.
+
+        >>> import os, time
+        >>> from sact.epoch import Time
+        >>> from sact.epoch.timezone import TzSystem, tzset
+
+        >>> old_tz = os.environ.get('TZ')
+        >>> os.environ['TZ'] = 'Europe/Paris'
+        >>> tzset()
+
+        >>> tz = TzSystem()
+        >>> tz is TzSystem()
+        True
+        >>> Time(2024, 3, 31, 0, 59, 59).astimezone(tz)
+        <Time 2024-03-31 01:59:59+01:00>
+        >>> Time(2024, 3, 31, 1, 0, 0).astimezone(tz)
+        <Time 2024-03-31 03:00:00+02:00>
+        >>> Time(2024, 3, 31, 1, 0, 0).astimezone(tz).tzname()
+        'CEST'
+
+    Only years queried are looked at, however far they are:
+
+        >>> Time(9000, 6, 1).astimezone(tz)
+        <Time 9000-06-01 02:00:00+02:00>
+        >>> sorted(tz._tables)
+        [2024, 9000]
+
+    Up to the bounds of ``datetime``:
+
+        >>> Time(1, 1, 1, 12).astimezone(tz).year
+        1
+        >>> Time(9999, 12, 31).astimezone(tz).year
+        9999
+
+    Wall times that are skipped or repeated around a transition follow
+    PEP 495: ``fold=0`` gets the offset before the transition, ``fold=1``
+    the offset after:
+
+        >>> import datetime
+        >>> datetime.datetime(2024, 3, 31, 2, 30, tzinfo=tz).utcoffset()
+        datetime.timedelta(seconds=3600)
+        >>> datetime.datetime(2024, 10, 27, 2, 30, tzinfo=tz).utcoffset()
+        datetime.timedelta(seconds=7200)
+
+    And converting from UTC gives the first occurrence of a repeated
+    hour:
+
+        >>> Time(2024, 10, 27, 0, 30).astimezone(tz)
+        <Time 2024-10-27 02:30:00+02:00>
+
+    ``fold`` requires Python 3.6, where the second occurrence is also
+    available:
+
+        >>> from sact.epoch.timezone import _HAS_FOLD
+        >>> second = Time(2024, 10, 27, 1, 30).astimezone(tz)
+        >>> not _HAS_FOLD or second.utcoffset() == datetime.timedelta(hours=1)
+        True
+        >>> not _HAS_FOLD or second.utc == Time(2024, 10, 27, 1, 30)
+        True
+
+    ``tzset()`` must be called whenever ``TZ`` changes, it calls
+    ``time.tzset()`` and drops the table:
+
+        >>> os.environ['TZ'] = 'America/New_York'
+        >>> tzset()
+        >>> Time(2024, 3, 10, 7, 0, 0).astimezone(tz)
+        <Time 2024-03-10 03:00:00-04:00>
+
+        >>> if old_tz is None:
+        ...     del os.environ['TZ']
+        ... else:
+        ...     os.environ['TZ'] = old_tz
+        >>> tzset()
 
     """
 
-    # Get the right offset with DST or not
-    stdoffset = datetime.timedelta(seconds=(- time.timezone))
-    if time.daylight:
-        dstoffset = datetime.timedelta(seconds=(- time.altzone))
-    else:
-        dstoffset = stdoffset
-
-    # Get the DST adjustement in minutes
-    dstdiff = dstoffset - stdoffset
+    def __new__(cls):
+        instance = super(TzSystem, cls).__new__(cls)
+        if "_tables" not in instance.__dict__:
+            instance.refresh()
+        return instance
+
+    def refresh(self):
+        """Reload offsets from the ``time`` module and drop the table"""
+
+        # Get the right offset with DST or not
+        self.stdoffset = datetime.timedelta(seconds=(- time.timezone))
+        if time.daylight:
+            self.dstoffset = datetime.timedelta(seconds=(- time.altzone))
+        else:
+            self.dstoffset = self.stdoffset
+
+        # Get the DST adjustement in minutes
+        self.dstdiff = self.dstoffset - self.stdoffset
+
+        ## Tables by year of (UTC starts, infos, wall ranges, UTC end)
+        self._tables = {}
+        ## Infos of days (by ordinal) without any transition, in wall time
+        ## and in UTC.
+        self._wall_days = {}
+        self._utc_days = {}
+        ## Caches built on offsets of this timezone include it in their
+        ## keys, so that they are not used anymore after a refresh
+        self.generation = getattr(self, "generation", 0) + 1
+
+    def _info(self, ts):
+        """Return (utcoffset, dst, tzname) at given UTC timestamp"""
+
+        try:
+            tt = time.localtime(ts)
+        except (ValueError, OverflowError, OSError):  ## pragma: no cover
+            return self.stdoffset, ZERO, time.tzname[0]
+        isdst = tt.tm_isdst > 0
+        gmtoff = getattr(tt, "tm_gmtoff", None)
+        offset = datetime.timedelta(seconds=gmtoff) if gmtoff is not None \
+                 else (self.dstoffset if isdst else self.stdoffset)
+        name = getattr(tt, "tm_zone", None) or time.tzname[isdst]
+        return offset, self.dstdiff if isdst else ZERO, name
+
+    def _transitions(self, start, end):
+        """Return starts and infos of offsets between UTC timestamps
+
+        Local time is sampled daily, and changes are bisected down to the
+        second.
+
+        """
+        starts, infos = [start], [self._info(start)]
+        for ts in range(start + 86400, end + 86400, 86400):
+            info = self._info(ts)
+            if info == infos[-1]:
+                continue
+            lo, hi = ts - 86400, ts
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._info(mid) == info:
+                    hi = mid
+                else:
+                    lo = mid
+            if hi < end:
+                starts.append(hi)
+                infos.append(info)
+        return starts, infos
+
+    def _year_table(self, year):
+        """Return table of transitions around year ``year``
+
+        Tables cover the whole year in UTC and in wall time, and are built
+        separately for each year in use.
+
+        """
+        table = self._tables.get(year)
+        if table is not None:
+            return table
+        ## ``calendar.timegm()`` can't go out of datetime years
+        start = calendar.timegm((year, 1, 1, 0, 0, 0)) - _YEAR_MARGIN
+        end = calendar.timegm((year, 12, 31, 0, 0, 0)) + 86400 + _YEAR_MARGIN
+        starts, infos = self._transitions(start, end)
+        ## Wall times skipped or repeated at transition i are in
+        ## [walls_lo[i], walls_hi[i])
+        offsets = [_seconds(info[0]) for info in infos]
+        walls_lo = [starts[0] + offsets[0]] + \
+                   [starts[i] + min(offsets[i - 1], offsets[i])
+                    for i in range(1, len(starts))]
+        walls_hi = [starts[0] + offsets[0]] + \
+                   [starts[i] + max(offsets[i - 1], offsets[i])
+                    for i in range(1, len(starts))]
+        if len(self._tables) >= _MAX_CACHED_YEARS:
+            self._tables.clear()
+        table = self._tables[year] = (starts, infos, walls_lo, walls_hi, end)
+        return table
+
+    def _wall_info(self, dt):
+        day = dt.toordinal()
+        info = self._wall_days.get(day)
+        if info is not None:
+            return info
+        wall = _wall_seconds(dt)
+        table = self._year_table(dt.year)
+        idx = max(bisect.bisect_right(table[2], wall) - 1, 0)
+        if idx and wall < table[3][idx] and not getattr(dt, "fold", 0):
+            idx -= 1
+        info = table[1][idx]
+        if _whole_day(table, table[3], table[2], idx, wall - wall % 86400):
+            _cache_day(self._wall_days, day, info)
+        return info
 
     def utcoffset(self, dt):
         """Return offset of local time from UTC, in minutes"""
 
-        return self.dstoffset if is_dst(dt) else self.stdoffset
+        return self._wall_info(dt)[0]
 
     def dst(self, dt):
         """Return the daylight saving time (DST) adjustment, in minutes"""
 
-        return self.dstdiff if is_dst(dt) else ZERO
+        return self._wall_info(dt)[1]
 
     def tzname(self, dt):
         """Return time zone name of the datetime object dt"""
 
-        return time.tzname[is_dst(dt)]
+        return self._wall_info(dt)[2]
+
+    def fromutc(self, dt):
+        """Return local time of UTC time ``dt``"""
+
+        day = dt.toordinal()
+        info = self._utc_days.get(day)
+        if info is not None:
+            return dt + info[0]
+        ts = _wall_seconds(dt)
+        table = self._year_table(dt.year)
+        idx = max(bisect.bisect_right(table[0], ts) - 1, 0)
+        offset = table[1][idx][0]
+        local = dt + offset
+        if _HAS_FOLD and idx and offset < table[1][idx - 1][0] and \
+               ts + _seconds(offset) < table[3][idx]:
+            ## second occurrence of a repeated wall time
+            return local.replace(fold=1)
+        if _whole_day(table, table[0], table[0], idx, ts - ts % 86400):
+            _cache_day(self._utc_days, day, table[1][idx])
+        return local
 
     def __repr__(self):
         return "<TimeZone: System>"
 
 
+def _seconds(delta):
+    return delta.days * 86400 + delta.seconds
+
+
+def _whole_day(table, starts, ends, idx, day_start):
+    """Return True if a day is fully inside the idx-th range of a table
+
+    ``starts`` and ``ends`` are the lists of start of ranges and of start
+    of next ranges.
+
+    """
+    return starts[idx] <= day_start and \
+        day_start + 86400 <= (ends[idx + 1] if idx + 1 < len(ends)
+                              else table[4])
+
+
+def _cache_day(days, day, info):
+    if len(days) > _MAX_CACHED_DAYS:
+        days.clear()
+    days[day] = info
+
+
+def tzset():
+    """Call ``time.tzset()`` and refresh the system timezone accordingly
+
+    Must be called after any change of the ``TZ`` environment variable.
+
+    """
+    time.tzset()
+    TzSystem().refresh()
+
+
+@implementer(ITimeZone)
+class TzOffset(datetime.tzinfo):
+    """Timezone with a fixed offset to UTC
+
+    There is only one instance per offset, given in seconds or as a
+    ``timedelta``:
+
+        >>> import datetime
+        >>> from sact.epoch.timezone import TzOffset
+        >>> TzOffset(3600)
+        <TimeZone: +01:00>
+        >>> TzOffset(datetime.timedelta(hours=1)) is TzOffset(3600)
+        True
+        >>> TzOffset(-5400).tzname(None)
+        '-01:30'
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(TzOffset(3600))) is TzOffset(3600)
+        True
+
+    A null offset is the UTC timezone:
+
+        >>> TzOffset(0)
+        <TimeZone: UTC>
+
+    """
+
+    _instances = {}
+
+    def __new__(cls, offset):
+        if isinstance(offset, datetime.timedelta):
+            offset = offset.days * 86400 + offset.seconds
+        if offset == 0:
+            return UTC()
+        instance = cls._instances.get(offset)
+        if instance is None:
+            instance = super(TzOffset, cls).__new__(cls)
+            instance.offset = offset
+            instance._utcoffset = datetime.timedelta(seconds=offset)
+            instance._name = "%s%02d:%02d" % ("-" if offset < 0 else "+",
+                                              abs(offset) // 3600,
+                                              abs(offset) // 60 % 60)
+            instance = cls._instances.setdefault(offset, instance)
+        return instance
+
+    def __reduce__(self):
+        return self.__class__, (self.offset, )
+
+    def utcoffset(self, dt):
+        return self._utcoffset
+
+    def tzname(self, dt):
+        return self._name
+
+    def dst(self, dt):
+        return ZERO
+
+    def __repr__(self):
+        return "<TimeZone: %s>" % self._name
+
+
 @implementer(ITimeZone)
-class TzTest(datetime.tzinfo):
+class TzTest(SingletonTz):
     """Timezone crafted for tests"""
 
     def utcoffset(self, dt):
@@ -122,7 +469,11 @@ testTimeZone = TzTest()
 defaultLocalTimeZone = TzSystem()
 
 
+_local_timezone = CachedUtility(ITimeZone, name='local',
+                                default=defaultLocalTimeZone)
+
+
 def TzLocal():
     """Get local timezone with ZCA"""
 
-    return queryUtility(ITimeZone, name='local', default=defaultLocalTimeZone)
+    return _local_timezone()
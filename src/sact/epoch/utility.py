@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Cached lookups of zope utilities.
+
+``Time.now()`` and ``TzLocal()`` are called very often and look for the
+registered clock and local timezone each time. ``CachedUtility`` keeps
+the result of such lookups, and every cache is dropped as soon as a
+component is registered or unregistered in any registry.
+
+    >>> from zope.component import globalSiteManager as gsm
+    >>> from sact.epoch.utility import CachedUtility
+    >>> from sact.epoch.interfaces import IClock
+
+    >>> lookup = CachedUtility(IClock, name='other', default='no clock')
+    >>> lookup()
+    'no clock'
+
+    >>> from sact.epoch.clock import ManageableClock
+    >>> clock = ManageableClock()
+    >>> gsm.registerUtility(clock, name='other')
+    >>> lookup() is clock
+    True
+
+    >>> gsm.unregisterUtility(clock, name='other')
+    True
+    >>> lookup()
+    'no clock'
+
+Results are not cached when the site manager lookup is hooked (for
+instance by ``zope.component.hooks.setSite()``), as the utility then
+depends on the current site.
+
+If a registry is altered without sending events, caches must be
+dropped with ``invalidate_all()``.
+
+"""
+
+import zope.event
+
+from zope.component import getSiteManager
+from zope.interface.interfaces import IRegistrationEvent
+
+
+_caches = []
+
+## Incremented on each invalidation
+_generation = [0]
+
+_MISSING = object()
+
+
+class CachedUtility(object):
+    """Callable returning the utility providing ``iface`` named ``name``"""
+
+    def __init__(self, iface, name='', default=None):
+        self.iface = iface
+        self.name = name
+        self.default = default
+        self._utility = _MISSING
+        _caches.append(self)
+
+    def __call__(self):
+        utility = self._utility
+        if utility is not _MISSING and \
+               getSiteManager.implementation is getSiteManager.original:
+            return utility
+        generation = _generation[0]
+        utility = getSiteManager().queryUtility(
+            self.iface, self.name, self.default)
+        if getSiteManager.implementation is getSiteManager.original and \
+               generation == _generation[0]:
+            ## registry didn't change during the lookup
+            self._utility = utility
+        return utility
+
+    def invalidate(self):
+        self._utility = _MISSING
+
+
+def invalidate_all(event=None):
+    """Drop all cached utilities"""
+
+    _generation[0] += 1
+    for cache in _caches:
+        cache.invalidate()
+
+
+def _on_registration(event):
+    if IRegistrationEvent.providedBy(event):
+        invalidate_all()
+
+
+zope.event.subscribers.append(_on_registration)
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:  ## pragma: no cover
+    pass
+else:  ## pragma: no cover
+    addCleanUp(invalidate_all)
@@ -20,9 +20,23 @@ timestamp (abbreviated 'ts')
 
 """
 
+import re
+import sys
+import math
 import time
 import datetime
 import calendar
+from array import array
+
+from .timezone import UTC, TzOffset, TzTest
+
+
+## Complete ISO 8601 / RFC 3339 date and time, with optional fraction
+## of seconds and UTC offset.
+_ISO_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})"
+    r"(?:\.(\d{1,6}))?"
+    r"(?:(Z)|([+-])(\d{2})(?::?(\d{2}))?)?\Z")
 
 
 def dt2ts(dt):
@@ -55,11 +69,328 @@ def dt2ts(dt):
         >>> dt2ts(dt.astimezone(TzLocal()))
         0
 
+    Sub-second parts are floored:
+
+        >>> dt2ts(datetime.datetime(1969, 12, 31, 23, 59, 59, 500000))
+        -1
+
+    """
+    return dt2us(dt) // 1000000
+
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def dt2us(dt):
+    """Converts a datetime object to an integer number of microseconds
+
+    As ``dt2ts()``, naive datetime are considered UTC:
+
+        >>> from sact.epoch import dt2us, TzOffset
+        >>> dt2us(datetime.datetime(1970, 1, 1, 0, 0, 1, 5))
+        1000005
+        >>> dt2us(datetime.datetime(1970, 1, 1, 1, tzinfo=TzOffset(3600)))
+        0
+
+    """
+    us = (((dt.toordinal() - _EPOCH_ORDINAL) * 86400 +
+           dt.hour * 3600 + dt.minute * 60 + dt.second) * 1000000 +
+          dt.microsecond)
+    offset = dt.utcoffset()
+    if offset:
+        us -= (offset.days * 86400 + offset.seconds) * 1000000 + \
+              offset.microseconds
+    return us
+
+
+def _to_us(when):
+    """Return epoch microseconds of a datetime or timestamp in seconds
+
+    Datetimes go through ``dt2us()`` as ``Time.timestamp``, float
+    timestamps are rounded to the microsecond.
+
+    """
+    if isinstance(when, datetime.datetime):
+        return dt2us(when)
+    if isinstance(when, float):
+        return int(round(when * 1000000))
+    return int(when) * 1000000
+
+
+def _delay_us(delay):
+    """Return microseconds of a timedelta or of a number of seconds"""
+
+    if isinstance(delay, datetime.timedelta):
+        return (delay.days * 86400 + delay.seconds) * 1000000 + \
+            delay.microseconds
+    return _to_us(delay)
+
+
+## Typecode of arrays of 64 bits integers: Python 2 has no "q", and its
+## "l" has 64 bits on some platforms only.
+try:
+    array("q")
+except ValueError:  ## pragma: no cover
+    _INT64 = "l" if array("l").itemsize == 8 else None
+else:
+    _INT64 = "q"
+
+
+def us_array(values=()):
+    """Return an array of 64 bits integers, as UTC epoch microseconds
+
+    It is an ``array('q')``, or an ``array('l')`` on Python 2, or a list
+    on platforms without 64 bits arrays. Numpy arrays are copied as
+    bytes:
+
+        >>> from sact.epoch.utils import us_array
+        >>> values = us_array([1500000, -1])
+        >>> values.append(0)
+        >>> list(values)
+        [1500000, -1, 0]
+
+    """
+    np = _numpy_array(values)
+    if np is not None:
+        values = values.astype(np.int64)
+        if _INT64 is None:  ## pragma: no cover
+            return values.tolist()
+        return array(_INT64, values.tobytes())
+    if _INT64 is None:  ## pragma: no cover
+        return list(values)
+    return array(_INT64, values)
+
+
+##
+## Offsets of timezones in microseconds
+##
+
+US_PER_SECOND = 1000000
+
+US_PER_DAY = 86400 * US_PER_SECOND
+
+## Offsets of non fixed timezones are probed at day boundaries, and only
+## days holding a change of offset are probed again with this granularity
+## (in microseconds).
+OFFSET_GRANULARITY = 15 * 60 * US_PER_SECOND
+
+## Timezones whose offset doesn't depend on the date
+_FIXED_TZ = (UTC, TzOffset, TzTest)
+
+_ONE_US = datetime.timedelta(microseconds=1)
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC())
+
+_NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+
+## Offsets cached per probe before clearing
+_MAX_CACHED_OFFSETS = 100000
+
+
+def _utc_probe(tz):
+    """Return a function giving the utcoffset in us of ``tz`` at UTC us"""
+
+    def probe(us):
+        return (_EPOCH + datetime.timedelta(microseconds=us))\
+            .astimezone(tz).utcoffset() // _ONE_US
+    return probe
+
+
+def _wall_probe(tz):
+    """Return a function giving the utcoffset in us of ``tz`` at wall us
+
+    Skipped wall times get the offset before the change, and repeated
+    ones the offset of their first occurrence, as ``fold=0`` does. This
+    holds for ``pytz`` timezones too, which ``replace()`` can't be used
+    with:
+
+        >>> import pytz
+        >>> from sact.epoch.utils import _wall_probe, US_PER_DAY
+        >>> probe = _wall_probe(pytz.timezone("Europe/Paris"))
+        >>> day = 14795 * US_PER_DAY  ## 2010-07-05
+        >>> probe(day) // 3600000000
+        2
+        >>> skipped = 14696 * US_PER_DAY + 9000000000  ## 2010-03-28 02:30
+        >>> probe(skipped) // 3600000000
+        1
+        >>> repeated = 14913 * US_PER_DAY + 9000000000  ## 2010-10-31 02:30
+        >>> probe(repeated) // 3600000000
+        2
+
+    """
+    localize = getattr(tz, "localize", None)
+    if localize is None:
+        def probe(wall_us):
+            return (_NAIVE_EPOCH + datetime.timedelta(microseconds=wall_us))\
+                .replace(tzinfo=tz).utcoffset() // _ONE_US
+        return probe
+
+    from pytz.exceptions import AmbiguousTimeError, NonExistentTimeError
+
+    def probe(wall_us):
+        dt = _NAIVE_EPOCH + datetime.timedelta(microseconds=wall_us)
+        try:
+            return localize(dt, is_dst=None).utcoffset() // _ONE_US
+        except (AmbiguousTimeError, NonExistentTimeError) as e:
+            offsets = [localize(dt, is_dst=is_dst).utcoffset() // _ONE_US
+                       for is_dst in (False, True)]
+            ## offsets drop on repeated wall times, and grow on skipped
+            ## ones
+            if isinstance(e, AmbiguousTimeError):
+                return max(offsets)
+            return min(offsets)
+    return probe
+
+
+class _Offsets(object):
+    """Cached utcoffsets in microseconds given by a probe
+
+    ``probe`` gives the offset at a number of microseconds, UTC or wall
+    depending on the probe. Offsets are probed at day boundaries, and
+    days holding a change of offset are probed again once per
+    ``OFFSET_GRANULARITY`` bucket.
+
+    """
+
+    def __init__(self, probe):
+        self.probe = probe
+        ## (offset, ) of days without change of offset, () of others
+        self._days = {}
+        self._buckets = {}
+
+    def _day(self, day):
+        days = self._days
+        if len(days) > _MAX_CACHED_OFFSETS:
+            days.clear()
+        start = self.probe(day * US_PER_DAY)
+        res = days[day] = (start, ) \
+            if self.probe((day + 1) * US_PER_DAY) == start else ()
+        return res
+
+    def day(self, day):
+        """Return the offset of the whole ``day``, or None if it changes"""
+
+        res = self._days.get(day)
+        if res is None:
+            res = self._day(day)
+        return res[0] if res else None
+
+    def __call__(self, us):
+        day = us // US_PER_DAY
+        res = self._days.get(day)
+        if res is None:
+            res = self._day(day)
+        if res:
+            return res[0]
+        bucket = us // OFFSET_GRANULARITY
+        res = self._buckets.get(bucket)
+        if res is None:
+            if len(self._buckets) > _MAX_CACHED_OFFSETS:
+                self._buckets.clear()
+            res = self._buckets[bucket] = \
+                self.probe(bucket * OFFSET_GRANULARITY)
+        return res
+
+
+def _fixed_offset_us(tz):
+    """Return the utcoffset in us of ``tz`` if it is fixed, else None"""
+
+    if isinstance(tz, _FIXED_TZ):
+        return tz.utcoffset(None) // _ONE_US
+    return None
+
+
+def _utc_offset_us(tz):
+    """Return a function giving the utcoffset in us of ``tz`` at UTC us"""
+
+    offset = _fixed_offset_us(tz)
+    if offset is not None:
+        return lambda us: offset
+    return _Offsets(_utc_probe(tz))
+
+
+def _wall_offset_us(tz):
+    """Return a function giving the utcoffset in us of ``tz`` at wall us"""
+
+    offset = _fixed_offset_us(tz)
+    if offset is not None:
+        return lambda wall_us: offset
+    return _Offsets(_wall_probe(tz))
+
+
+def offset2iso(offset, sep=":"):
+    """Returns the ISO representation of an UTC offset
+
+    ``offset`` is given in seconds or as a ``timedelta``:
+
+        >>> from sact.epoch.utils import offset2iso
+        >>> offset2iso(3600)
+        '+01:00'
+        >>> offset2iso(datetime.timedelta(minutes=-90), sep="")
+        '-0130'
+        >>> offset2iso(-561)
+        '-00:09:21'
+
     """
-    return int(tt2ts(dt.utctimetuple()))
+    if not isinstance(offset, datetime.timedelta):
+        offset = datetime.timedelta(seconds=offset)
+    sign = "+"
+    if offset.days < 0:
+        sign, offset = "-", -offset
+    minutes, seconds = divmod(offset.days * 86400 + offset.seconds, 60)
+    microseconds = offset.microseconds
+    res = "%s%02d%s%02d" % (sign, minutes // 60, sep, minutes % 60)
+    if seconds or microseconds:
+        res += "%s%02d" % (sep, seconds)
+        if microseconds:
+            res += ".%06d" % microseconds
+    return res
+
+
+## ISO representations of dates, by number of days since EPOCH
+_day_isos = {}
+
+## ``(year, month, day)`` of ISO dates, by representation
+_iso_days = {}
+
+_MAX_CACHED_DAYS = 10000
+
+## Minutes since EPOCH and 'YYYY-MM-DD HH:MM:' of the last ``ts2iso()``
+_last_minute = [(None, None)]
 
+_TWO_DIGITS = ["%02d" % i for i in range(100)]
 
-def ts2iso(ts):
+
+def _day_iso(days):
+    iso = _day_isos.get(days)
+    if iso is None:
+        if len(_day_isos) > _MAX_CACHED_DAYS:
+            _day_isos.clear()
+        iso = _day_isos[days] = datetime.date.fromordinal(
+            _EPOCH_ORDINAL + days).isoformat()
+    return iso
+
+
+def _split_ts(ts):
+    """Return whole seconds and microseconds of a timestamp
+
+    Microseconds are rounded as ``datetime.utcfromtimestamp()`` does.
+
+    """
+    if not isinstance(ts, float):
+        return int(ts), 0
+    frac, whole = math.modf(ts)
+    us = round(frac * 1e6)
+    if us >= 1000000:
+        whole += 1
+        us -= 1000000
+    elif us < 0:
+        whole -= 1
+        us += 1000000
+    return int(whole), int(us)
+
+
+def ts2iso(ts, offset=None):
     """Returns an (UTC) ISO representation of a timestamp
 
         >>> from sact.epoch import iso2ts, ts2iso
@@ -67,8 +398,36 @@ def ts2iso(ts):
         >>> ts2iso(iso2ts('2008-11-01 10:00:00'))
         '2008-11-01 10:00:00'
 
+    Fractions of seconds are kept:
+
+        >>> ts2iso(1.5)
+        '1970-01-01 00:00:01.500000'
+
+    With an ``offset`` (in seconds or as a ``timedelta``), the wall time
+    at this offset is given, followed by the offset:
+
+        >>> ts2iso(0, offset=3600)
+        '1970-01-01 01:00:00+01:00'
+
     """
-    return datetime.datetime.utcfromtimestamp(ts).isoformat(" ")
+    seconds, us = _split_ts(ts)
+    if offset is not None:
+        if isinstance(offset, datetime.timedelta):
+            offset = offset.days * 86400 + offset.seconds
+        seconds += offset
+    minutes, seconds = divmod(seconds, 60)
+    last_minutes, prefix = _last_minute[0]
+    if minutes != last_minutes:
+        days, day_minutes = divmod(minutes, 1440)
+        prefix = "%s %02d:%02d:" % (_day_iso(days), day_minutes // 60,
+                                    day_minutes % 60)
+        _last_minute[0] = minutes, prefix
+    iso = prefix + _TWO_DIGITS[seconds]
+    if us:
+        iso += ".%06d" % us
+    if offset is not None:
+        iso += offset2iso(offset)
+    return iso
 
 
 def iso2ts(iso):
@@ -88,9 +447,377 @@ def iso2ts(iso):
         >>> ts2tt(iso2ts('2008-12-06 12:17:31'))[0:6]
         (2008, 12, 6, 12, 17, 31)
 
+    Fractions of seconds give a float, and offsets are taken into
+    account:
+
+        >>> iso2ts('1970-01-01 01:00:01.5+01:00')
+        1.5
+        >>> iso2ts('1970-01-01T00:00:00Z')
+        0
+
+    """
+    if len(iso) == 19 and iso[10] in " T" and iso[13] == iso[16] == ":":
+        ## most common case, parsed by slicing
+        date = _iso_days.get(iso[:10])
+        if date is None:
+            date = _iso_day(iso[:10])
+        hour, minute, second = int(iso[11:13]), int(iso[14:16]), \
+            int(iso[17:19])
+        if date is not None and hour < 24 and minute < 60 and \
+               second < 62 and min(hour, minute, second) >= 0:
+            return date * 86400 + hour * 3600 + minute * 60 + second
+    parsed = parse_iso(iso)
+    if parsed is None:
+        return tt2ts(time.strptime(iso + " UTC", "%Y-%m-%d %H:%M:%S %Z"))
+    year, month, day, hour, minute, second, us, offset = parsed
+    ts = (datetime.date(year, month, day).toordinal() - _EPOCH_ORDINAL) * \
+         86400 + hour * 3600 + minute * 60 + second - (offset or 0)
+    if us:
+        return ts + us / 1000000.0
+    return ts
+
+
+def _iso_day(iso):
+    """Return days since EPOCH of a 'YYYY-MM-DD' string, or None"""
+
+    if iso[4] != "-" or iso[7] != "-" or not iso[:4].isdigit():
+        return None
+    try:
+        days = datetime.date(int(iso[:4]), int(iso[5:7]), int(iso[8:10]))\
+               .toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        return None
+    if len(_iso_days) > _MAX_CACHED_DAYS:
+        _iso_days.clear()
+    _iso_days[iso] = days
+    return days
+
+
+def _numpy_array(values):
+    """Return ``values`` if it is a numpy array, None otherwise"""
+
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(values, np.ndarray):
+        return np
+    return None
+
+
+## Timestamps of the first and last seconds of ``datetime``
+_MIN_TS = (1 - _EPOCH_ORDINAL) * 86400
+_MAX_TS = (datetime.date.max.toordinal() + 1 - _EPOCH_ORDINAL) * 86400 - 1
+
+## Days from 0000-03-01 to EPOCH, in the proleptic gregorian calendar
+_EPOCH_FROM_MARCH = 719468
+
+
+def _np_civil(np, days):
+    """Return arrays of year, month and day of days since EPOCH
+
+    Years start on march 1st for the computation, which puts leap days at
+    their end.
+
+    """
+    days = days + _EPOCH_FROM_MARCH
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 -
+                   day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 -
+                                year_of_era // 100)
+    month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month + 2) // 5 + 1
+    month = np.where(month < 10, month + 3, month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _np_days(np, year, month, day):
+    """Return days since EPOCH of arrays of year, month and day"""
+
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 \
+        + day - 1
+    return era * 146097 + year_of_era * 365 + year_of_era // 4 - \
+        year_of_era // 100 + day_of_year - _EPOCH_FROM_MARCH
+
+
+## Rows of numpy arrays converted at once, so that their code points stay
+## in cache
+_NP_BLOCK = 8192
+
+## Pairs of code points of 2 digits values, by pattern
+_np_pairs = {}
+
+
+def _np_pair_codes(np, pattern):
+    """Return pairs of code points of values from 0 to 99 as ``uint64``
+
+    ``pattern`` is a ``str.format()`` pattern of at most 2 characters,
+    given the 2 digits of the value:
+
+        >>> import numpy as np
+        >>> from sact.epoch.utils import _np_pair_codes
+        >>> _np_pair_codes(np, "-{0[0]}")[42:43].view("U2")
+        array(['-4'], dtype='<U2')
+
+    """
+    pairs = _np_pairs.get(pattern)
+    if pairs is None:
+        pairs = _np_pairs[pattern] = np.array(
+            [pattern.format(digits) for digits in _TWO_DIGITS],
+            dtype="U2").view(np.uint64)
+    return pairs
+
+
+def _np_ts2iso(np, timestamps, offset):
+    """Return ``ts2iso()`` of a numpy array of timestamps, or None
+
+    Integer and float arrays are split in fields, floats being rounded to
+    microseconds as ``_split_ts()`` does. Strings are written by blocks of
+    rows, as pairs of code points of 2 digits of fields. Other arrays give
+    None.
+
     """
+    if timestamps.dtype.kind not in "iuf":
+        return None
+    if isinstance(offset, datetime.timedelta):
+        offset = offset.days * 86400 + offset.seconds
+    elif offset is not None and offset != int(offset):
+        return None
+    timestamps = timestamps.ravel()
+    if len(timestamps) and not (-2 ** 62 < timestamps.min() and
+                                timestamps.max() < 2 ** 62):
+        ## NaN, infinities and integers beyond int64 are left to
+        ## ``ts2iso()``
+        return None
+    if timestamps.dtype.kind == "f":
+        frac, whole = np.modf(timestamps.astype(np.float64))
+        us = np.round(frac * 1e6).astype(np.int64)
+        whole = whole.astype(np.int64) + us // 1000000
+        us %= 1000000
+    else:
+        whole = timestamps.astype(np.int64)
+        us = None
+    if offset is not None:
+        whole += int(offset)
+    if len(whole) and (whole.min() < _MIN_TS or whole.max() > _MAX_TS):
+        ## out of the range of ``datetime``, as ``ts2iso()`` tells
+        return None
+    if us is not None and not us.any():
+        us = None
+    suffix = "" if offset is None else offset2iso(int(offset))
+    end = 19 if us is None else 26
+    res = np.empty(len(whole), dtype="U%d" % (end + len(suffix)))
+    ## rows of an even number of code points, the suffix after the seconds
+    ## or the fraction
+    width = end + len(suffix) + (end + len(suffix)) % 2
+    codes = np.zeros((_NP_BLOCK, width), dtype=np.uint32)
+    suffix_codes = [ord(char) for char in suffix]
+    pairs = codes.view(np.uint64)
+    digits = _np_pair_codes(np, "{0}")
+    no_fraction = _np_pair_codes(np, "{0[1]}" + suffix[:1])
+    if us is not None:
+        ## code points after the seconds, without fraction
+        whole_tail = np.array([suffix[1:]], dtype="U%d" % (width - 20))\
+            .view(np.uint32)
+    for start in range(0, len(whole), _NP_BLOCK):
+        seconds = whole[start:start + _NP_BLOCK]
+        rows = len(seconds)
+        days, seconds = np.divmod(seconds, 86400)
+        year, month, day = _np_civil(np, days)
+        hour, seconds = np.divmod(seconds, 3600)
+        minute, second = np.divmod(seconds, 60)
+        codes[:, end:end + len(suffix)] = suffix_codes
+        for idx, pattern, values in (
+                (0, "{0}", year // 100), (1, "{0}", year % 100),
+                (2, "-{0[0]}", month), (3, "{0[1]}-", month),
+                (4, "{0}", day), (5, " {0[0]}", hour), (6, "{0[1]}:", hour),
+                (7, "{0}", minute), (8, ":{0[0]}", second)):
+            pairs[:rows, idx] = _np_pair_codes(np, pattern)[values]
+        if us is None:
+            pairs[:rows, 9] = no_fraction[second]
+        else:
+            pairs[:rows, 9] = _np_pair_codes(np, "{0[1]}.")[second]
+            fraction = us[start:start + _NP_BLOCK]
+            pairs[:rows, 10] = digits[fraction // 10000]
+            pairs[:rows, 11] = digits[fraction // 100 % 100]
+            pairs[:rows, 12] = digits[fraction % 100]
+            ## whole seconds have no fraction
+            whole_rows = (fraction == 0).nonzero()[0]
+            pairs[whole_rows, 9] = no_fraction[second[whole_rows]]
+            codes[whole_rows, 20:] = whole_tail
+        res[start:start + rows] = codes[:rows].view("U%d" % width).ravel()
+    return res
+
+
+def ts2iso_many(timestamps, offset=None):
+    """Returns ISO representations of an iterable of timestamps
+
+    Gives a list, or an array of strings for a numpy array:
+
+        >>> from sact.epoch.utils import ts2iso_many
+        >>> ts2iso_many(iter([0, 86400.25]))
+        ['1970-01-01 00:00:00', '1970-01-02 00:00:00.250000']
+
+    Numpy arrays of numbers are formatted without any Python loop:
+
+        >>> import numpy as np
+        >>> ts2iso_many(np.array([-0.5, 86400]), offset=3600)
+        array(['1970-01-01 00:59:59.500000+01:00',
+               '1970-01-02 01:00:00+01:00'], dtype='<U32')
 
-    return tt2ts(time.strptime(iso + " UTC", "%Y-%m-%d %H:%M:%S %Z"))
+    """
+    np = _numpy_array(timestamps)
+    if np is not None:
+        iso = _np_ts2iso(np, timestamps, offset)
+        if iso is None:
+            iso = np.array([ts2iso(ts, offset) for ts in timestamps.ravel()],
+                           dtype=str)
+        return iso.reshape(timestamps.shape)
+    return [ts2iso(ts, offset) for ts in timestamps]
+
+
+## Columns of digits, separators and fraction of
+## 'YYYY-MM-DD HH:MM:SS[.ffffff]'
+_ISO_DIGITS = (0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18)
+_ISO_SEPARATORS = ((4, "-"), (7, "-"), (13, ":"), (16, ":"))
+_ISO_FRACTION = slice(20, 26)
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _np_iso2us(np, isos):
+    """Return UTC epoch microseconds of an array of ISO strings, or None
+
+    Only strings of the most common form, 'YYYY-MM-DD HH:MM:SS' with an
+    optional fraction of seconds and without offset, are read, from the
+    code points of blocks of rows. Other arrays give None, as well as
+    invalid dates.
+
+    """
+    if isos.dtype.kind == "S":
+        isos = isos.astype("U")
+    if isos.dtype.kind != "U" or not isos.size or \
+            isos.dtype.itemsize > 26 * 4 and np.char.str_len(isos).max() > 26:
+        return None
+    isos = isos.ravel()
+    res = np.empty(len(isos), dtype=np.int64)
+    columns, separators = zip(*_ISO_SEPARATORS)
+    separators = [ord(char) for char in separators]
+    days_in_month = np.array(_DAYS_IN_MONTH)
+    fraction_weights = np.array([100000, 10000, 1000, 100, 10, 1])
+    for start in range(0, len(isos), _NP_BLOCK):
+        codes = isos[start:start + _NP_BLOCK].astype("U26").view(np.uint32)
+        codes = codes.reshape(len(codes) // 26, 26)
+        ## code points below "0" wrap to large digits
+        digits = codes - 48
+        ## fractions have 1 to 6 digits, code points after the end are 0
+        ends = codes[:, 19:] == 0
+        if not ((digits[:, _ISO_DIGITS] <= 9).all() and
+                (codes[:, columns] == separators).all() and
+                ((codes[:, 10] == ord(" ")) | (codes[:, 10] == ord("T")))
+                .all() and
+                ((codes[:, 19] == ord(".")) | ends[:, 0]).all() and
+                (ends[:, :-1] <= ends[:, 1:]).all() and
+                ((digits[:, _ISO_FRACTION] <= 9) | ends[:, 1:]).all() and
+                (ends[:, 0] | ~ends[:, 1]).all()):
+            return None
+        digits = digits.astype(np.int64)
+        year = digits[:, 0] * 1000 + digits[:, 1] * 100 + \
+            digits[:, 2] * 10 + digits[:, 3]
+        month = digits[:, 5] * 10 + digits[:, 6]
+        day = digits[:, 8] * 10 + digits[:, 9]
+        hour = digits[:, 11] * 10 + digits[:, 12]
+        minute = digits[:, 14] * 10 + digits[:, 15]
+        second = digits[:, 17] * 10 + digits[:, 18]
+        if not ((year >= 1) & (month >= 1) & (month <= 12) &
+                (day >= 1)).all():
+            return None
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        ## as ``iso2ts()``, leap seconds go on the next minute
+        if not ((day <= days_in_month[month] + (leap & (month == 2))) &
+                (hour < 24) & (minute < 60) & (second < 62)).all():
+            return None
+        fraction = np.where(ends[:, 1:], 0, digits[:, _ISO_FRACTION])
+        res[start:start + len(codes)] = (
+            (_np_days(np, year, month, day) * 86400 + hour * 3600 +
+             minute * 60 + second) * 1000000 +
+            fraction.dot(fraction_weights))
+    return res
+
+
+def iso2ts_many(isos):
+    """Returns timestamps of an iterable of ISO representations
+
+    Gives a list, or an array for a numpy array:
+
+        >>> from sact.epoch.utils import iso2ts_many
+        >>> iso2ts_many(['1970-01-01 00:00:00', '1970-01-02 00:00:00.25'])
+        [0, 86400.25]
+
+    Numpy arrays of strings without offsets are parsed without any Python
+    loop:
+
+        >>> import numpy as np
+        >>> iso2ts_many(np.array(['1970-01-01 00:00:01', '1969-12-31T23:59:59']))
+        array([ 1, -1])
+
+    """
+    np = _numpy_array(isos)
+    if np is None:
+        return [iso2ts(iso) for iso in isos]
+    us = _np_iso2us(np, isos)
+    if us is None:
+        ts = np.array([iso2ts(iso) for iso in isos.ravel()])
+    elif (us % 1000000).any():
+        ts = us / 1e6
+    else:
+        ts = us // 1000000
+    return ts.reshape(isos.shape)
+
+
+def parse_iso(iso):
+    """Returns date fields and UTC offset from a complete ISO representation
+
+    Returns a tuple of ``(year, month, day, hour, minute, second,
+    microsecond, offset)``, ``offset`` being the UTC offset in seconds, or
+    ``None`` if no offset was given. Returns ``None`` if the string is not
+    a complete ISO representation (down to the seconds).
+
+        >>> from sact.epoch.utils import parse_iso
+
+        >>> parse_iso('2008-11-01 10:00:00')
+        (2008, 11, 1, 10, 0, 0, 0, None)
+        >>> parse_iso('2008-11-01T10:00:00.25+01:30')
+        (2008, 11, 1, 10, 0, 0, 250000, 5400)
+        >>> parse_iso('2008-11-01 10:00:00Z')
+        (2008, 11, 1, 10, 0, 0, 0, 0)
+        >>> parse_iso('2008-11-01 10:00:00-0500')
+        (2008, 11, 1, 10, 0, 0, 0, -18000)
+
+    Partial representations are not handled:
+
+        >>> parse_iso('2008-11-01 10:00') is None
+        True
+
+    """
+    m = _ISO_RE.match(iso)
+    if m is None:
+        return None
+    (year, month, day, hour, minute, second, fraction,
+     zulu, sign, off_hours, off_minutes) = m.groups()
+    if sign:
+        offset = int(off_hours) * 3600 + int(off_minutes or 0) * 60
+        if sign == "-":
+            offset = -offset
+    else:
+        offset = 0 if zulu else None
+    return (int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            int(fraction.ljust(6, "0")) if fraction else 0,
+            offset)
 
 
 tt2ts = calendar.timegm
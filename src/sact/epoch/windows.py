@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+.. :doctest:
+
+Aggregation of values of events over windows of time.
+
+Events are ``(when, value)`` pairs, ``when`` being a ``Time``, a
+``datetime`` or a timestamp in seconds. An assigner gives the windows of
+each event, and a ``WindowAggregator`` counts and sums values per window,
+giving back windows once they are finished:
+
+    >>> from sact.epoch import Time
+    >>> from sact.epoch.clock import ManageableClock
+    >>> from sact.epoch.windows import WindowAggregator, TumblingWindows
+
+    >>> clock = ManageableClock()
+    >>> clock.stop()
+    >>> clock.ts = 0
+    >>> per_minute = WindowAggregator(TumblingWindows("1m"), lateness=5,
+    ...                               clock=clock)
+
+    >>> per_minute.add(10, 1)
+    []
+    >>> per_minute.add(Time(1970, 1, 1, 0, 0, 30), 2)
+    []
+
+Windows are finished when the watermark reaches their end. It is the
+time of the clock (the current one by default, see
+``sact.epoch.use_clock()``) minus the allowed lateness:
+
+    >>> clock.ts = 64
+    >>> per_minute.poll()
+    []
+    >>> clock.ts = 65
+    >>> per_minute.poll()
+    [<Window [1970-01-01 00:00:00+00:00, 1970-01-01 00:01:00+00:00) count=2 value=3>]
+
+Events of finished windows are late, they are dropped and counted:
+
+    >>> per_minute.add(50, 1)
+    []
+    >>> per_minute.late
+    1
+
+Windows follow ``sact.epoch.rounding``, calendar units and timezones
+included. ``flush()`` gives all remaining windows, at the end of a
+stream:
+
+    >>> from sact.epoch import TzOffset
+    >>> per_day = WindowAggregator(TumblingWindows("1d", tz=TzOffset(-3600)),
+    ...                            clock=clock)
+    >>> per_day.add(Time(2000, 1, 1, 0, 30), 1)
+    []
+    >>> per_day.flush()
+    [<Window [1999-12-31 01:00:00+00:00, 2000-01-01 01:00:00+00:00) count=1 value=1>]
+
+Sliding and session windows
+---------------------------
+
+Sliding windows of ``size`` start every ``slide``, an event belonging to
+several windows:
+
+    >>> from sact.epoch.windows import SlidingWindows, SessionWindows
+    >>> agg = WindowAggregator(SlidingWindows("1m", "30s"), clock=clock)
+    >>> agg.add(Time(2000, 1, 1, 0, 0, 45), 1)
+    []
+    >>> for window in agg.flush():
+    ...     print(window.start.short, window.end.short, window.count)
+    2000-01-01 00:00:00 2000-01-01 00:01:00 1
+    2000-01-01 00:00:30 2000-01-01 00:01:30 1
+
+Sessions gather events until no event comes during ``gap``:
+
+    >>> from sact.epoch.windows import aggregate
+    >>> events = [(0, 1), (20, 1), (70, 1), (200, 1), (210, 1)]
+    >>> for window in aggregate(events, SessionWindows("1m"),
+    ...                         event_time=True):
+    ...     print(window.start_us // 10**6, window.end_us // 10**6,
+    ...           window.count)
+    0 130 3
+    200 270 2
+
+``aggregate()`` yields windows of an iterable of events as soon as they
+are finished, and only keeps open windows. With ``event_time``, the
+watermark is the greatest time of events minus the lateness instead of
+the clock, which suits replays of past events.
+
+Other aggregations than sums are given by ``fold``, ``initial`` and
+``merge`` (combining values of sessions):
+
+    >>> agg = WindowAggregator(TumblingWindows("1m"), event_time=True,
+    ...                        fold=max, initial=float("-inf"), merge=max)
+    >>> agg.add(0, 3), agg.add(1, 5), agg.add(2, 4)
+    ([], [], [])
+    >>> agg.flush()[0].value
+    5
+
+"""
+
+import heapq
+import operator
+from functools import reduce
+
+from .clock import Time, current_clock
+from .interval import TimeInterval
+from .rounding import _parse_unit, _rounder
+from .timezone import UTC
+from .utils import _to_us, _delay_us
+
+
+class TumblingWindows(object):
+    """Consecutive windows of ``size``, as buckets of ``rounding``
+
+    ``size`` and ``tz`` are as for ``sact.epoch.rounding.bucket()``, ``tz``
+    defaulting to UTC.
+
+    """
+
+    merging = False
+
+    def __init__(self, size, tz=None):
+        self._rounder = _rounder(size, tz or UTC())
+
+    def windows(self, us):
+        """Return ``(start_us, end_us)`` of windows of ``us``"""
+
+        return [self._rounder.bounds(us)]
+
+
+class SlidingWindows(object):
+    """Windows of ``size`` starting every ``slide``
+
+    Both are fixed units of ``rounding``, and starts are rounded as by
+    ``floor(t, slide, tz=tz)``.
+
+        >>> SlidingWindows("24h", "1h")
+        <SlidingWindows of 86400s every 3600s>
+        >>> SlidingWindows("1mo", "1d")
+        Traceback (most recent call last):
+        ...
+        ValueError: Sliding windows need fixed units of time.
+
+    """
+
+    merging = False
+
+    def __init__(self, size, slide, tz=None):
+        kind, self.size_us = _parse_unit(size)
+        self._rounder = _rounder(slide, tz or UTC())
+        if kind != "fixed" or self._rounder.kind != "fixed":
+            raise ValueError("Sliding windows need fixed units of time.")
+        self.slide_us = self._rounder.size
+
+    def windows(self, us):
+        """Return ``(start_us, end_us)`` of windows of ``us``"""
+
+        res = []
+        start = self._rounder.bounds(us)[0]
+        while start + self.size_us > us:
+            res.append((start, start + self.size_us))
+            start -= self.slide_us
+        return res
+
+    def __repr__(self):
+        return "<SlidingWindows of %ds every %ds>" % (
+            self.size_us // 1000000, self.slide_us // 1000000)
+
+
+class SessionWindows(object):
+    """Windows of events separated by less than ``gap``
+
+    A session ends ``gap`` after its last event. ``gap`` is a fixed unit
+    of ``rounding``.
+
+    """
+
+    merging = True
+
+    def __init__(self, gap):
+        kind, self.gap_us = _parse_unit(gap)
+        if kind != "fixed":
+            raise ValueError("Session gap must be a fixed unit of time.")
+
+    def windows(self, us):
+        """Return ``(start_us, end_us)`` of windows of ``us``"""
+
+        return [(us, us + self.gap_us)]
+
+
+class Window(object):
+    """Window from ``start_us`` to ``end_us`` with its aggregated value"""
+
+    __slots__ = ("start_us", "end_us", "count", "value")
+
+    def __init__(self, start_us, end_us, value, count=0):
+        self.start_us = start_us
+        self.end_us = end_us
+        self.value = value
+        self.count = count
+
+    @property
+    def start(self):
+        return Time.from_timestamp_us(self.start_us)
+
+    @property
+    def end(self):
+        return Time.from_timestamp_us(self.end_us)
+
+    @property
+    def interval(self):
+        return TimeInterval.from_us(self.start_us, self.end_us)
+
+    def __repr__(self):
+        return "<Window [%s, %s) count=%d value=%r>" % (
+            self.start.iso, self.end.iso, self.count, self.value)
+
+
+class WindowAggregator(object):
+    """Windows of an assigner, finished according to a watermark
+
+    The watermark is the time of ``clock`` minus ``lateness`` (seconds or
+    timedelta), or with ``event_time`` the greatest time of added events
+    minus ``lateness``. It never goes back.
+
+    Values of a window are ``fold(value, event_value)`` from ``initial``,
+    and ``merge(value, value)`` when sessions are merged.
+
+    """
+
+    def __init__(self, assigner, lateness=0, clock=None, event_time=False,
+                 fold=operator.add, initial=0, merge=operator.add):
+        self.assigner = assigner
+        self.lateness_us = _delay_us(lateness)
+        self.clock = clock
+        self.event_time = event_time
+        self.fold = fold
+        self.initial = initial
+        self.merge = merge
+        ## number of events dropped as late
+        self.late = 0
+        self._watermark_us = None
+        ## open windows by bounds, and heap of their (end, start)
+        self._windows = {}
+        self._ends = []
+        ## open sessions, disjoint and sorted
+        self._sessions = []
+
+    def _clock(self):
+        return current_clock() if self.clock is None else self.clock
+
+    @property
+    def watermark_us(self):
+        """Current watermark in UTC epoch microseconds, or None"""
+
+        if not self.event_time:
+            us = self._clock().ts_ns // 1000 - self.lateness_us
+            if self._watermark_us is None or us > self._watermark_us:
+                self._watermark_us = us
+        return self._watermark_us
+
+    @property
+    def watermark(self):
+        us = self.watermark_us
+        return None if us is None else Time.from_timestamp_us(us)
+
+    def __len__(self):
+        return len(self._windows) + len(self._sessions)
+
+    def add(self, when, value):
+        """Add an event, and return the list of finished windows"""
+
+        us = _to_us(when)
+        if self.event_time:
+            us_mark = us - self.lateness_us
+            if self._watermark_us is None or us_mark > self._watermark_us:
+                self._watermark_us = us_mark
+        watermark = self.watermark_us
+        late = True
+        for start, end in self.assigner.windows(us):
+            if self.assigner.merging:
+                if self._add_session(start, end, value, watermark):
+                    late = False
+                continue
+            if end <= watermark:
+                continue
+            late = False
+            window = self._windows.get((start, end))
+            if window is None:
+                window = self._windows[(start, end)] = \
+                    Window(start, end, self.initial)
+                heapq.heappush(self._ends, (end, start))
+            window.count += 1
+            window.value = self.fold(window.value, value)
+        if late:
+            self.late += 1
+        return self._expire(watermark)
+
+    def _add_session(self, start, end, value, watermark):
+        sessions = self._sessions
+        ## sessions intersecting [start, end] are a run, events mostly
+        ## come in order
+        first = len(sessions)
+        while first and sessions[first - 1].end_us >= start:
+            first -= 1
+        last = first
+        while last < len(sessions) and sessions[last].start_us <= end:
+            last += 1
+        if last == first + 1:
+            ## extending a single session
+            session = sessions[first]
+            if max(session.end_us, end) <= watermark:
+                return False
+            session.start_us = min(session.start_us, start)
+            session.end_us = max(session.end_us, end)
+            session.count += 1
+            session.value = self.fold(session.value, value)
+            return True
+        new = Window(start, end, self.fold(self.initial, value), 1)
+        run = sessions[first:last]
+        if run:
+            parts = sorted(run + [new], key=operator.attrgetter("start_us"))
+            new = Window(parts[0].start_us,
+                         max(part.end_us for part in parts),
+                         reduce(self.merge, [part.value for part in parts]),
+                         sum(part.count for part in parts))
+        if new.end_us <= watermark:
+            return False
+        sessions[first:last] = [new]
+        return True
+
+    def _expire(self, watermark):
+        res = []
+        if watermark is None:
+            return res
+        ends = self._ends
+        while ends and ends[0][0] <= watermark:
+            end, start = heapq.heappop(ends)
+            res.append(self._windows.pop((start, end)))
+        sessions = self._sessions
+        done = 0
+        while done < len(sessions) and sessions[done].end_us <= watermark:
+            done += 1
+        if done:
+            res.extend(sessions[:done])
+            del sessions[:done]
+        return res
+
+    def poll(self):
+        """Return the list of windows finished at current watermark"""
+
+        return self._expire(self.watermark_us)
+
+    def flush(self):
+        """Return all open windows, sorted by end"""
+
+        res = [self._windows.pop((start, end))
+               for end, start in sorted(self._ends)]
+        res.extend(self._sessions)
+        self._ends = []
+        self._sessions = []
+        return res
+
+
+def aggregate(events, assigner, **kwargs):
+    """Yield finished windows of ``(when, value)`` events of an iterable
+
+    Other arguments are as for ``WindowAggregator``. Remaining windows are
+    yielded at the end of events.
+
+    """
+    aggregator = WindowAggregator(assigner, **kwargs)
+    for when, value in events:
+        for window in aggregator.add(when, value):
+            yield window
+    for window in aggregator.flush():
+        yield window